@@ -0,0 +1,96 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+def user_cache_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def invalidate_cached_user(user_id):
+    cache.delete(user_cache_key(user_id))
+
+
+def get_cached_user(user_id):
+    """
+    The user with their profile, loaded in one query and cached for
+    AUTH_USER_CACHE_TIMEOUT seconds. Returns None if there is no such user.
+    """
+    key = user_cache_key(user_id)
+    user = cache.get(key)
+    if user is None:
+        user = User.objects.select_related('profile').filter(**{api_settings.USER_ID_FIELD: user_id}).first()
+        if user is None:
+            return None
+        try:
+            user.profile
+        except User.profile.RelatedObjectDoesNotExist:
+            pass  # The missing profile is cached too, so permission checks stay query-free
+        cache.set(key, user, settings.AUTH_USER_CACHE_TIMEOUT)
+    return user
+
+
+async def aget_cached_user(user_id):
+    """Async version of `get_cached_user`, for async views."""
+    key = user_cache_key(user_id)
+    user = await cache.aget(key)
+    if user is None:
+        user = await User.objects.select_related('profile').filter(**{api_settings.USER_ID_FIELD: user_id}).afirst()
+        if user is None:
+            return None
+        try:
+            user.profile
+        except User.profile.RelatedObjectDoesNotExist:
+            pass
+        await cache.aset(key, user, settings.AUTH_USER_CACHE_TIMEOUT)
+    return user
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that resolves the token's user together with their
+    profile from a short-lived cache. Saving or deleting a User or Profile
+    drops the entry (see auth_app/signals.py).
+    """
+
+    async def aauthenticate(self, request):
+        """
+        Async counterpart of `authenticate()`. Token parsing and validation are
+        pure computation; only the user lookup touches the cache or database.
+        """
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        user = await aget_cached_user(self.get_user_id(validated_token))
+        return self.check_user(user, validated_token), validated_token
+
+    def get_user(self, validated_token):
+        return self.check_user(get_cached_user(self.get_user_id(validated_token)), validated_token)
+
+    def get_user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+    def check_user(self, user, validated_token):
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from auth_app.models import Profile
+from auth_app.thumbnails import generate_profile_image_variants
+
+
+class Command(BaseCommand):
+    help = "Generate thumbnail variants for profile images that do not have them yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Rebuild variants for every profile image.")
+
+    def handle(self, *args, **options):
+        profiles = Profile.objects.exclude(profile_image='').exclude(profile_image__isnull=True)
+        if not options['all']:
+            profiles = profiles.filter(profile_image_variants={})
+
+        count = 0
+        for profile_id, image_name in profiles.values_list('id', 'profile_image').iterator():
+            generate_profile_image_variants(profile_id, image_name)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f"Processed {count} profile image(s)."))
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.6 on 2026-10-18 07:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth_app', '0004_profile_full_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='profile_image_variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AlterField(
+            model_name='profile',
+            name='full_name',
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+    ]
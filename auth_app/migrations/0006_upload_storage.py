@@ -0,0 +1,19 @@
+# Generated by Django 5.1.6 on 2026-10-18 08:15
+
+import courses.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth_app', '0005_profile_image_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='profile',
+            name='profile_image',
+            field=models.ImageField(blank=True, max_length=255, null=True, storage=courses.storage.get_upload_storage, upload_to='profile_images/'),
+        ),
+    ]
@@ -1,6 +1,8 @@
 from django.contrib.auth.models import User
 from django.db import models
 
+from courses.storage import get_upload_storage
+
 class Profile(models.Model):
     ROLE_CHOICES = [
         ('student', 'Student'),
@@ -10,9 +12,21 @@ class Profile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     full_name = models.CharField(max_length=100, blank=True, null=True)
     role = models.CharField(max_length=10, choices=ROLE_CHOICES, default='student')
-    profile_image = models.ImageField(upload_to='profile_images/', null=True, blank=True)
+    profile_image = models.ImageField(upload_to='profile_images/', storage=get_upload_storage, max_length=255, null=True, blank=True)
     bio = models.TextField(null=True, blank=True)
     phone_number = models.CharField(max_length=15, null=True, blank=True)
+    # {size: {format: media-relative name}}, filled in the background after an upload
+    profile_image_variants = models.JSONField(default=dict, blank=True)
+
+    # Image name as last loaded/saved, used to spot new uploads
+    _saved_image_name = ''
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'profile_image' in instance.__dict__:
+            instance._saved_image_name = instance.__dict__['profile_image'] or ''
+        return instance
 
     def __str__(self):
         return f"{self.user.username} - {self.role}"
\ No newline at end of file
@@ -1,14 +1,30 @@
 from django.contrib.auth.models import User
 from rest_framework import serializers
 from django.contrib.auth.hashers import make_password
+from django.core.files.storage import default_storage
 from .models import Profile
+from courses.sparse_fields import SparseFieldsMixin
 
 class ProfileSerializer(serializers.ModelSerializer):
     profile_image = serializers.ImageField(required=False)
+    profile_image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Profile
-        fields = ['role', 'profile_image', 'bio', 'phone_number']
+        fields = ['role', 'profile_image', 'profile_image_variants', 'bio', 'phone_number']
+
+    def get_profile_image_variants(self, obj):
+        """Thumbnail URLs by size and format, e.g. {"48": {"webp": ..., "jpeg": ...}}."""
+        return {
+            size: {format_name: self._variant_url(name) for format_name, name in formats.items()}
+            for size, formats in obj.profile_image_variants.items()
+        }
+
+    def _variant_url(self, name):
+        # Absolute like `profile_image` (see ImageField.to_representation)
+        url = default_storage.url(name)
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request is not None else url
 
     def update(self, instance, validated_data):
         if 'profile_image' in self.context['request'].FILES:
@@ -20,7 +36,7 @@ class ProfileSerializer(serializers.ModelSerializer):
 
         
         
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     profile = ProfileSerializer(required=False)  # Make profile optional
 
     class Meta:
@@ -0,0 +1,46 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from courses.tasks import run_in_background
+from .authentication import invalidate_cached_user
+from .models import Profile
+from .thumbnails import generate_profile_image_variants, remove_variants
+
+
+@receiver(post_save, sender=Profile)
+def schedule_profile_image_variants(sender, instance, **kwargs):
+    """Build thumbnail variants whenever a profile gets a new image."""
+    if 'profile_image' not in instance.__dict__:
+        return  # Deferred, so this save cannot have changed it
+    image_name = instance.profile_image.name or ''
+    if image_name == instance._saved_image_name:
+        return
+    instance._saved_image_name = image_name
+
+    Profile.objects.filter(id=instance.id).update(profile_image_variants={})
+    instance.profile_image_variants = {}
+    profile_id = instance.id
+    if image_name:
+        run_in_background(generate_profile_image_variants, profile_id, image_name)
+    else:
+        transaction.on_commit(lambda: remove_variants(profile_id))
+
+
+@receiver(post_delete, sender=Profile)
+def remove_profile_image_variants(sender, instance, **kwargs):
+    profile_id = instance.id
+    transaction.on_commit(lambda: remove_variants(profile_id))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_cache(sender, instance, **kwargs):
+    invalidate_cached_user(instance.pk)
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def invalidate_profile_user_cache(sender, instance, **kwargs):
+    invalidate_cached_user(instance.user_id)
@@ -1,3 +1,163 @@
-from django.test import TestCase
+import io
+import shutil
+import tempfile
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.test import override_settings
+from PIL import Image
+from rest_framework.test import APIClient, APITestCase
+
+from .models import Profile
+
+
+def make_user(username, role=None, **extra):
+    user = User.objects.create_user(username, password='password', **extra)
+    if role is not None:
+        Profile.objects.create(user=user, role=role)
+    return user
+
+
+class AuthAPITestCase(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = make_user('student', 'student', email='student@example.com')
+        cls.admin = make_user('admin', 'admin', is_staff=True, is_superuser=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def log_in(self, username, password='password'):
+        return self.client.post('/auth/login/', {'username': username, 'password': password}, format='json')
+
+
+class RegistrationTests(AuthAPITestCase):
+    def test_register_and_log_in(self):
+        response = self.client.post('/auth/register/', {
+            'username': 'newcomer', 'password': 'secret', 'email': 'new@example.com', 'profile': {'role': 'instructor'},
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertNotIn('password', response.json())
+        self.assertEqual(User.objects.get(username='newcomer').profile.role, 'instructor')
+
+        response = self.log_in('newcomer', 'secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.json()), {'refresh', 'access'})
+
+    def test_duplicate_username(self):
+        response = self.client.post('/auth/register/', {'username': 'student', 'password': 'secret'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_bad_credentials(self):
+        self.assertEqual(self.log_in('student', 'wrong').status_code, 401)
+        self.assertEqual(self.log_in('nobody').status_code, 404)
+
+
+class ProfileTests(AuthAPITestCase):
+    def test_profile_requires_authentication(self):
+        self.assertEqual(self.client.get('/auth/profile/').status_code, 401)
+
+    def test_update_is_seen_by_token_requests(self):
+        token = self.log_in('student').json()['access']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(self.client.get('/auth/profile/').json()['first_name'], '')
+
+        response = self.client.put('/auth/profile/', {'first_name': 'Ada', 'profile': {'bio': 'Hello'}}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        body = self.client.get('/auth/profile/').json()
+        self.assertEqual((body['first_name'], body['profile']['bio']), ('Ada', 'Hello'))
+        self.assertEqual(self.client.get(f'/auth/users/{self.student.id}/').json()['first_name'], 'Ada')
+
+    def test_sparse_fields(self):
+        response = self.client_for(self.student).get('/auth/profile/?fields=id,username')
+        self.assertEqual(response.json(), {'id': self.student.id, 'username': 'student'})
+
+
+class ProfileImageTests(AuthAPITestCase):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media_settings = override_settings(
+            MEDIA_ROOT=media_root, BACKGROUND_TASKS={**settings.BACKGROUND_TASKS, 'EAGER': True},
+        )
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+    def test_variant_urls_are_absolute(self):
+        image = io.BytesIO()
+        Image.new('RGB', (400, 200), 'red').save(image, 'JPEG')
+        profile = Profile.objects.get(user=self.student)
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.profile_image.save('me.jpg', ContentFile(image.getvalue()))
+
+        # Rendered with the request in context, like `profile_image` itself
+        response = self.client_for(User.objects.get(id=self.student.id)).put('/auth/profile/', {}, format='json')
+        profile = response.json()['profile']
+        self.assertTrue(profile['profile_image'].startswith('http://testserver/'))
+        self.assertTrue(profile['profile_image_variants'])
+        for formats in profile['profile_image_variants'].values():
+            for url in formats.values():
+                self.assertTrue(url.startswith('http://testserver/'), url)
+
+
+class AdminUserTests(AuthAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for number in range(5):
+            make_user(f'user{number}', 'student')
+
+    def test_only_admins_list_users(self):
+        self.assertEqual(self.client_for(self.student).get('/auth/admin/users/').status_code, 403)
+
+    def test_list_pages(self):
+        client = self.client_for(self.admin)
+        url, seen = '/auth/admin/users/?page_size=3', []
+        while url:
+            body = client.get(url).json()
+            seen.extend(user['id'] for user in body['results'])
+            url = body['next']
+        self.assertEqual(seen, list(User.objects.order_by('id').values_list('id', flat=True)))
+
+    def test_delete_user(self):
+        client = self.client_for(self.admin)
+        user = User.objects.get(username='user0')
+        self.assertEqual(client.delete(f'/auth/admin/users/{user.id}/').status_code, 204)
+        self.assertEqual(client.delete(f'/auth/admin/users/{user.id}/').status_code, 404)
+        self.assertEqual(self.client_for(self.student).delete(f'/auth/admin/users/{self.admin.id}/').status_code, 403)
+
+
+class UserLookupTests(AuthAPITestCase):
+    def test_users_by_ids(self):
+        client = self.client_for(self.student)
+        response = client.get(f'/auth/users/?ids={self.student.id},{self.admin.id}')
+        self.assertEqual(sorted(user['id'] for user in response.json()), [self.student.id, self.admin.id])
+        self.assertEqual(client.get('/auth/users/?ids=1,x').status_code, 400)
+
+    def test_user_detail(self):
+        client = self.client_for(self.student)
+        response = client.get(f'/auth/users/{self.admin.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['username'], 'admin')
+        self.assertEqual(client.get('/auth/users/0/').status_code, 404)
+
+    def test_user_detail_requires_authentication(self):
+        response = self.client.get(f'/auth/users/{self.admin.id}/')
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('WWW-Authenticate', response)
+
+    def test_deleted_users_tokens_stop_working(self):
+        token = self.log_in('student').json()['access']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(self.client.get(f'/auth/users/{self.admin.id}/').status_code, 200)
+        User.objects.filter(id=self.student.id).delete()
+        self.assertEqual(self.client.get(f'/auth/users/{self.admin.id}/').status_code, 401)
+        self.assertEqual(self.client.get('/auth/profile/').status_code, 401)
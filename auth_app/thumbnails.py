@@ -0,0 +1,74 @@
+import io
+import os
+import posixpath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .authentication import invalidate_cached_user
+from .models import Profile
+
+# Pillow format name and file extension per variant format
+FORMATS = {
+    'webp': ('WEBP', 'webp'),
+    'jpeg': ('JPEG', 'jpg'),
+}
+
+
+def variants_dir(profile_id):
+    return posixpath.join(settings.PROFILE_IMAGE_VARIANTS['DIR'], str(profile_id))
+
+
+def remove_variants(profile_id):
+    """Delete every stored variant of a profile's image."""
+    directory = variants_dir(profile_id)
+    try:
+        _, files = default_storage.listdir(directory)
+    except FileNotFoundError:
+        return
+    for name in files:
+        default_storage.delete(posixpath.join(directory, name))
+
+
+def render_variant(image, size, pillow_format):
+    """Square-crop to `size` px and encode. EXIF and other metadata are not carried over."""
+    variant = ImageOps.fit(image, (size, size), Image.LANCZOS)
+    buffer = io.BytesIO()
+    variant.save(buffer, pillow_format, quality=settings.PROFILE_IMAGE_VARIANTS['QUALITY'], optimize=True)
+    return buffer.getvalue()
+
+
+def generate_profile_image_variants(profile_id, source_name):
+    """
+    Background task: build the fixed-size variants of a profile image.
+
+    The result is only recorded if the profile still has `source_name`, so a
+    newer upload is never overwritten by an older one.
+    """
+    profile = Profile.objects.filter(id=profile_id).first()
+    if profile is None or profile.profile_image.name != source_name:
+        return
+
+    try:
+        with profile.profile_image.open('rb') as source:
+            image = Image.open(source)
+            # Apply the EXIF orientation before the metadata is dropped
+            image = ImageOps.exif_transpose(image).convert('RGB')
+    except (OSError, UnidentifiedImageError):
+        return
+
+    remove_variants(profile_id)
+    stem = os.path.splitext(os.path.basename(source_name))[0]
+    variants = {}
+    for size in settings.PROFILE_IMAGE_VARIANTS['SIZES']:
+        variants[str(size)] = {}
+        for format_name in settings.PROFILE_IMAGE_VARIANTS['FORMATS']:
+            pillow_format, extension = FORMATS[format_name]
+            name = posixpath.join(variants_dir(profile_id), f'{stem}_{size}.{extension}')
+            saved_name = default_storage.save(name, ContentFile(render_variant(image, size, pillow_format)))
+            variants[str(size)][format_name] = saved_name
+
+    if Profile.objects.filter(id=profile_id, profile_image=source_name).update(profile_image_variants=variants):
+        invalidate_cached_user(profile.user_id)
@@ -6,6 +6,9 @@ from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
 from .serializers import UserSerializer
 from .models import Profile
+from courses.pagination import paginated_response
+from courses.sparse_fields import sparse_fields
+from courses.async_api import async_api_view, json_response, not_found
 
 import logging
 
@@ -47,7 +50,7 @@ def user_profile(request):
     user = request.user
 
     if request.method == 'GET':
-        serializer = UserSerializer(user)
+        serializer = UserSerializer(user, context=sparse_fields(request))
         return Response(serializer.data)
 
     elif request.method == 'PUT':
@@ -69,8 +72,7 @@ def user_profile(request):
 @permission_classes([IsAuthenticated, IsAdminUser])  # Only admins can access
 def list_all_users(request):
     users = User.objects.all().select_related('profile')
-    serializer = UserSerializer(users, many=True)
-    return Response(serializer.data)
+    return paginated_response(request, users, UserSerializer, ordering=('id',), context=sparse_fields(request))
 
 # Admin: Delete a User
 @api_view(['DELETE'])
@@ -99,13 +101,14 @@ def get_users_by_ids(request):
         return Response({"error": "Invalid user IDs"}, status=status.HTTP_400_BAD_REQUEST)
     
     users = User.objects.filter(id__in=user_ids).select_related('profile')
-    serializer = UserSerializer(users, many=True)
+    serializer = UserSerializer(users, many=True, context=sparse_fields(request))
     return Response(serializer.data)
 
-@api_view(['GET'])
-@permission_classes([IsAuthenticated])
-def get_user_detail(request, user_id):
+@async_api_view()
+async def get_user_detail(request, user_id):
     """Get detailed user information"""
-    user = get_object_or_404(User.objects.select_related('profile'), id=user_id)
-    serializer = UserSerializer(user)
-    return Response(serializer.data)
\ No newline at end of file
+    user = await User.objects.select_related('profile').filter(id=user_id).afirst()
+    if user is None:
+        return not_found(User)
+    serializer = UserSerializer(user, context=sparse_fields(request))
+    return json_response(serializer.data)
\ No newline at end of file
@@ -47,6 +47,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'courses.middleware.SQLInstrumentationMiddleware',  # First, so its timings cover the whole stack
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -85,9 +86,44 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Take the write lock when a transaction starts, so writers queue on
+            # busy_timeout instead of failing when a read lock cannot be upgraded
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
+# SQLite pragmas run on every new connection (see courses/db.py), and how often
+# the write views retry when the database stays locked past busy_timeout
+SQLITE_TUNING = {
+    'ENABLED': os.environ.get('SQLITE_TUNING', 'True') == 'True',
+    'PRAGMAS': {
+        'journal_mode': 'wal',  # Readers no longer wait for writers, nor writers for readers
+        'busy_timeout': 5000,  # Milliseconds to wait for the write lock
+        'synchronous': 'normal',  # Durable across crashes in WAL mode, without an fsync per commit
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -64 * 1024,  # Negative: in KiB, so 64 MiB of page cache per connection
+        'temp_store': 'memory',
+    },
+    'WRITE_RETRIES': 3,
+    'RETRY_BACKOFF': 0.05,  # Seconds before the first retry, doubled for each one after
+}
+
+
+# Caches
+# LocMemCache is per process: with several worker processes, point this at a
+# shared backend (Redis, Memcached) so signal-driven invalidation reaches all of them.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'course-sharing',
+    }
+}
+
+# How long a shared course detail payload may be served from the cache
+COURSE_PAYLOAD_CACHE_TIMEOUT = 15 * 60
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -134,10 +170,21 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'auth_app.authentication.CachedJWTAuthentication',
     ),
 }
 
+# Seconds an authenticated user (with profile) stays cached between requests
+AUTH_USER_CACHE_TIMEOUT = 60
+
+# Cursor pagination for list endpoints (see courses/pagination.py)
+API_PAGINATION = {
+    'PAGE_SIZE': 50,
+    'MAX_PAGE_SIZE': 200,
+    'BARE_LIST_DEFAULT': os.environ.get('API_BARE_LIST_DEFAULT', 'False') == 'True',
+    'STREAM_CHUNK_SIZE': 500,  # Rows per query when a bare list is streamed
+}
+
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:5173",  # For React frontend
 ]
@@ -153,3 +200,80 @@ import os
 
 MEDIA_URL = '/media/'  # URL prefix for media files
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')  # Directory where media files are stored
+
+# Lesson files and profile images go to content-addressed storage, which keeps
+# identical uploads once (see courses/storage.py); generated files use the default
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    'uploads': {'BACKEND': 'courses.storage.ContentAddressedStorage', 'OPTIONS': {'prefix': 'blobs'}},
+    # Lesson videos and PDFs, never served from MEDIA_URL (see MEDIA_SIGNING)
+    'lesson_files': {'BACKEND': 'courses.storage.ContentAddressedStorage', 'OPTIONS': {'prefix': 'private'}},
+}
+
+# Signed, expiring lesson media URLs (see courses/media.py)
+MEDIA_SIGNING = {
+    'TTL': timedelta(hours=1),  # How long an issued URL stays valid, at least
+    'GRANULARITY': timedelta(minutes=5),  # Expiry is rounded up to this, so URLs stay stable in between
+    # 'django' streams files itself; behind nginx use 'x-accel-redirect', behind Apache or lighttpd 'x-sendfile'
+    'DELIVERY': os.environ.get('MEDIA_DELIVERY', 'django'),
+    'INTERNAL_URL': '/protected-media/',  # nginx `internal` location aliased to MEDIA_ROOT
+}
+
+# Local worker pool for background jobs such as video transcoding (see courses/tasks.py)
+BACKGROUND_TASKS = {
+    'WORKERS': int(os.environ.get('BACKGROUND_WORKERS', '2')),
+    'EAGER': False,  # Run tasks inline instead of in the pool
+}
+
+# HLS renditions produced for lesson videos (see courses/transcoding.py)
+VIDEO_TRANSCODING = {
+    # Needs ffmpeg on the PATH; without it videos are left untranscoded.
+    # 'courses.transcoding.StubTranscoder' runs without it
+    'BACKEND': os.environ.get('VIDEO_TRANSCODER', 'courses.transcoding.FFmpegTranscoder'),
+    'OUTPUT_DIR': 'streams',  # Under the private prefix of STORAGES['lesson_files']
+    'SEGMENT_SECONDS': 6,
+    'RENDITIONS': [
+        {'name': '360p', 'height': 360, 'video_bitrate': 800, 'audio_bitrate': 96},
+        {'name': '480p', 'height': 480, 'video_bitrate': 1400, 'audio_bitrate': 128},
+        {'name': '720p', 'height': 720, 'video_bitrate': 2800, 'audio_bitrate': 128},
+        {'name': '1080p', 'height': 1080, 'video_bitrate': 5000, 'audio_bitrate': 192},
+    ],
+}
+
+# Page text and previews extracted from lesson PDFs (see courses/pdf.py)
+PDF_PROCESSING = {
+    # Needs the optional `pip install pypdfium2`; without it PDFs are left unprocessed.
+    # 'courses.pdf.StubPdfBackend' runs without it
+    'BACKEND': os.environ.get('PDF_BACKEND', 'courses.pdf.PdfiumBackend'),
+    'PREVIEW_PAGES': 20,  # Text comes from every page, previews only from the first ones
+    'PREVIEW_WIDTH': 320,  # px
+    'PREVIEW_FORMAT': 'webp',  # 'webp' or 'jpeg'
+    'PREVIEW_QUALITY': 70,
+    'SEARCH_TEXT_LIMIT': 100000,  # Characters of PDF text added to the search index per lesson
+    'RETRY_AFTER': 5,  # Seconds clients are asked to wait while a PDF is being processed
+}
+
+# Thumbnails generated for profile images (see auth_app/thumbnails.py)
+PROFILE_IMAGE_VARIANTS = {
+    'DIR': 'profile_images/variants',  # Under MEDIA_ROOT
+    'SIZES': [48, 128, 512],
+    'FORMATS': ['webp', 'jpeg'],
+    'QUALITY': 82,
+}
+
+# Per-request SQL query counts and timings (see courses/middleware.py), off unless enabled
+SQL_INSTRUMENTATION = {
+    'ENABLED': os.environ.get('SQL_INSTRUMENTATION', 'False') == 'True',
+    'SAMPLE_RATE': float(os.environ.get('SQL_INSTRUMENTATION_SAMPLE_RATE', '1.0')),  # Fraction of requests recorded
+    'N_PLUS_ONE_THRESHOLD': 5,  # Flag statements repeated more often than this in one request
+    'SERVER_TIMING_HEADER': True,
+}
+
+# Resumable lesson video uploads (see courses/uploads.py)
+LESSON_UPLOADS = {
+    'TEMP_DIR': os.path.join(BASE_DIR, 'tmp', 'uploads'),  # Partial files, kept outside MEDIA_ROOT
+    'MAX_CHUNK_SIZE': 16 * 1024 * 1024,
+    'MAX_FILE_SIZE': 8 * 1024 * 1024 * 1024,
+    'EXPIRY': timedelta(hours=24),
+}
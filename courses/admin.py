@@ -1,7 +1,8 @@
 from django.contrib import admin
-from .models import Course, Lesson, CourseEnrollment, CourseEnrollmentRequest
+from .models import Course, Lesson, CourseEnrollment, CourseEnrollmentRequest, LessonUpload
 
 admin.site.register(Course)
 admin.site.register(Lesson)
 admin.site.register(CourseEnrollment)
 admin.site.register(CourseEnrollmentRequest)
+admin.site.register(LessonUpload)
@@ -0,0 +1,87 @@
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from rest_framework import exceptions, status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from auth_app.authentication import CachedJWTAuthentication
+
+renderer = JSONRenderer()
+authenticator = CachedJWTAuthentication()
+
+
+def json_response(data, status=status.HTTP_200_OK):
+    """Render `data` exactly as DRF's JSONRenderer does for the sync views."""
+    return HttpResponse(renderer.render(data), status=status, content_type=renderer.media_type)
+
+
+def error_response(exc):
+    """The response DRF's exception handler gives for an APIException."""
+    data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+    response = json_response(data, status=exc.status_code)
+    if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+        response['WWW-Authenticate'] = authenticator.authenticate_header(None)
+    return response
+
+
+def not_found(model):
+    return json_response({'detail': f'No {model._meta.object_name} matches the given query.'}, status.HTTP_404_NOT_FOUND)
+
+
+async def authenticate(request):
+    """(user, token) for the request, or None when it carries no credentials."""
+    # APIClient.force_authenticate() in tests, as DRF's Request honours it
+    forced_user = getattr(request, '_force_auth_user', None)
+    if forced_user is not None:
+        return forced_user, getattr(request, '_force_auth_token', None)
+    return await authenticator.aauthenticate(request)
+
+
+def async_api_view(permission_classes=(), methods=('GET', 'HEAD')):
+    """
+    Turn an async view into a read-only API endpoint with what @api_view gives
+    the sync ones: JWT authentication (requests must be authenticated), the
+    given permission classes, DRF's JSON rendering and error format.
+
+    The view receives a DRF `Request` (for `query_params` and friends) and
+    returns a response, usually built with `json_response`. No thread is held
+    while it waits on the cache or database.
+    """
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                return error_response(exceptions.MethodNotAllowed(request.method))
+            try:
+                authenticated = await authenticate(request)
+            except exceptions.APIException as exc:
+                return error_response(exc)
+            if authenticated is None:
+                return error_response(exceptions.NotAuthenticated())
+
+            api_request = Request(request, parsers=[], authenticators=[])
+            api_request.user, api_request.auth = authenticated
+            for permission in permission_classes:
+                permission = permission()
+                if not permission.has_permission(api_request, None):
+                    return error_response(exceptions.PermissionDenied(getattr(permission, 'message', None)))
+            response = await view(api_request, *args, **kwargs)
+            response.setdefault('Allow', ', '.join(methods))
+            return response
+        return wrapper
+    return decorator
+
+
+def delegating_view(async_view, sync_view, async_methods=('GET', 'HEAD')):
+    """
+    Serve reads of a URL with `async_view` and every other method with the
+    (sync) `sync_view`, e.g. a viewset's detail route.
+    """
+    async def view(request, *args, **kwargs):
+        if request.method in async_methods:
+            return await async_view(request, *args, **kwargs)
+        return await sync_to_async(sync_view)(request, *args, **kwargs)
+    view.csrf_exempt = True  # Like DRF views; JWT requests carry no CSRF token
+    return view
@@ -0,0 +1,543 @@
+"""
+Synthetic dataset and endpoint scenarios for `manage.py benchmark_api`.
+
+Every scenario builds one request against a seeded database. Anything a
+request needs that it would use up (a pending enrollment request to approve,
+a lesson to delete, ...) is created by the scenario before the clock starts.
+"""
+import itertools
+import math
+import os
+import random
+import threading
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.db import OperationalError, connection
+from django.test.utils import override_settings
+from django.urls import URLPattern, URLResolver, reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from auth_app.models import Profile
+from .media import sign_media_url
+from .models import Category, Course, CourseEnrollment, CourseEnrollmentRequest, Lesson, LessonUpload
+from .ordering import ORDER_GAP, allocate_order
+from .search import rebuild_index
+
+BENCHMARK_PASSWORD = 'benchmark-password'
+
+# Rows per user at --scale users; instructors are USERS_PER_INSTRUCTOR apart
+USERS_PER_INSTRUCTOR = 50
+USERS_PER_COURSE = 20
+LESSONS_PER_COURSE = 8
+ENROLLMENTS_PER_STUDENT = 3
+CATEGORIES = 20
+
+TOPICS = ['python', 'django', 'databases', 'statistics', 'design', 'networks', 'algebra', 'chemistry']
+WORDS = ['intro', 'advanced', 'practical', 'applied', 'modern', 'hands-on', 'complete', 'fundamentals']
+SEARCH_TERM = 'databases'
+
+# Payloads served and uploaded by the media and upload scenarios
+PDF_BYTES = b'%PDF-1.4\n' + b'0' * (256 * 1024)
+VIDEO_BYTES = b'\x00' * (512 * 1024)
+
+# Route names the benchmark is expected to cover
+URLCONFS = ['courses.urls', 'auth_app.urls']
+
+
+def bulk_insert(model, rows, batch_size):
+    """Insert an iterable of unsaved instances in batches. Returns the row count."""
+    rows = iter(rows)
+    count = 0
+    while True:
+        batch = list(itertools.islice(rows, batch_size))
+        if not batch:
+            return count
+        model.objects.bulk_create(batch, batch_size=batch_size)
+        count += len(batch)
+
+
+class BenchmarkData:
+    """The seeded objects scenarios refer to, plus factories for per-request objects."""
+
+    def __init__(self, admin, instructor, student, course, pdf_lesson, category, password_hash):
+        self.admin = admin
+        self.instructor = instructor
+        self.student = student
+        self.course = course
+        self.pdf_lesson = pdf_lesson
+        self.category = category
+        self.password_hash = password_hash
+        self.counter = itertools.count()
+
+    def unique(self, prefix):
+        return f'{prefix}-{next(self.counter)}'
+
+    def new_user(self, role='student'):
+        user = User.objects.create(username=self.unique('bench-extra'), password=self.password_hash)
+        Profile.objects.create(user=user, role=role)
+        return user
+
+    def new_course(self):
+        return Course.objects.create(
+            title=self.unique('Benchmark course'), description='Created for a benchmark request.',
+            instructor=self.instructor, category=self.category,
+        )
+
+    def new_lesson(self):
+        return Lesson.objects.create(
+            course=self.course, title=self.unique('Benchmark lesson'), description='Created for a benchmark request.',
+            order=allocate_order(self.course.id),
+        )
+
+    def new_request(self):
+        return CourseEnrollmentRequest.objects.create(student=self.new_user(), course=self.course)
+
+    def new_upload(self, complete=False):
+        upload = LessonUpload.objects.create(
+            owner=self.instructor, filename='benchmark.mp4', size=len(VIDEO_BYTES),
+            expires_at=timezone.now() + settings.LESSON_UPLOADS['EXPIRY'],
+        )
+        os.makedirs(os.path.dirname(upload.temp_path), exist_ok=True)
+        with open(upload.temp_path, 'wb') as partial:
+            if complete:
+                partial.write(VIDEO_BYTES)
+        return upload
+
+
+def isolated_settings(media_root):
+    """Settings that keep a benchmark away from real media, caches and background workers."""
+    return override_settings(
+        MEDIA_ROOT=media_root,
+        LESSON_UPLOADS={**settings.LESSON_UPLOADS, 'TEMP_DIR': f'{media_root}/uploads'},
+        BACKGROUND_TASKS={**settings.BACKGROUND_TASKS, 'EAGER': True},
+        VIDEO_TRANSCODING={**settings.VIDEO_TRANSCODING, 'BACKEND': 'courses.transcoding.StubTranscoder'},
+        PDF_PROCESSING={**settings.PDF_PROCESSING, 'BACKEND': 'courses.pdf.StubPdfBackend'},
+        CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'benchmark'}},
+    )
+
+
+def seed_dataset(scale, seed=0, batch_size=5000, log=print):
+    """
+    Fill an empty database with about `scale` users and the courses, lessons,
+    enrollments and requests that go with them. The same seed gives the same data.
+    """
+    rng = random.Random(seed)
+    password_hash = make_password(BENCHMARK_PASSWORD)
+    instructor_count = max(1, scale // USERS_PER_INSTRUCTOR)
+    student_count = max(1, scale - instructor_count)
+    course_count = max(1, scale // USERS_PER_COURSE)
+
+    log(f"Seeding {student_count} students and {instructor_count} instructors")
+    admin = User.objects.create(username='bench-admin', password=password_hash, is_staff=True, is_superuser=True)
+    Profile.objects.create(user=admin, role='admin')
+    for role, count in (('instructor', instructor_count), ('student', student_count)):
+        bulk_insert(User, (
+            User(username=f'bench-{role}-{i}', email=f'{role}{i}@example.com', password=password_hash)
+            for i in range(count)
+        ), batch_size)
+        user_ids = User.objects.filter(username__startswith=f'bench-{role}-').values_list('id', flat=True)
+        bulk_insert(Profile, (Profile(user_id=user_id, role=role) for user_id in user_ids.iterator()), batch_size)
+    instructor_ids = list(User.objects.filter(profile__role='instructor').order_by('id').values_list('id', flat=True))
+    student_ids = list(User.objects.filter(profile__role='student').order_by('id').values_list('id', flat=True))
+
+    log(f"Seeding {CATEGORIES} categories and {course_count} courses")
+    bulk_insert(Category, (
+        Category(name=f'{topic.title()} {i}', description=f'Courses about {topic}.')
+        for i, topic in zip(range(CATEGORIES), itertools.cycle(TOPICS))
+    ), batch_size)
+    category_ids = list(Category.objects.order_by('id').values_list('id', flat=True))
+    bulk_insert(Course, (
+        Course(
+            title=f'{rng.choice(WORDS).title()} {rng.choice(TOPICS)} {i}',
+            description=' '.join(rng.choices(WORDS + TOPICS, k=30)),
+            instructor_id=instructor_ids[i % len(instructor_ids)],
+            category_id=rng.choice(category_ids),
+        )
+        for i in range(course_count)
+    ), batch_size)
+    course_ids = list(Course.objects.order_by('id').values_list('id', flat=True))
+
+    log(f"Seeding {course_count * LESSONS_PER_COURSE} lessons")
+    bulk_insert(Lesson, (
+        Lesson(
+            course_id=course_id, title=f'Lesson {position}: {rng.choice(TOPICS)}',
+            description=' '.join(rng.choices(WORDS + TOPICS, k=60)), order=position * ORDER_GAP,
+        )
+        for course_id in course_ids for position in range(1, LESSONS_PER_COURSE + 1)
+    ), batch_size)
+
+    log("Seeding enrollments and enrollment requests")
+    per_student = min(ENROLLMENTS_PER_STUDENT + 1, len(course_ids))
+
+    def picks(student_id):
+        # Derived per student, so both passes agree without keeping every pick in memory
+        return random.Random(f'{seed}:{student_id}').sample(course_ids, per_student)
+
+    bulk_insert(CourseEnrollment, (
+        CourseEnrollment(student_id=student_id, course_id=course_id)
+        for student_id in student_ids for course_id in picks(student_id)[:-1]
+    ), batch_size)
+    bulk_insert(CourseEnrollmentRequest, (
+        CourseEnrollmentRequest(student_id=student_id, course_id=picks(student_id)[-1], message='Please let me in.')
+        for student_id in student_ids if per_student > 1
+    ), batch_size)
+
+    # Bulk inserts skip the signals that maintain counters and the search index
+    log("Counting and indexing")
+    Course.objects.all().reconcile_counters()
+    rebuild_index(batch_size=batch_size)
+
+    instructor = User.objects.get(id=instructor_ids[0])
+    course = Course.objects.filter(instructor=instructor).order_by('id').first()
+    student = User.objects.get(id=student_ids[0])
+    CourseEnrollment.objects.get_or_create(student=student, course=course)
+    pdf_lesson = course.lessons.first()
+    pdf_lesson.pdf_file.save('benchmark.pdf', ContentFile(PDF_BYTES))
+    # Processed eagerly by the stubs, which update the row behind this instance
+    pdf_lesson.refresh_from_db()
+    pdf_lesson.video_file.save('benchmark.mp4', ContentFile(VIDEO_BYTES))
+    pdf_lesson.refresh_from_db()
+    return BenchmarkData(admin, instructor, student, course, pdf_lesson, course.category, password_hash)
+
+
+class Call:
+    """One request: who sends it, and what."""
+
+    def __init__(self, user, method, path, data=None, format='json', **extra):
+        self.user = user
+        self.method = method
+        self.path = path
+        self.data = data
+        self.format = format
+        self.extra = extra
+
+
+class Scenario:
+    def __init__(self, name, route, prepare):
+        self.name = name
+        self.route = route
+        self.prepare = prepare  # (BenchmarkData) -> Call
+
+
+def scenarios():
+    """Every benchmarked request, named `<area>.<action>`."""
+    def get(user, route, query='', **kwargs):
+        """A GET as `user` (an attribute of BenchmarkData, None for anonymous); kwargs are (data) -> value."""
+        def prepare(data):
+            path = reverse(route, kwargs={name: value(data) for name, value in kwargs.items()})
+            return Call(getattr(data, user) if user else None, 'get', path + query)
+        return prepare
+
+    def signed_pdf_path(data):
+        path = reverse('lesson-media', kwargs={'lesson_id': data.pdf_lesson.id, 'kind': 'pdf'})
+        return sign_media_url(path)
+
+    course_id = lambda data: data.course.id
+    return [
+        Scenario('api.root', 'api-root', get('student', 'api-root')),
+
+        # auth_app
+        Scenario('auth.register', 'register', lambda data: Call(None, 'post', reverse('register'), {
+            'username': data.unique('bench-register'), 'password': BENCHMARK_PASSWORD, 'profile': {'role': 'student'},
+        })),
+        Scenario('auth.login', 'login', lambda data: Call(None, 'post', reverse('login'), {
+            'username': data.student.username, 'password': BENCHMARK_PASSWORD,
+        })),
+        Scenario('auth.profile', 'profile', get('student', 'profile')),
+        Scenario('auth.profile.update', 'profile', lambda data: Call(data.student, 'put', reverse('profile'), {
+            'first_name': 'Bench', 'profile': {'bio': data.unique('bio')},
+        })),
+        Scenario('auth.users.list', 'list_all_users', get('admin', 'list_all_users')),
+        Scenario('auth.users.delete', 'delete_user', lambda data: Call(
+            data.admin, 'delete', reverse('delete_user', kwargs={'user_id': data.new_user().id}),
+        )),
+        Scenario('auth.users.by_ids', 'get_users_by_ids', lambda data: Call(
+            data.student, 'get', reverse('get_users_by_ids') + '?ids=' + ','.join(
+                str(user_id) for user_id in User.objects.order_by('id').values_list('id', flat=True)[:20]
+            ),
+        )),
+        Scenario('auth.users.detail', 'get_user_detail', get('student', 'get_user_detail', user_id=lambda data: data.instructor.id)),
+
+        # Courses, lessons and categories
+        Scenario('courses.list', 'course-list', get('student', 'course-list')),
+        Scenario('courses.list.expanded', 'course-list', get('student', 'course-list', '?expand=lessons')),
+        Scenario('courses.popular', 'course-popular', get('student', 'course-popular')),
+        Scenario('courses.detail', 'course-detail', get('student', 'course-detail', pk=course_id)),
+        Scenario('courses.create', 'course-list', lambda data: Call(data.instructor, 'post', reverse('course-list'), {
+            'title': data.unique('Benchmark course'), 'description': 'Created by the benchmark.', 'category': data.category.id,
+        })),
+        Scenario('courses.update', 'course-detail', lambda data: Call(
+            data.instructor, 'patch', reverse('course-detail', kwargs={'pk': data.course.id}), {'description': data.unique('Updated')},
+        )),
+        Scenario('courses.delete', 'course-detail', lambda data: Call(
+            data.instructor, 'delete', reverse('course-detail', kwargs={'pk': data.new_course().id}),
+        )),
+        Scenario('courses.reorder_lessons', 'course-reorder-lessons', lambda data: Call(
+            data.instructor, 'post', reverse('course-reorder-lessons', kwargs={'pk': data.course.id}),
+            {'lessons': list(data.course.lessons.order_by('-order').values_list('id', flat=True))},
+        )),
+        Scenario('lessons.list', 'lesson-list', get('student', 'lesson-list')),
+        Scenario('lessons.detail', 'lesson-detail', get('student', 'lesson-detail', pk=lambda data: data.pdf_lesson.id)),
+        Scenario('lessons.create', 'lesson-list', lambda data: Call(data.instructor, 'post', reverse('lesson-list'), {
+            'title': data.unique('Benchmark lesson'), 'description': 'Created by the benchmark.', 'course': data.course.id,
+        })),
+        Scenario('lessons.update', 'lesson-detail', lambda data: Call(
+            data.instructor, 'patch', reverse('lesson-detail', kwargs={'pk': data.pdf_lesson.id}), {'description': data.unique('Updated')},
+        )),
+        Scenario('lessons.delete', 'lesson-detail', lambda data: Call(
+            data.instructor, 'delete', reverse('lesson-detail', kwargs={'pk': data.new_lesson().id}),
+        )),
+        # Signed URLs, as the lesson payloads hand them out
+        Scenario('lessons.media', 'lesson-media', lambda data: Call(None, 'get', signed_pdf_path(data))),
+        Scenario('lessons.media.range', 'lesson-media', lambda data: Call(
+            None, 'get', signed_pdf_path(data), HTTP_RANGE='bytes=0-65535',
+        )),
+        Scenario('lessons.video.stream', 'lesson-video-stream', lambda data: Call(
+            None, 'get', sign_media_url(reverse('lesson-video-stream', kwargs={'lesson_id': data.pdf_lesson.id, 'path': 'master.m3u8'})),
+        )),
+        Scenario('lessons.pdf.pages', 'lesson-pdf-pages', lambda data: Call(
+            None, 'get', sign_media_url(reverse('lesson-pdf-pages', kwargs={'lesson_id': data.pdf_lesson.id})),
+        )),
+        Scenario('lessons.pdf.preview', 'lesson-pdf-preview', lambda data: Call(
+            None, 'get', sign_media_url(reverse('lesson-pdf-preview', kwargs={'lesson_id': data.pdf_lesson.id, 'page': 1})),
+        )),
+        Scenario('categories.list', 'category-list', get('student', 'category-list')),
+        Scenario('categories.detail', 'category-detail', get('student', 'category-detail', pk=lambda data: data.category.id)),
+        Scenario('categories.create', 'category-list', lambda data: Call(data.admin, 'post', reverse('category-list'), {
+            'name': data.unique('Benchmark category'),
+        })),
+        Scenario('categories.update', 'category-detail', lambda data: Call(
+            data.admin, 'patch', reverse('category-detail', kwargs={'pk': data.category.id}), {'description': data.unique('Updated')},
+        )),
+        Scenario('categories.delete', 'category-detail', lambda data: Call(
+            data.admin, 'delete', reverse('category-detail', kwargs={
+                'pk': Category.objects.create(name=data.unique('Disposable category')).id,
+            }),
+        )),
+        Scenario('search', 'search', get('student', 'search', f'?q={SEARCH_TERM}')),
+        Scenario('exports.enrollments', 'export', get('instructor', 'export', filename=lambda data: 'enrollments.csv')),
+        Scenario('exports.users.gzip', 'export', get('admin', 'export', filename=lambda data: 'users.jsonl.gz')),
+
+        # Resumable uploads
+        Scenario('uploads.create', 'create-upload', lambda data: Call(data.instructor, 'post', reverse('create-upload'), {
+            'filename': 'benchmark.mp4', 'size': len(VIDEO_BYTES),
+        })),
+        Scenario('uploads.status', 'upload-detail', lambda data: Call(
+            data.instructor, 'head', reverse('upload-detail', kwargs={'upload_id': data.new_upload().id}),
+        )),
+        Scenario('uploads.append', 'upload-detail', lambda data: Call(
+            data.instructor, 'patch', reverse('upload-detail', kwargs={'upload_id': data.new_upload().id}),
+            VIDEO_BYTES, format=None, content_type='application/offset+octet-stream', HTTP_UPLOAD_OFFSET='0',
+        )),
+        Scenario('uploads.finalize', 'finalize-upload', lambda data: Call(
+            data.instructor, 'post', reverse('finalize-upload', kwargs={'upload_id': data.new_upload(complete=True).id}),
+            {'lesson': data.new_lesson().id},
+        )),
+        Scenario('uploads.delete', 'upload-detail', lambda data: Call(
+            data.instructor, 'delete', reverse('upload-detail', kwargs={'upload_id': data.new_upload().id}),
+        )),
+
+        # Enrollment
+        Scenario('dashboard.student', 'dashboard', get('student', 'dashboard')),
+        Scenario('dashboard.instructor', 'dashboard', get('instructor', 'dashboard')),
+        Scenario('enrollment.user_courses.student', 'user-courses', get('student', 'user-courses')),
+        Scenario('enrollment.user_courses.instructor', 'user-courses', get('instructor', 'user-courses')),
+        Scenario('enrollment.enroll', 'enroll-course', lambda data: Call(
+            data.new_user(), 'post', reverse('enroll-course', kwargs={'course_id': data.course.id}),
+        )),
+        Scenario('enrollment.check', 'check-enrollment', get('student', 'check-enrollment', course_id=course_id)),
+        Scenario('enrollment.withdraw', 'withdraw-course', lambda data: Call(
+            CourseEnrollment.objects.create(student=data.new_user(), course=data.course).student, 'delete',
+            reverse('withdraw-course', kwargs={'course_id': data.course.id}),
+        )),
+        Scenario('enrollment.course_enrollments', 'course-enrollments', get('instructor', 'course-enrollments', course_id=course_id)),
+        Scenario('requests.create', 'request-enrollment', lambda data: Call(
+            data.new_user(), 'post', reverse('request-enrollment', kwargs={'course_id': data.course.id}), {'message': 'Hello'},
+        )),
+        Scenario('requests.approve', 'approve-enrollment', lambda data: Call(
+            data.instructor, 'post', reverse('approve-enrollment', kwargs={'request_id': data.new_request().id}),
+        )),
+        Scenario('requests.reject', 'reject-enrollment', lambda data: Call(
+            data.instructor, 'post', reverse('reject-enrollment', kwargs={'request_id': data.new_request().id}),
+        )),
+        Scenario('requests.bulk_process', 'bulk-process-enrollment-requests', lambda data: Call(
+            data.instructor, 'post', reverse('bulk-process-enrollment-requests'),
+            {'action': 'approve', 'ids': [data.new_request().id for _ in range(10)]},
+        )),
+        Scenario('requests.list', 'list-enrollment-requests', get('instructor', 'list-enrollment-requests')),
+        Scenario('requests.list.expanded', 'list-enrollment-requests', get('instructor', 'list-enrollment-requests', '?expand=course')),
+        Scenario('requests.student', 'student-enrollment-requests', get('student', 'student-enrollment-requests')),
+        Scenario('requests.check', 'check-enrollment-request', get('student', 'check-enrollment-request', course_id=course_id)),
+        Scenario('requests.withdraw', 'withdraw-enrollment-request', lambda data: (lambda request: Call(
+            request.student, 'delete', reverse('withdraw-enrollment-request', kwargs={'request_id': request.id}),
+        ))(data.new_request())),
+    ]
+
+
+def route_names(urlconfs=URLCONFS):
+    """Every named route of the given URLconfs."""
+    names = set()
+
+    def collect(patterns):
+        for pattern in patterns:
+            if isinstance(pattern, URLResolver):
+                collect(pattern.url_patterns)
+            elif isinstance(pattern, URLPattern) and pattern.name:
+                names.add(pattern.name)
+
+    for urlconf in urlconfs:
+        collect(import_module(urlconf).urlpatterns)
+    return names
+
+
+class QueryCounter:
+    """Counts the queries run through a connection while installed as an execute wrapper."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(percent / 100 * len(ordered)) - 1)]
+
+
+def run_scenario(data, scenario, iterations, warmup, clients):
+    latencies, queries, sizes, statuses = [], [], [], set()
+    for iteration in range(warmup + iterations):
+        call = scenario.prepare(data)
+        client = clients.get(call.user)
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            started = time.perf_counter()
+            response = getattr(client, call.method)(call.path, call.data, format=call.format, **call.extra)
+            # Streamed bodies count, both in time and in size
+            size = len(b''.join(response.streaming_content) if response.streaming else response.content)
+            elapsed = time.perf_counter() - started
+        response.close()
+        if iteration >= warmup:
+            latencies.append(elapsed * 1000)
+            queries.append(counter.count)
+            sizes.append(size)
+            statuses.add(response.status_code)
+    return {
+        'status': sorted(statuses),
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'queries': max(queries),
+        'bytes': max(sizes),
+    }
+
+
+class Clients:
+    """One authenticated API client per user, with a real JWT so authentication is measured too."""
+
+    def __init__(self):
+        self.clients = {}
+
+    def get(self, user):
+        key = user.pk if user else None
+        if key not in self.clients:
+            client = APIClient()
+            if user is not None:
+                client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+            self.clients[key] = client
+        return self.clients[key]
+
+
+def run_benchmark(data, selected, iterations, warmup):
+    """Yield (name, result) for each scenario as it finishes."""
+    clients = Clients()
+    for scenario in selected:
+        yield scenario.name, run_scenario(data, scenario, iterations, warmup, clients)
+
+
+def compare_results(results, baseline, latency_tolerance, query_tolerance, min_latency_delta_ms):
+    """Regressions of `results` against a saved baseline, as human-readable lines."""
+    failures = []
+    for name, expected in baseline.items():
+        actual = results.get(name)
+        if actual is None:
+            continue
+        if actual['status'] != expected['status']:
+            failures.append(f"{name}: status {actual['status']} (baseline {expected['status']})")
+        if actual['queries'] > expected['queries'] + query_tolerance:
+            failures.append(f"{name}: {actual['queries']} queries (baseline {expected['queries']})")
+        latency_limit = expected['p95_ms'] * (1 + latency_tolerance)
+        if actual['p95_ms'] > latency_limit and actual['p95_ms'] - expected['p95_ms'] > min_latency_delta_ms:
+            failures.append(f"{name}: p95 {actual['p95_ms']:.1f} ms (baseline {expected['p95_ms']:.1f} ms)")
+    return failures
+
+
+def run_concurrency(data, readers, writers, duration):
+    """
+    Read the course list from `readers` threads for `duration` seconds while
+    `writers` threads keep enrolling in and withdrawing from courses, each
+    thread with its own connection. Returns the read and write throughput,
+    read latency and failed requests.
+    """
+    course_ids = list(Course.objects.exclude(pk=data.course.pk).order_by('id').values_list('id', flat=True)[:50])
+    students = [data.new_user() for _ in range(writers)]
+    deadline = time.perf_counter() + duration
+    read_latencies, writes, failures = [], [], []
+
+    def read():
+        client = Clients().get(data.student)
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                response = client.get(reverse('course-list'))
+                ok = response.status_code == 200
+            except OperationalError:
+                ok = False
+            if ok:
+                read_latencies.append((time.perf_counter() - started) * 1000)
+            else:
+                failures.append('read')
+
+    def write(student, rng):
+        client = Clients().get(student)
+        while time.perf_counter() < deadline:
+            course_id = rng.choice(course_ids)
+            for method, route, expected in (('post', 'enroll-course', 201), ('delete', 'withdraw-course', 200)):
+                try:
+                    response = getattr(client, method)(reverse(route, kwargs={'course_id': course_id}))
+                    ok = response.status_code == expected
+                except OperationalError:
+                    ok = False
+                (writes if ok else failures).append('write')
+
+    def in_thread(target, *args):
+        try:
+            target(*args)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=in_thread, args=(read,)) for _ in range(readers)]
+    threads += [threading.Thread(target=in_thread, args=(write, student, random.Random(i))) for i, student in enumerate(students)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return {
+        'reads_per_s': round(len(read_latencies) / elapsed, 1),
+        'read_p50_ms': round(percentile(read_latencies, 50), 3) if read_latencies else None,
+        'read_p95_ms': round(percentile(read_latencies, 95), 3) if read_latencies else None,
+        'writes_per_s': round(len(writes) / elapsed, 1),
+        'read_failures': failures.count('read'),
+        'write_failures': failures.count('write'),
+    }
@@ -0,0 +1,67 @@
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .media import media_expiry, sign_lesson_media
+
+# Per-user fields merged into the shared payload at response time; the
+# lessons' media URLs are also signed per user (see courses/media.py)
+PER_USER_FIELDS = ('is_enrolled',)
+
+
+def payload_version_key(course_id):
+    return f'courses:payload-version:{course_id}'
+
+
+def payload_key(request, course_id, version):
+    # File and stream URLs are absolute, so the payload depends on the host
+    return f'courses:payload:{course_id}:{version}:{request.scheme}://{request.get_host()}'
+
+
+async def aget_payload_version(course_id):
+    version = await cache.aget(payload_version_key(course_id))
+    if version is None:
+        version = time.time_ns()
+        await cache.aset(payload_version_key(course_id), version, None)
+    return version
+
+
+def invalidate_course_payload(*course_ids):
+    """
+    Retire every cached payload of the given courses by moving them to a new
+    version once the current transaction commits. Old entries simply expire.
+    """
+    # Before the commit, a reader could still cache the old rows under the new version
+    transaction.on_commit(lambda: retire_course_payloads(course_ids))
+
+
+def retire_course_payloads(course_ids):
+    # Time-based versions never repeat, even if a version key gets evicted
+    version = time.time_ns()
+    cache.set_many({payload_version_key(course_id): version for course_id in course_ids}, None)
+
+
+def shared_payload(serializer_class, instance, context):
+    """The cacheable part of a course representation: everything but the per-user fields."""
+    # An empty enrollment set and unsigned media URLs keep the shared part free of per-user data
+    context = {**context, 'enrolled_courses': set(), 'sign_media': False, 'fields': None, 'expand': {'lessons'}}
+    payload = dict(serializer_class(instance, context=context).data)
+    for field_name in PER_USER_FIELDS:
+        payload.pop(field_name, None)
+    return payload
+
+
+def personalize_payload(payload, is_enrolled, media_allowed, fields, expand):
+    """Merge the per-user fields into a shared payload, sign its media URLs and apply ?fields=."""
+    data = dict(payload)
+    data['is_enrolled'] = is_enrolled
+    if 'lessons' in data:
+        expires = media_expiry()
+        data['lessons'] = [
+            sign_lesson_media(dict(lesson), media_allowed, expires) for lesson in data['lessons']
+        ]
+    if fields is not None:
+        data = {name: value for name, value in data.items() if name in fields or name in expand}
+    return data
+
@@ -0,0 +1,127 @@
+from django.db.models import Q
+
+from .models import Course, CourseEnrollment
+from .sparse_fields import sparse_fields
+
+
+class EnrolledCourses:
+    """
+    Lazily loaded set of course IDs the requesting user is enrolled in.
+
+    One instance is shared by every serializer rendered for a request, so
+    `is_enrolled` costs a single query no matter how many courses are nested.
+    """
+    request_attr = '_enrolled_courses'
+
+    def __init__(self, user):
+        self.user = user
+        self._course_ids = None
+
+    @classmethod
+    def for_request(cls, request):
+        """Return the instance cached on the request, creating it on first use."""
+        enrolled = getattr(request, cls.request_attr, None)
+        if enrolled is None:
+            enrolled = cls(request.user)
+            setattr(request, cls.request_attr, enrolled)
+        return enrolled
+
+    @property
+    def course_ids(self):
+        if self._course_ids is None:
+            if self.user is None or not self.user.is_authenticated:
+                self._course_ids = set()
+            else:
+                self._course_ids = set(
+                    CourseEnrollment.objects.filter(student=self.user).values_list('course_id', flat=True)
+                )
+        return self._course_ids
+
+    def prime(self, course_ids):
+        """Seed the set when the caller already knows the enrollments (skips the query)."""
+        self._course_ids = set(course_ids)
+
+    def __contains__(self, course_id):
+        return course_id in self.course_ids
+
+
+class MediaAccess:
+    """
+    Lazily evaluated set of course IDs whose lesson media the requesting user
+    may get signed URLs for: every course for admins, otherwise the courses
+    they teach or are enrolled in. At most two queries per request.
+    """
+    request_attr = '_media_access'
+
+    def __init__(self, user, enrolled_courses):
+        self.user = user
+        self.enrolled_courses = enrolled_courses
+        self._taught_course_ids = None
+
+    @classmethod
+    def for_request(cls, request):
+        """Return the instance cached on the request, creating it on first use."""
+        access = getattr(request, cls.request_attr, None)
+        if access is None:
+            access = cls(request.user, EnrolledCourses.for_request(request))
+            setattr(request, cls.request_attr, access)
+        return access
+
+    @property
+    def taught_course_ids(self):
+        if self._taught_course_ids is None:
+            self._taught_course_ids = set(Course.objects.filter(instructor=self.user).values_list('id', flat=True))
+        return self._taught_course_ids
+
+    def course_ids(self):
+        """The accessible course IDs, or None for every course (admins)."""
+        if self.user is None or not self.user.is_authenticated:
+            return set()
+        if is_admin(self.user):
+            return None
+        return self.enrolled_courses.course_ids | self.taught_course_ids
+
+    def __contains__(self, course_id):
+        if self.user is None or not self.user.is_authenticated:
+            return False
+        return (
+            is_admin(self.user) or course_id in self.enrolled_courses or course_id in self.taught_course_ids
+        )
+
+
+def is_admin(user):
+    profile = getattr(user, 'profile', None)
+    return profile is not None and profile.role == 'admin'
+
+
+async def amay_access_media(user, course_id):
+    """Whether `user` may get signed media URLs for one course, for async views."""
+    if not user.is_authenticated:
+        return False
+    if is_admin(user):
+        return True
+    return await Course.objects.filter(
+        Q(instructor=user) | Q(enrolled_students__student=user), pk=course_id,
+    ).aexists()
+
+
+def serializer_context(request, **extra):
+    """Build the serializer context used by the course views."""
+    context = {
+        'request': request,
+        'enrolled_courses': EnrolledCourses.for_request(request),
+        'media_access': MediaAccess.for_request(request),
+    }
+    context.update(sparse_fields(request))
+    context.update(extra)
+    return context
+
+
+class EnrolledCoursesContextMixin:
+    """Viewset mixin that adds the shared `EnrolledCourses` and `MediaAccess` to the serializer context."""
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['enrolled_courses'] = EnrolledCourses.for_request(self.request)
+        context['media_access'] = MediaAccess.for_request(self.request)
+        return context
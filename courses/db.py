@@ -0,0 +1,47 @@
+import random
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.db import OperationalError, transaction
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    """Apply the SQLite pragmas of settings.SQLITE_TUNING to every new connection."""
+    config = settings.SQLITE_TUNING
+    if connection.vendor != 'sqlite' or not config['ENABLED']:
+        return
+    with connection.cursor() as cursor:
+        for name, value in config['PRAGMAS'].items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def is_lock_error(exc):
+    # SQLITE_BUSY ("database is locked") and SQLITE_LOCKED ("database table is locked")
+    return isinstance(exc, OperationalError) and 'is locked' in str(exc)
+
+
+def retry_on_lock(func):
+    """
+    Run `func` in a transaction, and run it again after a randomized, doubling
+    pause when SQLite still reports the database locked once busy_timeout has
+    run out. Only for views whose whole effect is in the database, since a
+    failed attempt is rolled back and repeated. Inside an outer transaction the
+    error is raised straight away: that transaction cannot be retried from here.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        config = settings.SQLITE_TUNING
+        for attempt in range(config['WRITE_RETRIES'] + 1):
+            try:
+                with transaction.atomic():
+                    return func(*args, **kwargs)
+            except OperationalError as exc:
+                retryable = is_lock_error(exc) and not transaction.get_connection().in_atomic_block
+                if not retryable or attempt == config['WRITE_RETRIES']:
+                    raise
+            time.sleep(config['RETRY_BACKOFF'] * 2 ** attempt * random.uniform(0.5, 1.5))
+    return wrapper
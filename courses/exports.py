@@ -0,0 +1,140 @@
+"""
+CSV and JSONL exports of enrollments, enrollment requests and users, shared by
+the `api/exports/` endpoint and `manage.py export_data`.
+
+Rows are read in keyset-paginated batches of plain values, each batch its own
+short query, so an export of any size runs in constant memory and never holds
+a read transaction open on the database for its whole length.
+"""
+import csv
+import datetime
+import io
+import json
+import zlib
+
+from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import CourseEnrollment, CourseEnrollmentRequest
+
+FORMATS = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+DEFAULT_BATCH_SIZE = 2000
+
+
+class Export:
+    """A model and the columns exported for it, as (header, ORM lookup) pairs; the first is the primary key."""
+
+    def __init__(self, model, columns, course_lookup=None):
+        self.model = model
+        self.columns = columns
+        self.course_lookup = course_lookup  # Path to the course, for scoping to an instructor or one course
+
+    @property
+    def header(self):
+        return [name for name, _ in self.columns]
+
+    def queryset(self, instructor=None, course_id=None):
+        queryset = self.model.objects.all()
+        if instructor is not None:
+            queryset = queryset.filter(**{f'{self.course_lookup}__instructor': instructor})
+        if course_id is not None:
+            queryset = queryset.filter(**{self.course_lookup: course_id})
+        return queryset
+
+
+EXPORTS = {
+    'enrollments': Export(CourseEnrollment, [
+        ('id', 'id'),
+        ('course_id', 'course_id'),
+        ('course_title', 'course__title'),
+        ('student_id', 'student_id'),
+        ('student_username', 'student__username'),
+        ('student_email', 'student__email'),
+        ('enrolled_at', 'enrolled_at'),
+    ], course_lookup='course'),
+    'requests': Export(CourseEnrollmentRequest, [
+        ('id', 'id'),
+        ('course_id', 'course_id'),
+        ('course_title', 'course__title'),
+        ('student_id', 'student_id'),
+        ('student_username', 'student__username'),
+        ('status', 'status'),
+        ('message', 'message'),
+        ('requested_at', 'requested_at'),
+    ], course_lookup='course'),
+    'users': Export(User, [
+        ('id', 'id'),
+        ('username', 'username'),
+        ('email', 'email'),
+        ('first_name', 'first_name'),
+        ('last_name', 'last_name'),
+        ('role', 'profile__role'),
+        ('phone_number', 'profile__phone_number'),
+        ('is_staff', 'is_staff'),
+        ('date_joined', 'date_joined'),
+    ]),
+}
+
+
+def export_batches(export, queryset, batch_size=DEFAULT_BATCH_SIZE):
+    """Yield lists of value tuples in primary key order, one query per batch."""
+    lookups = [lookup for _, lookup in export.columns]
+    queryset = queryset.order_by('pk').values_list(*lookups)
+    last_pk = None
+    while True:
+        batch = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        rows = list(batch[:batch_size])
+        if rows:
+            yield rows
+        if len(rows) < batch_size:
+            return
+        last_pk = rows[-1][0]
+
+
+# Spreadsheets run cells starting with these as formulas
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def csv_value(value):
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    # User-controlled text such as request messages must not become a formula
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def csv_chunks(header, batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for rows in batches:
+        writer.writerows([csv_value(value) for value in row] for row in rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    # The header alone, when there are no rows
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def jsonl_chunks(header, batches):
+    for rows in batches:
+        yield ''.join(json.dumps(dict(zip(header, row)), cls=DjangoJSONEncoder) + '\n' for row in rows).encode()
+
+
+def gzip_chunks(chunks):
+    """Compress a byte stream into a gzip file on the fly."""
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_chunks(export, queryset, file_format, compress=False, batch_size=DEFAULT_BATCH_SIZE):
+    """The export as an iterator of byte chunks, one per batch of rows."""
+    encode = csv_chunks if file_format == 'csv' else jsonl_chunks
+    chunks = encode(export.header, export_batches(export, queryset, batch_size))
+    return gzip_chunks(chunks) if compress else chunks
@@ -0,0 +1,104 @@
+import json
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from courses.benchmark import compare_results, isolated_settings, route_names, run_benchmark, scenarios, seed_dataset
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway database with a synthetic dataset, call every API route and report "
+        "p50/p95 latency, SQL query count and response size. Optionally save the results as a "
+        "baseline, or fail when they regress against one."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=int, default=10000, help="Number of users to seed (default 10000).")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed for the dataset.")
+        parser.add_argument('--iterations', type=int, default=20, help="Measured requests per scenario.")
+        parser.add_argument('--warmup', type=int, default=2, help="Unmeasured requests per scenario first.")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Rows per INSERT while seeding.")
+        parser.add_argument('--only', default='', help="Comma-separated scenario name prefixes to run.")
+        parser.add_argument('--save', metavar='PATH', help="Write the results to PATH as a JSON baseline.")
+        parser.add_argument('--check', metavar='PATH', help="Fail if the results regress against the baseline at PATH.")
+        parser.add_argument('--latency-tolerance', type=float, default=0.25,
+                            help="Allowed p95 slowdown as a fraction of the baseline (default 0.25).")
+        parser.add_argument('--min-latency-delta', type=float, default=2.0,
+                            help="Ignore p95 slowdowns smaller than this many milliseconds (default 2).")
+        parser.add_argument('--query-tolerance', type=int, default=0,
+                            help="Allowed extra queries per request (default 0).")
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['check']:
+            try:
+                with open(options['check']) as baseline_file:
+                    baseline = json.load(baseline_file)
+            except (OSError, ValueError) as exc:
+                raise CommandError(f"Could not read the baseline: {exc}")
+
+        selected = scenarios()
+        prefixes = [prefix for prefix in options['only'].split(',') if prefix]
+        if prefixes:
+            selected = [scenario for scenario in selected if scenario.name.startswith(tuple(prefixes))]
+        else:
+            uncovered = route_names() - {scenario.route for scenario in selected}
+            if uncovered:
+                self.stderr.write(self.style.WARNING(f"Routes without a scenario: {', '.join(sorted(uncovered))}"))
+
+        results = self.measure(selected, options)
+
+        meta = {
+            'scale': options['scale'],
+            'seed': options['seed'],
+            'iterations': options['iterations'],
+            'database': connection.vendor,
+            'created_at': timezone.now().isoformat(),
+        }
+        if options['save']:
+            with open(options['save'], 'w') as baseline_file:
+                json.dump({'meta': meta, 'results': results}, baseline_file, indent=2, sort_keys=True)
+            self.stdout.write(f"Saved the baseline to {options['save']}")
+
+        if baseline is not None:
+            for key in ('scale', 'seed', 'database'):
+                if baseline['meta'].get(key) != meta[key]:
+                    self.stderr.write(self.style.WARNING(
+                        f"The baseline was recorded with {key}={baseline['meta'].get(key)}, this run used {meta[key]}."
+                    ))
+            failures = compare_results(
+                results, baseline['results'], options['latency_tolerance'],
+                options['query_tolerance'], options['min_latency_delta'],
+            )
+            if failures:
+                raise CommandError("Regressions against the baseline:\n  " + "\n  ".join(failures))
+            self.stdout.write(self.style.SUCCESS("No regressions against the baseline."))
+
+    def measure(self, selected, options):
+        """Run the scenarios against a fresh test database, isolated from real media, caches and workers."""
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with tempfile.TemporaryDirectory() as media_root, isolated_settings(media_root):
+                data = seed_dataset(
+                    options['scale'], seed=options['seed'], batch_size=options['batch_size'],
+                    log=lambda message: self.stdout.write(message),
+                )
+                self.stdout.write(f"{'scenario':<40} {'status':>8} {'p50 ms':>9} {'p95 ms':>9} {'queries':>8} {'bytes':>9}")
+                results = {}
+                for name, result in run_benchmark(data, selected, options['iterations'], options['warmup']):
+                    results[name] = result
+                    status = ','.join(str(code) for code in result['status'])
+                    self.stdout.write(
+                        f"{name:<40} {status:>8} {result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} "
+                        f"{result['queries']:>8} {result['bytes']:>9}"
+                    )
+                return results
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
@@ -0,0 +1,83 @@
+import logging
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from courses.benchmark import isolated_settings, run_concurrency, seed_dataset
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure course list reads against a throwaway SQLite file, alone and while other threads "
+        "enroll and withdraw, with Django's default SQLite setup and with settings.SQLITE_TUNING."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=int, default=2000, help="Number of users to seed (default 2000).")
+        parser.add_argument('--readers', type=int, default=4, help="Reading threads (default 4).")
+        parser.add_argument('--writers', type=int, default=2, help="Writing threads (default 2).")
+        parser.add_argument('--duration', type=float, default=5.0, help="Seconds per phase (default 5).")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError("This benchmark needs the SQLite backend.")
+
+        default_options = {
+            key: value for key, value in connection.settings_dict['OPTIONS'].items() if key != 'transaction_mode'
+        }
+        profiles = [
+            ('default', {**settings.SQLITE_TUNING, 'ENABLED': False, 'WRITE_RETRIES': 0}, default_options),
+            ('tuned', {**settings.SQLITE_TUNING, 'ENABLED': True}, connection.settings_dict['OPTIONS']),
+        ]
+        self.stdout.write(
+            f"{'profile':<10} {'phase':<14} {'reads/s':>9} {'p50 ms':>9} {'p95 ms':>9} "
+            f"{'writes/s':>9} {'failed':>7}"
+        )
+        # Failed requests are counted; their tracebacks would drown the table
+        request_logger = logging.getLogger('django.request')
+        old_level = request_logger.level
+        request_logger.setLevel(logging.CRITICAL)
+        try:
+            for name, tuning, db_options in profiles:
+                self.report(name, self.measure(tuning, db_options, options))
+        finally:
+            request_logger.setLevel(old_level)
+
+    def report(self, name, results):
+        for phase, result in results:
+            failed = result['read_failures'] + result['write_failures']
+            p50 = f"{result['read_p50_ms']:.2f}" if result['read_p50_ms'] is not None else '-'
+            p95 = f"{result['read_p95_ms']:.2f}" if result['read_p95_ms'] is not None else '-'
+            self.stdout.write(
+                f"{name:<10} {phase:<14} {result['reads_per_s']:>9} {p50:>9} {p95:>9} "
+                f"{result['writes_per_s']:>9} {failed:>7}"
+            )
+
+    def measure(self, tuning, db_options, options):
+        """
+        Yield (phase, result) for reads alone and reads during writes, on a fresh
+        database file: the journal mode sticks to the file, so profiles can't share one.
+        """
+        setup_test_environment()
+        settings_dict = connection.settings_dict
+        old_name, old_options, old_test_name = settings_dict['NAME'], settings_dict['OPTIONS'], settings_dict['TEST']['NAME']
+        with tempfile.TemporaryDirectory() as workdir, isolated_settings(os.path.join(workdir, 'media')), \
+                override_settings(SQLITE_TUNING=tuning):
+            # Threads open their own connections from these settings
+            settings_dict['OPTIONS'] = db_options
+            settings_dict['TEST']['NAME'] = os.path.join(workdir, 'benchmark.sqlite3')
+            connection.close()
+            connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                data = seed_dataset(options['scale'], log=lambda message: None)
+                connection.close()
+                yield 'reads', run_concurrency(data, options['readers'], 0, options['duration'])
+                yield 'reads+writes', run_concurrency(data, options['readers'], options['writers'], options['duration'])
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+                settings_dict['OPTIONS'], settings_dict['TEST']['NAME'] = old_options, old_test_name
+                teardown_test_environment()
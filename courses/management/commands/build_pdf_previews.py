@@ -0,0 +1,36 @@
+import shutil
+
+from django.core.management.base import BaseCommand, CommandError
+
+from courses.models import Lesson
+from courses.pdf import pdf_processing_available, process_lesson_pdf
+
+
+class Command(BaseCommand):
+    help = "Extract the page text and previews of lesson PDFs that have not been processed yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Reprocess every PDF, replacing stored results.")
+
+    def handle(self, *args, **options):
+        if not pdf_processing_available():
+            raise CommandError("The PDF backend is not available; install pypdfium2 or set PDF_BACKEND.")
+        lessons = Lesson.objects.exclude(pdf_file='').exclude(pdf_file__isnull=True)
+        if not options['all']:
+            lessons = lessons.exclude(pdf_status=Lesson.PDF_READY)
+        storage = Lesson._meta.get_field('pdf_file').storage
+
+        cleared = set()
+        count = 0
+        for lesson_id, pdf_name in lessons.values_list('id', 'pdf_file').iterator():
+            if options['all'] and pdf_name not in cleared:
+                # Lessons sharing the file share its results: clear them once
+                shutil.rmtree(storage.path(storage.derived_dir(pdf_name)), ignore_errors=True)
+                cleared.add(pdf_name)
+            process_lesson_pdf(lesson_id, pdf_name)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f"Processed {count} PDF(s)."))
+
+        failed = Lesson.objects.filter(pdf_status=Lesson.PDF_FAILED).count()
+        if failed:
+            self.stderr.write(self.style.WARNING(f"{failed} lesson PDF(s) could not be processed."))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from courses.models import LessonUpload
+
+
+class Command(BaseCommand):
+    help = "Delete lesson upload sessions (and their partial files) that have expired."
+
+    def handle(self, *args, **options):
+        expired = LessonUpload.objects.filter(expires_at__lte=timezone.now())
+        count = 0
+        # Delete one by one so each session's partial file is removed too
+        for upload in expired.iterator():
+            upload.delete()
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f"Removed {count} expired upload session(s)."))
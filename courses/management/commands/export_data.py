@@ -0,0 +1,38 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from courses.exports import DEFAULT_BATCH_SIZE, EXPORTS, FORMATS, export_chunks
+
+
+class Command(BaseCommand):
+    help = "Export enrollments, enrollment requests or users as CSV or JSONL, optionally gzip-compressed."
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(EXPORTS))
+        parser.add_argument('--format', dest='file_format', choices=sorted(FORMATS), default='csv')
+        parser.add_argument('--gzip', action='store_true', help="Compress the output with gzip.")
+        parser.add_argument('--output', '-o', default='-', help="File to write, '-' for standard output (default).")
+        parser.add_argument('--course', type=int, help="Only this course (enrollments and requests).")
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help="Rows per query.")
+
+    def handle(self, *args, **options):
+        export = EXPORTS[options['kind']]
+        if options['course'] is not None and export.course_lookup is None:
+            raise CommandError("--course only applies to enrollments and requests.")
+        chunks = export_chunks(
+            export, export.queryset(course_id=options['course']), options['file_format'],
+            compress=options['gzip'], batch_size=options['batch_size'],
+        )
+
+        if options['output'] == '-':
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
+            return
+        size = 0
+        with open(options['output'], 'wb') as output:
+            for chunk in chunks:
+                output.write(chunk)
+                size += len(chunk)
+        self.stderr.write(f"Wrote {size} bytes to {options['output']}")
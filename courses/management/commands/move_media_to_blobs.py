@@ -0,0 +1,72 @@
+import posixpath
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from auth_app.authentication import invalidate_cached_user
+from auth_app.models import Profile
+from courses.cache import invalidate_course_payload
+from courses.models import Course, Lesson
+from courses.storage import blob_fields, count_references, release_blob
+
+
+class Command(BaseCommand):
+    help = (
+        "Move files uploaded before content-addressed storage was enabled into it, "
+        "so identical files are kept once, and delete the originals. "
+        "Lesson files stored under the public blob prefix move to the private one."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Only report what would be moved.")
+
+    def handle(self, *args, **options):
+        moved = 0
+        course_ids, user_ids = set(), set()
+        for model, fields in blob_fields().items():
+            for field in fields:
+                storage = field.storage
+                legacy = model._base_manager.exclude(
+                    Q(**{f'{field.name}__isnull': True}) | Q(**{field.name: ''})
+                    | Q(**{f'{field.name}__startswith': storage.prefix + '/'})
+                )
+                for pk, name in legacy.values_list('pk', field.attname).iterator():
+                    if not storage.exists(name):
+                        self.stderr.write(self.style.WARNING(f"{model.__name__} {pk}: {name} is missing, skipped"))
+                        continue
+                    if options['dry_run']:
+                        self.stdout.write(f"{model.__name__} {pk}: {name}")
+                        moved += 1
+                        continue
+
+                    with storage.open(name) as file:
+                        blob_name = storage.save(posixpath.basename(name), file, max_length=field.max_length)
+                    # Only if the row still has the old file, and without the save signals
+                    updated = model._base_manager.filter(pk=pk, **{field.attname: name}).update(**{field.attname: blob_name})
+                    storage.unclaim(blob_name)
+                    if updated:
+                        moved += 1
+                        name_field = getattr(field, 'name_field', None)
+                        if name_field:
+                            # The blob may carry another upload's name; keep this row's own
+                            model._base_manager.filter(pk=pk, **{name_field: ''}).update(**{name_field: posixpath.basename(name)})
+                        if model is Lesson:
+                            course_ids.add(Lesson.objects.values_list('course_id', flat=True).get(pk=pk))
+                        elif model is Profile:
+                            user_ids.add(Profile.objects.values_list('user_id', flat=True).get(pk=pk))
+                    else:
+                        release_blob(storage, blob_name)
+                    if count_references(name) == 0:
+                        storage.delete(name)
+
+        if course_ids:
+            # Lesson payloads carry the file names and URLs
+            Course.objects.filter(id__in=course_ids).bump_version()
+            invalidate_course_payload(*course_ids)
+        for user_id in user_ids:
+            invalidate_cached_user(user_id)
+
+        if options['dry_run']:
+            self.stdout.write(f"{moved} file(s) would be moved.")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Moved {moved} file(s)."))
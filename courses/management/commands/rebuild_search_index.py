@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from courses.search import rebuild_index, search_available
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index over courses, lessons and categories."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if not search_available():
+            raise CommandError("Full-text search needs the SQLite database backend.")
+        count = rebuild_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} document(s)."))
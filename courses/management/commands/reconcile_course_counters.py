@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from courses.cache import invalidate_course_payload
+from courses.models import Course
+
+
+class Command(BaseCommand):
+    help = "Recount the lesson, enrollment and pending request counters stored on each course."
+
+    def handle(self, *args, **options):
+        drifted = Course.objects.reconcile_counters()
+        if drifted:
+            invalidate_course_payload(*drifted)
+        self.stdout.write(self.style.SUCCESS(f"Fixed the counters of {len(drifted)} course(s)."))
@@ -0,0 +1,354 @@
+"""
+Delivery of lesson videos and PDFs, and of the PDFs' page previews and text.
+
+Lesson files and their HLS streams are only reachable through
+`lessons/<id>/media/...` URLs signed with an HMAC of the URL path and an
+expiry time. The API issues them (see LessonSerializer) to the course's instructor, admins and
+enrolled students only, so serving a file needs no database check beyond
+finding its name. Depending on MEDIA_SIGNING['DELIVERY'], the bytes are
+then streamed by Django or handed off to the front web server with
+X-Accel-Redirect (nginx) or X-Sendfile (Apache, lighttpd).
+"""
+import mimetypes
+import posixpath
+import re
+import time
+from urllib.parse import quote, urlencode, urlsplit
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseForbidden
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.crypto import constant_time_compare, salted_hmac
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from django.views.decorators.http import require_http_methods
+from django.views.static import serve
+
+from .models import Lesson
+from .pdf import pages_name, pdf_processing_available, preview_name, process_lesson_pdf
+from .storage import get_lesson_file_storage
+from .tasks import run_in_background
+
+# URL kind -> Lesson file field
+LESSON_MEDIA_FIELDS = {
+    'video': 'video_file',
+    'pdf': 'pdf_file',
+}
+
+# Lesson representation fields holding media URLs (or lists of them) to sign
+MEDIA_URL_FIELDS = (
+    'video_file', 'video_stream_url', 'video_manifest_url',
+    'pdf_file', 'pdf_stream_url', 'pdf_text_url', 'pdf_preview_urls',
+)
+
+SIGNATURE_SALT = 'courses.media.lesson_media'
+
+STREAM_BLOCK_SIZE = 64 * 1024
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+PLAYLIST_CONTENT_TYPE = 'application/vnd.apple.mpegurl'
+# URIs inside HLS tags, e.g. #EXT-X-MAP:URI="init.mp4"
+PLAYLIST_URI_RE = re.compile(r'URI="([^"]+)"')
+
+
+class RangeFile:
+    """File wrapper that reads at most `length` bytes starting at `start`."""
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.file.seek(start)
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range_header(header, size):
+    """
+    Parse a single `bytes=` range into an inclusive (start, end) pair.
+
+    Returns None when the header should be ignored (missing, malformed or
+    multi-range) and raises ValueError when the range is unsatisfiable.
+    """
+    if not header:
+        return None
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        suffix = int(last)
+        if suffix == 0:
+            raise ValueError('Unsatisfiable range')
+        return max(size - suffix, 0), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError('Unsatisfiable range')
+    return start, min(end, size - 1)
+
+
+def file_etag(size, modified):
+    return quote_etag(f'{int(modified.timestamp() * 1000000):x}-{size:x}')
+
+
+def if_range_matches(request, etag, last_modified):
+    """A Range is only honoured if If-Range (when sent) still names this version."""
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        return if_range == etag
+    date = parse_http_date_safe(if_range)
+    return date is not None and int(last_modified) <= date
+
+
+def serve_file_range(request, storage, name):
+    """
+    Serve a stored file with ETag/Last-Modified validators and single byte-range
+    support. Files are streamed in blocks and never loaded into memory.
+    """
+    try:
+        size = storage.size(name)
+        modified = storage.get_modified_time(name)
+    except (FileNotFoundError, NotImplementedError):
+        raise Http404('File not found.')
+
+    etag = file_etag(size, modified)
+    last_modified = modified.timestamp()
+    validators = {'ETag': etag, 'Last-Modified': http_date(last_modified), 'Accept-Ranges': 'bytes'}
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=int(last_modified))
+    if not_modified is not None:
+        for header, value in validators.items():
+            not_modified.headers[header] = value
+        return not_modified
+
+    byte_range = None
+    if if_range_matches(request, etag, last_modified):
+        try:
+            byte_range = parse_range_header(request.META.get('HTTP_RANGE'), size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response.headers['Content-Range'] = f'bytes */{size}'
+            return response
+
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    file = storage.open(name, 'rb')
+    if byte_range is None:
+        response = FileResponse(file, content_type=content_type)
+        response.headers['Content-Length'] = size
+    else:
+        start, end = byte_range
+        response = FileResponse(RangeFile(file, start, end - start + 1), status=206, content_type=content_type)
+        response.headers['Content-Length'] = end - start + 1
+        response.headers['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response.block_size = STREAM_BLOCK_SIZE
+    for header, value in validators.items():
+        response.headers[header] = value
+    return response
+
+
+def media_expiry(now=None):
+    """
+    Expiry (Unix time) of the URLs issued now: MEDIA_SIGNING['TTL'] from now,
+    rounded up to MEDIA_SIGNING['GRANULARITY'] so they only change that often.
+    """
+    step = int(settings.MEDIA_SIGNING['GRANULARITY'].total_seconds())
+    ttl = int(settings.MEDIA_SIGNING['TTL'].total_seconds())
+    now = int(time.time() if now is None else now)
+    return -(-(now + ttl) // step) * step
+
+
+def media_urls_issued_since(expires):
+    """When URLs with this expiry started being issued (for Last-Modified)."""
+    return expires - int(settings.MEDIA_SIGNING['TTL'].total_seconds() + settings.MEDIA_SIGNING['GRANULARITY'].total_seconds())
+
+
+def media_signature(path, expires):
+    return salted_hmac(SIGNATURE_SALT, f'{path}:{expires}', algorithm='sha256').hexdigest()
+
+
+def sign_media_url(url, expires=None):
+    """Add an expiry and the signature of the URL's path to a media URL."""
+    if expires is None:
+        expires = media_expiry()
+    query = urlencode({'expires': expires, 'signature': media_signature(urlsplit(url).path, expires)})
+    return f'{url}?{query}'
+
+
+def sign_lesson_media(representation, allowed, expires=None):
+    """
+    Sign the media URLs of a serialized lesson in place, or blank them when
+    the user may not have them (see courses.context.MediaAccess).
+    """
+    for field_name in MEDIA_URL_FIELDS:
+        value = representation.get(field_name)
+        if isinstance(value, list):
+            representation[field_name] = [sign_media_url(url, expires) for url in value] if allowed else []
+        elif value:
+            representation[field_name] = sign_media_url(value, expires) if allowed else None
+    return representation
+
+
+def signed_expiry(request):
+    """The expiry of the request's valid, unexpired signature, or None."""
+    try:
+        expires = int(request.GET['expires'])
+    except (KeyError, ValueError):
+        return None
+    if expires < time.time():
+        return None
+    if not constant_time_compare(request.GET.get('signature', ''), media_signature(request.path, expires)):
+        return None
+    return expires
+
+
+def deliver_file(request, storage, name, expires):
+    """Serve a stored file the way MEDIA_SIGNING['DELIVERY'] says, privately cacheable until `expires`."""
+    delivery = settings.MEDIA_SIGNING['DELIVERY']
+    if delivery == 'django':
+        response = serve_file_range(request, storage, name)
+    else:
+        # The front server takes over from here, Range requests and validators included
+        content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        response = HttpResponse(content_type=content_type)
+        if delivery == 'x-accel-redirect':
+            response['X-Accel-Redirect'] = settings.MEDIA_SIGNING['INTERNAL_URL'] + quote(name)
+        elif delivery == 'x-sendfile':
+            response['X-Sendfile'] = storage.path(name)
+        else:
+            raise ImproperlyConfigured(f"Unknown MEDIA_SIGNING['DELIVERY']: {delivery!r}")
+    # Anyone holding the URL may use it until it expires, but shared caches should not
+    patch_cache_control(response, private=True, max_age=max(expires - int(time.time()), 0))
+    return response
+
+
+@require_http_methods(['GET', 'HEAD'])
+def lesson_media(request, lesson_id, kind):
+    """Serve a lesson's video or PDF, with HTTP Range support, to holders of a signed URL."""
+    field_name = LESSON_MEDIA_FIELDS.get(kind)
+    if field_name is None:
+        raise Http404('Unknown media type.')
+    expires = signed_expiry(request)
+    if expires is None:
+        return HttpResponseForbidden('Missing, invalid or expired signature.')
+    lesson = get_object_or_404(Lesson.objects.only('id', field_name), id=lesson_id)
+    field_file = getattr(lesson, field_name)
+    if not field_file:
+        raise Http404('This lesson has no such file.')
+    return deliver_file(request, field_file.storage, field_file.name, expires)
+
+
+def serve_pdf_result(request, lesson_id, name_for):
+    """
+    Serve a file derived from a lesson's PDF, `name_for(storage, pdf_name)`.
+    A PDF that has never been processed is queued on this first request.
+    """
+    expires = signed_expiry(request)
+    if expires is None:
+        return HttpResponseForbidden('Missing, invalid or expired signature.')
+    lesson = get_object_or_404(Lesson.objects.only('id', 'pdf_file', 'pdf_status'), id=lesson_id)
+    pdf_file = lesson.pdf_file
+    if not pdf_file:
+        raise Http404('This lesson has no PDF.')
+
+    if lesson.pdf_status == Lesson.PDF_READY:
+        return deliver_file(request, pdf_file.storage, name_for(pdf_file.storage, pdf_file.name), expires)
+    if lesson.pdf_status == Lesson.PDF_FAILED:
+        raise Http404('This PDF could not be processed.')
+    if lesson.pdf_status == Lesson.PDF_NONE:
+        if not pdf_processing_available():
+            raise Http404('PDF processing is not available.')
+        # Uploaded before PDFs were processed; only the request that flips the status queues it
+        unprocessed = Lesson.objects.filter(id=lesson_id, pdf_file=pdf_file.name, pdf_status=Lesson.PDF_NONE)
+        if unprocessed.update(pdf_status=Lesson.PDF_PENDING):
+            run_in_background(process_lesson_pdf, lesson_id, pdf_file.name)
+    response = HttpResponse('This PDF is being processed.', status=503, content_type='text/plain')
+    response['Retry-After'] = settings.PDF_PROCESSING['RETRY_AFTER']
+    return response
+
+
+@require_http_methods(['GET', 'HEAD'])
+def lesson_pdf_pages(request, lesson_id):
+    """The text of every page of a lesson's PDF, as JSON ({page_count, previews, pages})."""
+    return serve_pdf_result(request, lesson_id, pages_name)
+
+
+@require_http_methods(['GET', 'HEAD'])
+def lesson_pdf_preview(request, lesson_id, page):
+    """A low-resolution image of one page of a lesson's PDF."""
+    return serve_pdf_result(request, lesson_id, lambda storage, name: preview_name(storage, name, page))
+
+
+def sign_playlist(request, playlist, expires):
+    """
+    Point every URI of an HLS playlist at its own signed URL, with the expiry of
+    the playlist's URL, so players can fetch renditions and segments directly.
+    """
+    directory = posixpath.dirname(request.path)
+
+    def signed(uri):
+        if urlsplit(uri).scheme or uri.startswith('/'):
+            return uri
+        return sign_media_url(request.build_absolute_uri(posixpath.normpath(posixpath.join(directory, uri))), expires)
+
+    lines = []
+    for line in playlist.splitlines():
+        if line.startswith('#'):
+            line = PLAYLIST_URI_RE.sub(lambda match: f'URI="{signed(match.group(1))}"', line)
+        elif line.strip():
+            line = signed(line.strip())
+        lines.append(line)
+    return '\n'.join(lines) + '\n'
+
+
+@require_http_methods(['GET', 'HEAD'])
+def lesson_video_stream(request, lesson_id, path):
+    """
+    Serve a file of a lesson's HLS stream (`path` relative to its master
+    playlist) to holders of a signed URL. Playlists are rewritten so the files
+    they list are signed as well.
+    """
+    expires = signed_expiry(request)
+    if expires is None:
+        return HttpResponseForbidden('Missing, invalid or expired signature.')
+    lesson = get_object_or_404(Lesson.objects.only('id', 'video_status', 'video_manifest'), id=lesson_id)
+    path = posixpath.normpath(path)
+    if lesson.video_status != Lesson.VIDEO_READY or not lesson.video_manifest or path.startswith(('/', '..')):
+        raise Http404('This lesson has no such stream file.')
+    storage = get_lesson_file_storage()
+    name = posixpath.join(posixpath.dirname(lesson.video_manifest), path)
+
+    if not name.endswith('.m3u8'):
+        return deliver_file(request, storage, name, expires)
+    try:
+        with storage.open(name, 'rb') as file:
+            playlist = file.read().decode()
+    except FileNotFoundError:
+        raise Http404('This lesson has no such stream file.')
+    response = HttpResponse(sign_playlist(request, playlist, expires), content_type=PLAYLIST_CONTENT_TYPE)
+    patch_cache_control(response, private=True, max_age=max(expires - int(time.time()), 0))
+    return response
+
+
+def public_media(request, path, document_root=None, show_indexes=False):
+    """`django.views.static.serve` for MEDIA_URL in development, minus the lesson files and streams."""
+    name = posixpath.normpath(path).lstrip('/')
+    if get_lesson_file_storage().is_blob(name) or name.startswith(settings.VIDEO_TRANSCODING['OUTPUT_DIR'] + '/'):
+        raise Http404('Lesson files are only served through signed URLs.')
+    return serve(request, path, document_root, show_indexes)
@@ -0,0 +1,145 @@
+import logging
+import random
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from functools import lru_cache
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger('courses.sql')
+
+# Literals and placeholders, so the same statement with other values counts as one
+LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|%s|\?")
+IN_LIST_RE = re.compile(r'\bIN \(\?(?:, \?)*\)')
+SQL_PREVIEW_LENGTH = 200
+
+
+@lru_cache(maxsize=1024)
+def normalize_sql(sql):
+    """Statement text with every value replaced by `?` and IN lists collapsed."""
+    return IN_LIST_RE.sub('IN (...)', LITERAL_RE.sub('?', sql))
+
+
+class QueryRecorder:
+    """Execute wrapper counting the queries of one request, their total time and repeats."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.statements[sql] += 1
+
+    def repeated(self, threshold):
+        """Normalized statements that ran more than `threshold` times: likely N+1 queries."""
+        totals = Counter()
+        for sql, count in self.statements.items():
+            totals[normalize_sql(sql)] += count
+        return [(sql, count) for sql, count in totals.most_common() if count > threshold]
+
+
+@contextmanager
+def recording(recorder):
+    """Install `recorder` as an execute wrapper on every database connection."""
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        yield
+
+
+class SQLInstrumentationMiddleware:
+    """
+    Record the number of SQL queries and the time spent in the database for a
+    sample of requests (settings.SQL_INSTRUMENTATION). The totals go into a
+    `Server-Timing` header and a log line on the `courses.sql` logger, and
+    statements repeated more than N_PLUS_ONE_THRESHOLD times are logged as
+    likely N+1 queries.
+
+    Queries run while a streaming response is being consumed are not counted.
+    The middleware works in both sync and async mode, so under ASGI the async
+    views keep running on the event loop while it is enabled.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        config = settings.SQL_INSTRUMENTATION
+        if not config['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        self.sample_rate = config['SAMPLE_RATE']
+        self.threshold = config['N_PLUS_ONE_THRESHOLD']
+        self.server_timing = config['SERVER_TIMING_HEADER']
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with recording(recorder):
+            response = self.get_response(request)
+        return self.report(request, response, recorder, started)
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+
+        # Connections are per thread and the async ORM queries from the thread
+        # sync_to_async uses for this request, so the wrappers go on that thread's
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        stack = ExitStack()
+        await sync_to_async(stack.enter_context)(recording(recorder))
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        return self.report(request, response, recorder, started)
+
+    def sampled(self):
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def report(self, request, response, recorder, started):
+        total_ms = (time.perf_counter() - started) * 1000
+        db_ms = recorder.duration * 1000
+
+        if self.server_timing:
+            timing = f'db;dur={db_ms:.1f};desc="{recorder.count} queries", app;dur={total_ms:.1f}'
+            if response.has_header('Server-Timing'):
+                timing = f"{response['Server-Timing']}, {timing}"
+            response['Server-Timing'] = timing
+
+        fields = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': recorder.count,
+            'db_ms': round(db_ms, 1),
+            'total_ms': round(total_ms, 1),
+        }
+        logger.info(' '.join(f'{name}={value}' for name, value in fields.items()), extra={'sql': fields})
+        for sql, count in recorder.repeated(self.threshold):
+            logger.warning(
+                "Possible N+1: %s %s ran %d times: %s",
+                request.method, request.path, count, sql[:SQL_PREVIEW_LENGTH],
+                extra={'sql': {**fields, 'repeated': count, 'statement': sql}},
+            )
+        return response
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.6 on 2026-10-18 07:37
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0007_courseenrollmentrequest'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['created_at', 'id'], name='courses_cou_created_7ad857_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='courseenrollment',
+            index=models.Index(fields=['course', 'enrolled_at', 'id'], name='courses_cou_course__4cd598_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='courseenrollmentrequest',
+            index=models.Index(fields=['requested_at', 'id'], name='courses_cou_request_4d291b_idx'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+from django.db import migrations
+
+CREATE_SQL = """
+CREATE VIRTUAL TABLE IF NOT EXISTS courses_search_index USING fts5(
+    kind UNINDEXED,
+    object_id UNINDEXED,
+    course_id UNINDEXED,
+    title,
+    body,
+    tokenize = 'porter unicode61 remove_diacritics 2'
+)
+"""
+
+# rowid = object_id * 3 + kind code (see courses/search.py)
+POPULATE_SQL = [
+    """
+    INSERT INTO courses_search_index (rowid, kind, object_id, course_id, title, body)
+    SELECT id * 3 + 0, 'course', id, id, title, description FROM courses_course
+    """,
+    """
+    INSERT INTO courses_search_index (rowid, kind, object_id, course_id, title, body)
+    SELECT id * 3 + 1, 'lesson', id, course_id, title, description FROM courses_lesson
+    """,
+    """
+    INSERT INTO courses_search_index (rowid, kind, object_id, course_id, title, body)
+    SELECT id * 3 + 2, 'category', id, NULL, name, COALESCE(description, '') FROM courses_category
+    """,
+]
+
+
+def create_search_index(apps, schema_editor):
+    # FTS5 is SQLite-only; other databases simply get no search index
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(CREATE_SQL)
+    for statement in POPULATE_SQL:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TABLE IF EXISTS courses_search_index')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0010_lesson_video_streams'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
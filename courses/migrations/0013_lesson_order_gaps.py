@@ -0,0 +1,37 @@
+# Generated by Django 5.1.6 on 2026-10-18 07:51
+
+from django.db import migrations, models
+
+ORDER_GAP = 1024  # courses.ordering.ORDER_GAP at the time of this migration
+
+
+def space_lesson_orders(apps, schema_editor):
+    # Existing orders may repeat within a course; keep their relative order
+    # (ties broken by id) and spread them out before the unique index exists
+    Lesson = apps.get_model('courses', 'Lesson')
+    lessons = list(Lesson.objects.order_by('course_id', 'order', 'id').only('id', 'course_id', 'order'))
+    position, course_id = 0, None
+    for lesson in lessons:
+        position = position + 1 if lesson.course_id == course_id else 1
+        course_id = lesson.course_id
+        lesson.order = position * ORDER_GAP
+    Lesson.objects.bulk_update(lessons, ['order'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0012_course_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(space_lesson_orders, migrations.RunPython.noop),
+        migrations.AlterModelOptions(
+            name='lesson',
+            options={'ordering': ['order']},
+        ),
+        migrations.AddConstraint(
+            model_name='lesson',
+            constraint=models.UniqueConstraint(fields=('course', 'order'), name='unique_lesson_order'),
+        ),
+    ]
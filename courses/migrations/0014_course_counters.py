@@ -0,0 +1,51 @@
+# Generated by Django 5.1.6 on 2026-10-18 07:53
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def count_existing_rows(apps, schema_editor):
+    Course = apps.get_model('courses', 'Course')
+
+    def related_count(model_name, **filters):
+        model = apps.get_model('courses', model_name)
+        rows = model.objects.filter(course=models.OuterRef('pk'), **filters).order_by().values('course')
+        return Coalesce(models.Subquery(rows.annotate(count=models.Count('pk')).values('count')), 0)
+
+    Course.objects.update(
+        lesson_count=related_count('Lesson'),
+        enrollment_count=related_count('CourseEnrollment'),
+        pending_request_count=related_count('CourseEnrollmentRequest', status='pending'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0013_lesson_order_gaps'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='enrollment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='lesson_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='pending_request_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(count_existing_rows, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['-enrollment_count', '-id'], name='course_popularity_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.6 on 2026-10-18 08:15
+
+import courses.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0014_course_counters'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='lesson',
+            name='pdf_file',
+            field=models.FileField(blank=True, max_length=255, null=True, storage=courses.storage.get_upload_storage, upload_to='pdfs/'),
+        ),
+        migrations.AlterField(
+            model_name='lesson',
+            name='video_file',
+            field=models.FileField(blank=True, max_length=255, null=True, storage=courses.storage.get_upload_storage, upload_to='videos/'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.6 on 2026-10-18 08:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0016_lesson_file_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lesson',
+            name='pdf_page_count',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='pdf_preview_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='pdf_status',
+            field=models.CharField(choices=[('none', 'No PDF'), ('pending', 'Pending'), ('processing', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed')], default='none', max_length=10),
+        ),
+    ]
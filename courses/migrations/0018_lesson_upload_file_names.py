@@ -0,0 +1,34 @@
+# Generated by Django 5.1.6 on 2026-10-18 08:45
+
+import courses.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0017_lesson_pdf_processing'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lesson',
+            name='pdf_file_name',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='video_file_name',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='lesson',
+            name='pdf_file',
+            field=courses.storage.UploadNameFileField(blank=True, max_length=255, name_field='pdf_file_name', null=True, storage=courses.storage.get_lesson_file_storage, upload_to='pdfs/'),
+        ),
+        migrations.AlterField(
+            model_name='lesson',
+            name='video_file',
+            field=courses.storage.UploadNameFileField(blank=True, max_length=255, name_field='video_file_name', null=True, storage=courses.storage.get_lesson_file_storage, upload_to='videos/'),
+        ),
+    ]
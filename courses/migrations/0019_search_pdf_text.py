@@ -0,0 +1,77 @@
+from django.db import migrations
+
+# Lesson PDF text moves out of `body` into its own column, so searches can
+# leave it out for users who may not see the lesson's media
+CREATE_SQL = """
+CREATE VIRTUAL TABLE courses_search_index USING fts5(
+    kind UNINDEXED,
+    object_id UNINDEXED,
+    course_id UNINDEXED,
+    title,
+    body,
+    pdf_text,
+    tokenize = 'porter unicode61 remove_diacritics 2'
+)
+"""
+
+# rowid = object_id * 3 + kind code (see courses/search.py). PDF text is added
+# by `manage.py rebuild_search_index`, as lessons are re-indexed
+POPULATE_SQL = [
+    """
+    INSERT INTO courses_search_index (rowid, kind, object_id, course_id, title, body, pdf_text)
+    SELECT id * 3 + 0, 'course', id, id, title, description, '' FROM courses_course
+    """,
+    """
+    INSERT INTO courses_search_index (rowid, kind, object_id, course_id, title, body, pdf_text)
+    SELECT id * 3 + 1, 'lesson', id, course_id, title, description, '' FROM courses_lesson
+    """,
+    """
+    INSERT INTO courses_search_index (rowid, kind, object_id, course_id, title, body, pdf_text)
+    SELECT id * 3 + 2, 'category', id, NULL, name, COALESCE(description, ''), '' FROM courses_category
+    """,
+]
+
+OLD_CREATE_SQL = """
+CREATE VIRTUAL TABLE courses_search_index USING fts5(
+    kind UNINDEXED,
+    object_id UNINDEXED,
+    course_id UNINDEXED,
+    title,
+    body,
+    tokenize = 'porter unicode61 remove_diacritics 2'
+)
+"""
+
+
+def add_pdf_text_column(apps, schema_editor):
+    # FTS5 tables cannot be altered, so the index is recreated
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TABLE IF EXISTS courses_search_index')
+    schema_editor.execute(CREATE_SQL)
+    for statement in POPULATE_SQL:
+        schema_editor.execute(statement)
+
+
+def remove_pdf_text_column(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('ALTER TABLE courses_search_index RENAME TO courses_search_index_pdf')
+    schema_editor.execute(OLD_CREATE_SQL)
+    # Without the PDF text, which `manage.py rebuild_search_index` adds back
+    schema_editor.execute(
+        'INSERT INTO courses_search_index (rowid, kind, object_id, course_id, title, body) '
+        'SELECT rowid, kind, object_id, course_id, title, body FROM courses_search_index_pdf'
+    )
+    schema_editor.execute('DROP TABLE courses_search_index_pdf')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0018_lesson_upload_file_names'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_pdf_text_column, remove_pdf_text_column),
+    ]
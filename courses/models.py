@@ -1,13 +1,58 @@
+import os
+import uuid
+
+from django.conf import settings
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+from .storage import UploadNameFileField, get_lesson_file_storage
 
 class Category(models.Model):
     name = models.CharField(max_length=100, unique=True)
     description = models.TextField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
 
+def related_count(model, **filters):
+    """Subquery counting the rows of `model` that belong to the outer course."""
+    rows = model.objects.filter(course=models.OuterRef('pk'), **filters).order_by().values('course')
+    return Coalesce(models.Subquery(rows.annotate(count=models.Count('pk')).values('count')), 0)
+
+
+class CourseQuerySet(models.QuerySet):
+    def bump_version(self, **changes):
+        """
+        Mark courses as changed when something nested in them (lessons, enrollments)
+        changes. `changes` are applied in the same UPDATE, e.g. counter increments.
+        """
+        return self.update(version=models.F('version') + 1, updated_at=timezone.now(), **changes)
+
+    def with_actual_counts(self):
+        return self.annotate(
+            actual_lesson_count=related_count(Lesson),
+            actual_enrollment_count=related_count(CourseEnrollment),
+            actual_pending_request_count=related_count(CourseEnrollmentRequest, status='pending'),
+        )
+
+    def reconcile_counters(self):
+        """Recount the denormalized counters of courses that have drifted. Returns their IDs."""
+        drifted = list(self.with_actual_counts().exclude(
+            lesson_count=models.F('actual_lesson_count'),
+            enrollment_count=models.F('actual_enrollment_count'),
+            pending_request_count=models.F('actual_pending_request_count'),
+        ).values_list('id', flat=True))
+        if drifted:
+            Course.objects.filter(id__in=drifted).bump_version(
+                lesson_count=related_count(Lesson),
+                enrollment_count=related_count(CourseEnrollment),
+                pending_request_count=related_count(CourseEnrollmentRequest, status='pending'),
+            )
+        return drifted
+
 class Course(models.Model):
     title = models.CharField(max_length=255)
     description = models.TextField()
@@ -15,20 +60,111 @@ class Course(models.Model):
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True, related_name='courses')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Bumped with updated_at whenever lessons or enrollments change (used for ETags)
+    version = models.PositiveIntegerField(default=1)
+
+    # Denormalized counters, maintained by courses.signals with F() updates
+    lesson_count = models.PositiveIntegerField(default=0)
+    enrollment_count = models.PositiveIntegerField(default=0)
+    pending_request_count = models.PositiveIntegerField(default=0)
+
+    # Only ever changed in place by UPDATE queries, so a plain save must not
+    # write back the (possibly stale) values loaded with the instance
+    MAINTAINED_FIELDS = ('version', 'lesson_count', 'enrollment_count', 'pending_request_count')
+
+    objects = CourseQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id']),  # Keyset pagination
+            models.Index(fields=['-enrollment_count', '-id'], name='course_popularity_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            skipped = set(self.MAINTAINED_FIELDS) | self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.attname for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in skipped
+            ]
+        super().save(*args, **kwargs)
+
 class Lesson(models.Model):
+    VIDEO_NONE = 'none'
+    VIDEO_PENDING = 'pending'
+    VIDEO_PROCESSING = 'processing'
+    VIDEO_READY = 'ready'
+    VIDEO_FAILED = 'failed'
+    VIDEO_STATUS_CHOICES = [
+        (VIDEO_NONE, 'No video'),
+        (VIDEO_PENDING, 'Pending'),
+        (VIDEO_PROCESSING, 'Processing'),
+        (VIDEO_READY, 'Ready'),
+        (VIDEO_FAILED, 'Failed'),
+    ]
+    PDF_NONE = 'none'
+    PDF_PENDING = 'pending'
+    PDF_PROCESSING = 'processing'
+    PDF_READY = 'ready'
+    PDF_FAILED = 'failed'
+    PDF_STATUS_CHOICES = [
+        (PDF_NONE, 'No PDF'),
+        (PDF_PENDING, 'Pending'),
+        (PDF_PROCESSING, 'Processing'),
+        (PDF_READY, 'Ready'),
+        (PDF_FAILED, 'Failed'),
+    ]
+
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='lessons')
     title = models.CharField(max_length=255)
     description = models.TextField()
     order = models.PositiveIntegerField()  # To order lessons within a course
 
     # Video and PDF fields
-    video_file = models.FileField(upload_to='videos/', blank=True, null=True)  # Optional
-    pdf_file = models.FileField(upload_to='pdfs/', blank=True, null=True)  # Optional
-    
+    # Content-addressed, so a file uploaded to several lessons is stored once (see courses/storage.py),
+    # and kept out of the public media URLs (see courses/media.py)
+    video_file = UploadNameFileField(upload_to='videos/', storage=get_lesson_file_storage, max_length=255, blank=True, null=True, name_field='video_file_name')  # Optional
+    pdf_file = UploadNameFileField(upload_to='pdfs/', storage=get_lesson_file_storage, max_length=255, blank=True, null=True, name_field='pdf_file_name')  # Optional
+    # Names the files were uploaded with; a shared file is stored under its first uploader's name
+    video_file_name = models.CharField(max_length=255, blank=True, default='')
+    pdf_file_name = models.CharField(max_length=255, blank=True, default='')
+
+    # Adaptive (HLS) streams produced from video_file in the background
+    video_status = models.CharField(max_length=10, choices=VIDEO_STATUS_CHOICES, default=VIDEO_NONE)
+    video_manifest = models.CharField(max_length=255, blank=True, default='')  # Media-relative master playlist
+    video_renditions = models.JSONField(default=list, blank=True)
+
+    # Page text and preview images extracted from pdf_file in the background, stored next to it
+    pdf_status = models.CharField(max_length=10, choices=PDF_STATUS_CHOICES, default=PDF_NONE)
+    pdf_page_count = models.PositiveIntegerField(null=True, blank=True)
+    pdf_preview_count = models.PositiveIntegerField(default=0)  # Previews exist for the first N pages
+
+    # File names as last loaded/saved, used to spot new uploads
+    _saved_video_name = ''
+    _saved_pdf_name = ''
+    # Course as last loaded/saved, used to spot a move to another course
+    _saved_course_id = None
+
+    class Meta:
+        ordering = ['order']
+        constraints = [
+            # Orders are spaced out (see courses.ordering), never shared within a course
+            models.UniqueConstraint(fields=['course', 'order'], name='unique_lesson_order'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'video_file' in instance.__dict__:
+            instance._saved_video_name = instance.__dict__['video_file'] or ''
+        if 'pdf_file' in instance.__dict__:
+            instance._saved_pdf_name = instance.__dict__['pdf_file'] or ''
+        instance._saved_course_id = instance.__dict__.get('course_id')
+        return instance
+
     def __str__(self):
         return self.title
 
@@ -40,6 +176,9 @@ class CourseEnrollment(models.Model):
 
     class Meta:
         unique_together = ('student', 'course')  # Ensure a student can't enroll in the same course twice
+        indexes = [
+            models.Index(fields=['course', 'enrolled_at', 'id']),  # Keyset pagination per course
+        ]
 
     def __str__(self):
         return f"{self.student.username} enrolled in {self.course.title}"
@@ -53,9 +192,60 @@ class CourseEnrollmentRequest(models.Model):
     status = models.CharField(max_length=10, choices=[('pending', 'Pending'), ('approved', 'Approved'), ('rejected', 'Rejected')], default='pending')
     requested_at = models.DateTimeField(auto_now_add=True)
 
+    # Status as last loaded/saved, used to keep Course.pending_request_count in step
+    _saved_status = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_status = instance.__dict__.get('status')
+        return instance
+
     class Meta:
         unique_together = ('student', 'course')  # Ensure a student can't request the same course twice
+        indexes = [
+            models.Index(fields=['requested_at', 'id']),  # Keyset pagination
+        ]
 
     def __str__(self):
-        return f"{self.student.username} requested to enroll in {self.course.title}"    
+        return f"{self.student.username} requested to enroll in {self.course.title}"
+
+
+class LessonUpload(models.Model):
+    """A resumable lesson video upload, assembled on disk one chunk at a time."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='lesson_uploads')
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()  # Total size announced by the client
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.owner.username})"
+
+    @property
+    def temp_path(self):
+        return os.path.join(settings.LESSON_UPLOADS['TEMP_DIR'], f'{self.id}.part')
+
+    @property
+    def offset(self):
+        """Bytes received so far; the partial file on disk is the source of truth."""
+        try:
+            return os.path.getsize(self.temp_path)
+        except FileNotFoundError:
+            return 0
+
+    @property
+    def is_complete(self):
+        return self.offset == self.size
+
+    @property
+    def is_expired(self):
+        return self.expires_at <= timezone.now()
 
+    def delete(self, *args, **kwargs):
+        try:
+            os.remove(self.temp_path)
+        except FileNotFoundError:
+            pass
+        return super().delete(*args, **kwargs)
@@ -0,0 +1,80 @@
+from django.db import transaction
+from django.db.models import Max
+
+from .cache import invalidate_course_payload
+from .models import Course, Lesson
+
+# Lessons are numbered GAP, 2 * GAP, ... so a lesson can be inserted between
+# two others by taking the midpoint, without touching its neighbours
+ORDER_GAP = 1024
+
+
+def order_after(course_id, after_order):
+    """
+    A free order value right after `after_order` (0 for the first position),
+    or None when there is no gap left there.
+    """
+    next_order = (
+        Lesson.objects.filter(course_id=course_id, order__gt=after_order)
+        .order_by('order').values_list('order', flat=True).first()
+    )
+    if next_order is None:
+        return after_order + ORDER_GAP
+    if next_order - after_order > 1:
+        return (after_order + next_order) // 2
+    return None
+
+
+def allocate_order(course_id, after=None):
+    """
+    Pick the order of a new lesson: at the end of the course by default, or
+    right after the lesson `after` (0 for the first position). The course is
+    renumbered only when there is no gap left at that position.
+
+    Call inside a transaction; the course row is locked where the database
+    supports it, and the unique (course, order) index catches the rest.
+    """
+    Course.objects.select_for_update().filter(id=course_id).first()
+    if after is None:
+        last_order = Lesson.objects.filter(course_id=course_id).aggregate(last=Max('order'))['last']
+        return (last_order or 0) + ORDER_GAP
+
+    after_order = 0
+    if after:
+        after_order = Lesson.objects.filter(course_id=course_id, id=after).values_list('order', flat=True).first()
+        if after_order is None:
+            raise Lesson.DoesNotExist(f"Lesson {after} is not part of this course.")
+    order = order_after(course_id, after_order)
+    if order is None:
+        lesson_ids = list(Lesson.objects.filter(course_id=course_id).order_by('order', 'id').values_list('id', flat=True))
+        apply_lesson_order(course_id, lesson_ids)
+        position = lesson_ids.index(after) + 1 if after else 0
+        order = position * ORDER_GAP + ORDER_GAP // 2
+    return order
+
+
+def apply_lesson_order(course_id, lesson_ids):
+    """
+    Renumber a course's lessons to follow `lesson_ids`, spaced ORDER_GAP apart.
+    Returns the updated lessons in their new order.
+    """
+    lessons = {lesson.id: lesson for lesson in Lesson.objects.filter(course_id=course_id).only('id', 'order')}
+    targets = {lesson_id: (position + 1) * ORDER_GAP for position, lesson_id in enumerate(lesson_ids)}
+    changed = [lessons[lesson_id] for lesson_id, order in targets.items() if lessons[lesson_id].order != order]
+
+    with transaction.atomic():
+        if changed:
+            # The unique index is checked row by row, so park the moving lessons
+            # above every current and target value before setting the final ones
+            parking = max([ORDER_GAP * len(lesson_ids)] + [lesson.order for lesson in lessons.values()]) + 1
+            for offset, lesson in enumerate(changed):
+                lesson.order = parking + offset
+            Lesson.objects.bulk_update(changed, ['order'])
+            for lesson in changed:
+                lesson.order = targets[lesson.id]
+            Lesson.objects.bulk_update(changed, ['order'])
+            # Bulk writes skip the model signals that normally refresh the course
+            Course.objects.filter(id=course_id).bump_version()
+            invalidate_course_payload(course_id)
+
+    return [lessons[lesson_id] for lesson_id in lesson_ids]
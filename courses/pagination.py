@@ -0,0 +1,172 @@
+import base64
+import datetime
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from .streaming import streaming_json_response
+
+PAGINATION_DEFAULTS = {
+    'PAGE_SIZE': 50,
+    'MAX_PAGE_SIZE': 200,
+    # When True, clients get a bare list unless they ask for pages with ?paginate=true
+    'BARE_LIST_DEFAULT': False,
+    # Rows fetched and serialized at a time when a bare list is streamed
+    'STREAM_CHUNK_SIZE': 500,
+}
+
+
+def pagination_setting(name):
+    return getattr(settings, 'API_PAGINATION', {}).get(name, PAGINATION_DEFAULTS[name])
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination keyed on a stable ordering such as ('-created_at', '-id').
+
+    The cursor is an opaque token holding the ordering values of the last row
+    of the previous page, so every page is a single indexed range scan and
+    page N costs the same as page 1. The last ordering field must be unique.
+
+    Clients that still expect a bare list can pass ?paginate=false.
+    """
+    ordering = ('-id',)
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    paginate_query_param = 'paginate'
+    invalid_cursor_message = 'Invalid cursor.'
+
+    def __init__(self, ordering=None):
+        if ordering is not None:
+            self.ordering = tuple(ordering)
+
+    def pagination_enabled(self, request):
+        value = request.query_params.get(self.paginate_query_param)
+        if value is None:
+            return not pagination_setting('BARE_LIST_DEFAULT')
+        return value.lower() not in ('false', '0', 'no')
+
+    def get_ordering(self, view):
+        return tuple(getattr(view, 'pagination_ordering', self.ordering))
+
+    def get_page_size(self, request):
+        page_size = pagination_setting('PAGE_SIZE')
+        value = request.query_params.get(self.page_size_query_param)
+        if value:
+            try:
+                page_size = int(value)
+            except ValueError:
+                pass
+        return max(1, min(page_size, pagination_setting('MAX_PAGE_SIZE')))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.pagination_enabled(request):
+            return None
+
+        self.request = request
+        self.ordering = self.get_ordering(view)
+        self.page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request, queryset.model)
+        if position is not None:
+            queryset = queryset.filter(self.keyset_filter(position))
+
+        # Fetch one extra row to find out whether there is a next page
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        results = results[:self.page_size]
+        self.next_position = self.get_position(results[-1]) if self.has_next else None
+        return results
+
+    def keyset_filter(self, position):
+        """Rows strictly after `position` in the ordering: (a > x) OR (a = x AND b > y) ..."""
+        condition = Q()
+        equal = Q()
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def get_position(self, instance):
+        position = []
+        for field in self.ordering:
+            value = getattr(instance, field.lstrip('-'))
+            if isinstance(value, (datetime.datetime, datetime.date)):
+                value = value.isoformat()
+            position.append(value)
+        return position
+
+    def encode_cursor(self, position):
+        token = base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+        return token.rstrip('=')
+
+    def decode_cursor(self, request, model):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            padded = token + '=' * (-len(token) % 4)
+            position = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        # A decodable cursor may still hold values of the wrong type for the ordering fields
+        values = []
+        for field, value in zip(self.ordering, position):
+            try:
+                value = model._meta.get_field(field.lstrip('-')).to_python(value)
+            except (ValidationError, TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+            if value is None:
+                raise NotFound(self.invalid_cursor_message)
+            values.append(value)
+        return values
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+def paginated_response(request, queryset, serializer_class, ordering, context=None):
+    """
+    Paginate a queryset from a function view the same way the viewsets do.
+    Without pagination the whole list is streamed, so memory stays flat however
+    many rows there are.
+    """
+    paginator = KeysetPagination(ordering=ordering)
+    page = paginator.paginate_queryset(queryset, request)
+    if page is None:
+        return streaming_json_response(
+            queryset.order_by(*ordering), serializer_class, context,
+            chunk_size=pagination_setting('STREAM_CHUNK_SIZE'),
+        )
+    serializer = serializer_class(page, many=True, context=context or {})
+    return paginator.get_paginated_response(serializer.data)
@@ -0,0 +1,205 @@
+"""
+Page text and preview images of lesson PDFs.
+
+A background job reads every page of a lesson's PDF once, when it is
+uploaded or, for older files, when its previews or text are first asked for
+(see courses/media.py). The results are written next to the stored file, in
+its `.derived/` directory: `pages.json` with the text of each page and
+`page-<n>.<ext>` previews of the first PREVIEW_PAGES pages. Lesson files are
+content-addressed, so lessons sharing a PDF share these too, and they are
+deleted along with it.
+"""
+import io
+import json
+import logging
+import os
+import posixpath
+import tempfile
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+from PIL import Image
+
+from .models import Lesson
+
+try:
+    import pypdfium2 as pdfium
+except ImportError:  # Optional; without it PDFs are not processed at all
+    pdfium = None
+
+logger = logging.getLogger(__name__)
+
+PAGES_FILE = 'pages.json'
+
+# Pillow format name and file extension per preview format
+PREVIEW_FORMATS = {
+    'webp': ('WEBP', 'webp'),
+    'jpeg': ('JPEG', 'jpg'),
+}
+
+
+class PdfProcessingError(Exception):
+    pass
+
+
+class PdfiumBackend:
+    """Extract text and render pages with pypdfium2, an optional dependency."""
+
+    available = pdfium is not None
+
+    def __init__(self, preview_width):
+        self.preview_width = preview_width
+
+    def pages(self, source_path, preview_pages):
+        """Yield (text, PIL image or None) for every page; only the first `preview_pages` are rendered."""
+        if pdfium is None:
+            raise PdfProcessingError("pypdfium2 is not installed")
+        try:
+            document = pdfium.PdfDocument(source_path)
+        except pdfium.PdfiumError as exc:
+            raise PdfProcessingError(f"Could not open the PDF: {exc}")
+
+        try:
+            for index in range(len(document)):
+                page = document[index]
+                text_page = page.get_textpage()
+                text = text_page.get_text_range()
+                text_page.close()
+                image = None
+                if index < preview_pages:
+                    bitmap = page.render(scale=self.preview_width / page.get_width())
+                    image = bitmap.to_pil().convert('RGB')
+                    bitmap.close()
+                page.close()
+                yield text, image
+        finally:
+            document.close()
+
+
+class StubPdfBackend:
+    """
+    Treats every PDF as one blank page without text, without reading it. For
+    local runs without pypdfium2.
+    """
+
+    available = True
+
+    def __init__(self, preview_width):
+        self.preview_width = preview_width
+
+    def pages(self, source_path, preview_pages):
+        image = Image.new('RGB', (self.preview_width, self.preview_width * 297 // 210), 'white')  # A4 portrait
+        yield '', image if preview_pages > 0 else None
+
+
+def get_pdf_backend():
+    config = settings.PDF_PROCESSING
+    backend_class = import_string(config['BACKEND'])
+    return backend_class(config['PREVIEW_WIDTH'], **config.get('OPTIONS', {}))
+
+
+def pdf_processing_available():
+    """False when the configured backend lacks its optional dependency; PDFs are then left unprocessed."""
+    return getattr(import_string(settings.PDF_PROCESSING['BACKEND']), 'available', True)
+
+
+def pages_name(storage, pdf_name):
+    return posixpath.join(storage.derived_dir(pdf_name), PAGES_FILE)
+
+
+def preview_name(storage, pdf_name, page):
+    extension = PREVIEW_FORMATS[settings.PDF_PROCESSING['PREVIEW_FORMAT']][1]
+    return posixpath.join(storage.derived_dir(pdf_name), f'page-{page}.{extension}')
+
+
+def read_pages(storage, pdf_name):
+    """The stored `pages.json` of a PDF ({page_count, previews, pages}), or None if it has not been processed."""
+    try:
+        with storage.open(pages_name(storage, pdf_name), 'rb') as file:
+            return json.load(file)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def lesson_pdf_text(lesson):
+    """The extracted text of a lesson's PDF for the search index, empty until it has been processed."""
+    if lesson.pdf_status != Lesson.PDF_READY or not lesson.pdf_file:
+        return ''
+    pages = read_pages(lesson.pdf_file.storage, lesson.pdf_file.name)
+    if pages is None:
+        return ''
+    return '\n'.join(pages['pages'])[:settings.PDF_PROCESSING['SEARCH_TEXT_LIMIT']]
+
+
+def write_file(path, data):
+    """Write a file atomically, so readers never see a partial one."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(descriptor, 'wb') as file:
+        file.write(data)
+    os.replace(temp_path, path)
+
+
+def extract_pages(storage, pdf_name):
+    """Extract the text and render the previews of a stored PDF. Returns the `pages.json` content."""
+    config = settings.PDF_PROCESSING
+    pillow_format = PREVIEW_FORMATS[config['PREVIEW_FORMAT']][0]
+    texts, previews = [], 0
+    for text, image in get_pdf_backend().pages(storage.path(pdf_name), config['PREVIEW_PAGES']):
+        texts.append(text)
+        if image is not None:
+            previews += 1
+            buffer = io.BytesIO()
+            image.save(buffer, pillow_format, quality=config['PREVIEW_QUALITY'])
+            write_file(storage.path(preview_name(storage, pdf_name, previews)), buffer.getvalue())
+
+    pages = {'page_count': len(texts), 'previews': previews, 'pages': texts}
+    # Written last: its presence marks the results as complete
+    write_file(storage.path(pages_name(storage, pdf_name)), json.dumps(pages).encode())
+    return pages
+
+
+def record_pdf_state(lesson_id, source_name, **values):
+    """
+    Save PDF results on the lesson if it still has `source_name`. Saving (not
+    `update()`) lets the signals bump the course version, drop its cached
+    payload and re-index the lesson with its PDF text.
+    """
+    with transaction.atomic():
+        lesson = Lesson.objects.filter(id=lesson_id, pdf_file=source_name).first()
+        if lesson is None:
+            return False
+        for field_name, value in values.items():
+            setattr(lesson, field_name, value)
+        lesson.save(update_fields=list(values))
+    return True
+
+
+def process_lesson_pdf(lesson_id, source_name):
+    """
+    Background task: extract the page text and previews of a lesson's PDF.
+
+    Results already stored for the same file are reused. Nothing is recorded
+    if the lesson's PDF was replaced in the meantime.
+    """
+    lesson = Lesson.objects.filter(id=lesson_id).first()
+    if lesson is None or lesson.pdf_file.name != source_name:
+        return
+    storage = lesson.pdf_file.storage
+
+    pages = read_pages(storage, source_name)
+    if pages is None:
+        if not record_pdf_state(lesson_id, source_name, pdf_status=Lesson.PDF_PROCESSING):
+            return
+        try:
+            pages = extract_pages(storage, source_name)
+        except Exception as exc:
+            logger.warning("Processing the PDF of lesson %s failed: %s", lesson_id, exc)
+            record_pdf_state(lesson_id, source_name, pdf_status=Lesson.PDF_FAILED)
+            return
+
+    record_pdf_state(
+        lesson_id, source_name,
+        pdf_status=Lesson.PDF_READY, pdf_page_count=pages['page_count'], pdf_preview_count=pages['previews'],
+    )
@@ -0,0 +1,179 @@
+import html
+import re
+
+from django.db import connection
+
+from .models import Category, Course, Lesson
+from .pdf import lesson_pdf_text
+
+SEARCH_TABLE = 'courses_search_index'
+
+# Each indexed object gets rowid = object_id * len(KINDS) + kind code, so
+# incremental updates are a rowid lookup instead of a table scan
+KINDS = {
+    'course': 0,
+    'lesson': 1,
+    'category': 2,
+}
+
+# Matches in titles count for more than matches in descriptions
+TITLE_WEIGHT = 10.0
+BODY_WEIGHT = 1.0
+PDF_TEXT_WEIGHT = 0.5
+
+# The columns everyone may search; pdf_text only matches for users with
+# access to the lesson's media, so its text never reaches other users' snippets
+PUBLIC_COLUMNS = '{title body}'
+
+DOCUMENT_COLUMNS = 'rowid, kind, object_id, course_id, title, body, pdf_text'
+
+SNIPPET_TOKENS = 16
+MAX_RESULTS = 50
+
+# snippet() copies the indexed text as is; it marks matches with these
+# private-use characters, which become <mark> tags once the text is escaped
+MATCH_START = '\ue000'
+MATCH_END = '\ue001'
+
+TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def search_available():
+    return connection.vendor == 'sqlite'
+
+
+def row_id(kind, object_id):
+    return object_id * len(KINDS) + KINDS[kind]
+
+
+def document_for(instance):
+    """(kind, course_id, title, body, pdf_text) for an indexed model instance."""
+    if isinstance(instance, Course):
+        return 'course', instance.id, instance.title, instance.description, ''
+    if isinstance(instance, Lesson):
+        return 'lesson', instance.course_id, instance.title, instance.description, lesson_pdf_text(instance)
+    if isinstance(instance, Category):
+        return 'category', None, instance.name, instance.description or '', ''
+    raise TypeError(f"{type(instance).__name__} is not searchable")
+
+
+def index_object(instance):
+    if not search_available():
+        return
+    kind, course_id, title, body, pdf_text = document_for(instance)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [row_id(kind, instance.id)])
+        cursor.execute(
+            f'INSERT INTO {SEARCH_TABLE} ({DOCUMENT_COLUMNS}) VALUES (%s, %s, %s, %s, %s, %s, %s)',
+            [row_id(kind, instance.id), kind, instance.id, course_id, title, body, pdf_text],
+        )
+
+
+def remove_object(instance):
+    if not search_available():
+        return
+    kind = document_for(instance)[0]
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [row_id(kind, instance.id)])
+
+
+def rebuild_index(batch_size=1000):
+    """Re-index every course, lesson and category. Returns the number of documents."""
+    if not search_available():
+        return 0
+    count = 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        for model in (Course, Lesson, Category):
+            batch = []
+            for instance in model.objects.all().iterator(chunk_size=batch_size):
+                kind, course_id, title, body, pdf_text = document_for(instance)
+                batch.append([row_id(kind, instance.id), kind, instance.id, course_id, title, body, pdf_text])
+                if len(batch) >= batch_size:
+                    count += insert_documents(cursor, batch)
+                    batch = []
+            count += insert_documents(cursor, batch)
+        # Merge the index b-trees after a bulk load
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')")
+    return count
+
+
+def insert_documents(cursor, rows):
+    if rows:
+        cursor.executemany(
+            f'INSERT INTO {SEARCH_TABLE} ({DOCUMENT_COLUMNS}) VALUES (%s, %s, %s, %s, %s, %s, %s)', rows,
+        )
+    return len(rows)
+
+
+def build_match_query(text):
+    """
+    Turn free text into a safe FTS5 query: every word must match, and the
+    last word also matches as a prefix (search-as-you-type).
+    """
+    terms = TERM_RE.findall(text)
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def highlight(snippet):
+    """HTML-escape a snippet, keeping only the <mark> tags around matches."""
+    return html.escape(snippet).replace(MATCH_START, '<mark>').replace(MATCH_END, '</mark>')
+
+
+def search(text, kinds=None, limit=20, pdf_course_ids=None):
+    """
+    Ranked matches as dicts with kind, id, course_id, title and a highlighted snippet.
+
+    Lessons match on the text of their PDFs only in `pdf_course_ids`, the
+    courses whose media the user may see; None means every course (admins).
+    """
+    match = build_match_query(text)
+    if match is None or not search_available():
+        return []
+
+    columns = (
+        f'SELECT kind, object_id, course_id, title, '
+        f"snippet({SEARCH_TABLE}, -1, '{MATCH_START}', '{MATCH_END}', '…', {SNIPPET_TOKENS}), "
+        # One weight per column; kind, object_id and course_id are not searched
+        f'bm25({SEARCH_TABLE}, 0, 0, 0, {TITLE_WEIGHT}, {BODY_WEIGHT}, {PDF_TEXT_WEIGHT}) AS rank '
+        f'FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s'
+    )
+    kind_filter, kind_params = '', []
+    if kinds:
+        kind_filter = f' AND kind IN ({", ".join(["%s"] * len(kinds))})'
+        kind_params = list(kinds)
+
+    if pdf_course_ids is None:
+        sql, params = columns + kind_filter, [match, *kind_params]
+    else:
+        # Everything on its titles and descriptions, except the lessons of the
+        # accessible courses, which the second query matches on their PDFs too
+        course_ids = sorted(pdf_course_ids)
+        accessible = f"kind = 'lesson' AND course_id IN ({', '.join(['%s'] * len(course_ids))})"
+        sql = columns + kind_filter
+        params = [f'{PUBLIC_COLUMNS} : ({match})', *kind_params]
+        if course_ids:
+            sql += f' AND NOT ({accessible}) UNION ALL ' + columns + kind_filter + f' AND {accessible}'
+            params += [*course_ids, match, *kind_params, *course_ids]
+    sql += ' ORDER BY rank LIMIT %s'
+    params.append(min(limit, MAX_RESULTS))
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    return [
+        {
+            'type': kind,
+            'id': object_id,
+            'course_id': course_id,
+            'title': title,
+            'snippet': highlight(snippet),
+            # bm25() is lower-is-better; flip it so clients can sort descending
+            'score': round(-rank, 4),
+        }
+        for kind, object_id, course_id, title, snippet, rank in rows
+    ]
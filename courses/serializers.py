@@ -1,47 +1,155 @@
+import os
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
-from .models import Course, Lesson, Category, CourseEnrollment, CourseEnrollmentRequest
+from django.urls import reverse
+from .models import Course, Lesson, Category, CourseEnrollment, CourseEnrollmentRequest, LessonUpload
 from django.contrib.auth.models import User
+from .context import EnrolledCourses, MediaAccess
+from .media import sign_lesson_media
+from .ordering import allocate_order
+from .sparse_fields import SparseFieldsMixin
 
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = ['id', 'name', 'description']
 
-class LessonSerializer(serializers.ModelSerializer):
+class LessonSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     video_file_name = serializers.SerializerMethodField()
     pdf_file_name = serializers.SerializerMethodField()
+    video_stream_url = serializers.SerializerMethodField()
+    pdf_stream_url = serializers.SerializerMethodField()
+    video_manifest_url = serializers.SerializerMethodField()
+    pdf_text_url = serializers.SerializerMethodField()
+    pdf_preview_urls = serializers.SerializerMethodField()
+    # Lesson ID to place this lesson right after (0 for the first position)
+    insert_after = serializers.IntegerField(min_value=0, write_only=True, required=False)
 
     class Meta:
         model = Lesson
         fields = [
             'id', 'title', 'description', 'order', 'course',
-            'video_file', 'video_file_name', 'pdf_file', 'pdf_file_name',
+            'video_file', 'video_file_name', 'video_stream_url',
+            'video_status', 'video_manifest_url', 'video_renditions',
+            'pdf_file', 'pdf_file_name', 'pdf_stream_url',
+            'pdf_status', 'pdf_page_count', 'pdf_text_url', 'pdf_preview_urls', 'insert_after',
         ]
+        read_only_fields = ['video_status', 'video_renditions', 'pdf_status', 'pdf_page_count']
         extra_kwargs = {
             'order': {'required': False},  # Make the order field optional
         }
+        # The unique (course, order) index is checked in validate(), since order is optional
+        validators = []
 
     def to_representation(self, instance):
         representation = super().to_representation(instance)
-        representation['video_file'] = representation.get('video_file', None)
-        representation['pdf_file'] = representation.get('pdf_file', None)
+        # Lesson files have no public URL; they are read through the signed stream URL too
+        for field_name, kind in (('video_file', 'video'), ('pdf_file', 'pdf')):
+            if field_name in self.fields:
+                representation[field_name] = self._stream_url(instance, kind) if getattr(instance, field_name) else None
+        # Cached shared payloads are signed per user when served (see courses/cache.py)
+        if self.context.get('sign_media', True):
+            sign_lesson_media(representation, self._may_access_media(instance))
         return representation
 
     def get_video_file_name(self, obj):
         """Return the filename of the uploaded video."""
-        return obj.video_file.name.split('/')[-1] if obj.video_file else None
+        return (obj.video_file_name or obj.video_file.name.split('/')[-1]) if obj.video_file else None
 
     def get_pdf_file_name(self, obj):
         """Return the filename of the uploaded PDF."""
-        return obj.pdf_file.name.split('/')[-1] if obj.pdf_file else None
+        return (obj.pdf_file_name or obj.pdf_file.name.split('/')[-1]) if obj.pdf_file else None
+
+    def get_video_stream_url(self, obj):
+        """Return the signed, Range-capable streaming URL for the video."""
+        return self._stream_url(obj, 'video') if obj.video_file else None
+
+    def get_pdf_stream_url(self, obj):
+        """Return the signed, Range-capable streaming URL for the PDF."""
+        return self._stream_url(obj, 'pdf') if obj.pdf_file else None
+
+    def get_pdf_text_url(self, obj):
+        """Return the signed URL of the PDF's extracted page text (JSON)."""
+        return self._absolute_url(reverse('lesson-pdf-pages', kwargs={'lesson_id': obj.id})) if obj.pdf_file else None
+
+    def get_pdf_preview_urls(self, obj):
+        """
+        Return signed URLs of the PDF's page previews. Until the PDF has been
+        processed there is only the first page, whose first request starts it.
+        """
+        if not obj.pdf_file:
+            return []
+        pages = obj.pdf_preview_count if obj.pdf_status == Lesson.PDF_READY else 1
+        return [
+            self._absolute_url(reverse('lesson-pdf-preview', kwargs={'lesson_id': obj.id, 'page': page}))
+            for page in range(1, pages + 1)
+        ]
+
+    def get_video_manifest_url(self, obj):
+        """Return the signed URL of the HLS master playlist once transcoding has finished."""
+        if obj.video_status != Lesson.VIDEO_READY or not obj.video_manifest:
+            return None
+        path = os.path.basename(obj.video_manifest)
+        return self._absolute_url(reverse('lesson-video-stream', kwargs={'lesson_id': obj.id, 'path': path}))
+
+    def _stream_url(self, obj, kind):
+        return self._absolute_url(reverse('lesson-media', kwargs={'lesson_id': obj.id, 'kind': kind}))
+
+    def _absolute_url(self, url):
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+    def _may_access_media(self, obj):
+        """Only the instructor, admins and enrolled students get signed URLs."""
+        media_access = self.context.get('media_access')
+        if media_access is None:
+            request = self.context.get('request')
+            if not request:
+                return False
+            media_access = MediaAccess.for_request(request)
+        return obj.course_id in media_access
+
+    def validate(self, attrs):
+        course = attrs.get('course') or getattr(self.instance, 'course', None)
+        lessons = Lesson.objects.filter(course=course)
+        if self.instance is not None:
+            lessons = lessons.exclude(pk=self.instance.pk)
+
+        if 'order' in attrs and 'insert_after' in attrs:
+            raise serializers.ValidationError("Give either order or insert_after, not both.")
+        if 'order' in attrs and lessons.filter(order=attrs['order']).exists():
+            raise serializers.ValidationError({'order': "Another lesson of this course already has this order."})
+        if attrs.get('insert_after') and not lessons.filter(pk=attrs['insert_after']).exists():
+            raise serializers.ValidationError({'insert_after': "No other lesson with this ID in the course."})
+        return attrs
 
     def create(self, validated_data):
         # Automatically set the order if not provided
-        if 'order' not in validated_data:
-            course = validated_data['course']
-            last_lesson = Lesson.objects.filter(course=course).order_by('-order').first()
-            validated_data['order'] = (last_lesson.order + 1) if last_lesson else 1
-        return super().create(validated_data)
+        return self._save_with_order(super().create, validated_data, allocate='order' not in validated_data)
+
+    def update(self, instance, validated_data):
+        moved = 'course' in validated_data and validated_data['course'] != instance.course
+        allocate = 'insert_after' in validated_data or (moved and 'order' not in validated_data)
+        return self._save_with_order(lambda data: super(LessonSerializer, self).update(instance, data), validated_data, allocate)
+
+    def _save_with_order(self, save, validated_data, allocate, attempts=3):
+        """
+        Save, picking a free order when `allocate` is set. Two concurrent saves can
+        pick the same order; the unique index rejects one, which then tries again.
+        """
+        after = validated_data.pop('insert_after', None)
+        course = validated_data.get('course') or self.instance.course
+        for attempt in range(attempts):
+            try:
+                with transaction.atomic():
+                    if allocate:
+                        validated_data['order'] = allocate_order(course.id, after=after)
+                    return save(validated_data)
+            except IntegrityError:
+                if not allocate or attempt == attempts - 1:
+                    raise serializers.ValidationError({'order': "Another lesson of this course already has this order."})
 
 class CourseEnrollmentSerializer(serializers.ModelSerializer):
     class Meta:
@@ -50,7 +158,7 @@ class CourseEnrollmentSerializer(serializers.ModelSerializer):
         read_only_fields = ['student', 'enrolled_at']
         
 
-class CourseSerializer(serializers.ModelSerializer):
+class CourseSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     lessons = LessonSerializer(many=True, read_only=True)  
     instructor = serializers.StringRelatedField()  # Use StringRelatedField for instructor
     category = serializers.StringRelatedField()  # Use StringRelatedField for category
@@ -60,16 +168,30 @@ class CourseSerializer(serializers.ModelSerializer):
         model = Course
         fields = [
             'id', 'title', 'description', 'instructor', 'category', 
-            'created_at', 'updated_at', 'lessons', 'is_enrolled',
+            'created_at', 'updated_at', 'lesson_count', 'enrollment_count', 'pending_request_count',
+            'lessons', 'is_enrolled',
+        ]
+        read_only_fields = [
+            'instructor', 'created_at', 'updated_at',
+            'lesson_count', 'enrollment_count', 'pending_request_count',
         ]
-        read_only_fields = ['instructor', 'created_at', 'updated_at']
 
     def get_is_enrolled(self, obj):
         """Check if the current user is enrolled in the course."""
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return CourseEnrollment.objects.filter(student=request.user, course=obj).exists()
-        return False
+        enrolled_courses = self.context.get('enrolled_courses')
+        if enrolled_courses is None:
+            request = self.context.get('request')
+            if not request or not request.user.is_authenticated:
+                return False
+            enrolled_courses = EnrolledCourses.for_request(request)
+        return obj.id in enrolled_courses
+
+
+class CourseListSerializer(CourseSerializer):
+    """Compact course representation for listings: lesson and enrollment counts instead of nested lessons."""
+
+    class Meta(CourseSerializer.Meta):
+        expandable_fields = ['lessons']  # Only included with ?expand=lessons
     
     
     
@@ -86,5 +208,31 @@ class CourseEnrollmentRequestSerializer(serializers.ModelSerializer):
         model = CourseEnrollmentRequest
         fields = ['id', 'student', 'course', 'message', 'status', 'requested_at']
         read_only_fields = ['student', 'course', 'status', 'requested_at']
-    
-    
\ No newline at end of file
+
+
+class CourseEnrollmentRequestListSerializer(serializers.ModelSerializer):
+    """Listing representation: the course is referenced by ID and side-loaded once per page."""
+    student = SimpleStudentSerializer(read_only=True)
+
+    class Meta:
+        model = CourseEnrollmentRequest
+        fields = ['id', 'student', 'course', 'message', 'status', 'requested_at']
+        read_only_fields = fields
+
+
+class LessonUploadSerializer(serializers.ModelSerializer):
+    offset = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = LessonUpload
+        fields = ['id', 'filename', 'size', 'offset', 'created_at', 'expires_at']
+        read_only_fields = ['created_at', 'expires_at']
+
+    def validate_filename(self, value):
+        return os.path.basename(value)
+
+    def validate_size(self, value):
+        max_size = settings.LESSON_UPLOADS['MAX_FILE_SIZE']
+        if value <= 0 or value > max_size:
+            raise serializers.ValidationError(f"Size must be between 1 and {max_size} bytes.")
+        return value
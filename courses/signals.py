@@ -0,0 +1,168 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .cache import invalidate_course_payload
+from .models import Category, Course, CourseEnrollment, CourseEnrollmentRequest, Lesson
+from .pdf import pdf_processing_available, process_lesson_pdf
+from .search import index_object, remove_object
+from .tasks import run_in_background
+from .transcoding import remove_lesson_streams, transcode_lesson_video, transcoding_available
+
+
+@receiver(post_save, sender=Lesson)
+def schedule_video_transcoding(sender, instance, **kwargs):
+    """Queue a transcode whenever a lesson gets a new video file."""
+    if 'video_file' not in instance.__dict__:
+        return  # Deferred, so this save cannot have changed it
+    video_name = instance.video_file.name or ''
+    if video_name == instance._saved_video_name:
+        return
+    instance._saved_video_name = video_name
+
+    # Without the backend's tools (ffmpeg) the video stays untranscoded (`none`), like PDFs without pypdfium2
+    transcode = bool(video_name) and transcoding_available()
+    status = Lesson.VIDEO_PENDING if transcode else Lesson.VIDEO_NONE
+    Lesson.objects.filter(id=instance.id).update(video_status=status, video_manifest='', video_renditions=[])
+    instance.video_status, instance.video_manifest, instance.video_renditions = status, '', []
+
+    if transcode:
+        run_in_background(transcode_lesson_video, instance.id, video_name)
+    else:
+        transaction.on_commit(lambda: remove_lesson_streams(instance.id))
+
+
+@receiver(post_save, sender=Lesson)
+def schedule_pdf_processing(sender, instance, **kwargs):
+    """Queue text extraction and page previews whenever a lesson gets a new PDF."""
+    if 'pdf_file' not in instance.__dict__:
+        return  # Deferred, so this save cannot have changed it
+    pdf_name = instance.pdf_file.name or ''
+    if pdf_name == instance._saved_pdf_name:
+        return
+    instance._saved_pdf_name = pdf_name
+
+    # Without the backend's optional dependency the PDF stays unprocessed (`none`)
+    process = bool(pdf_name) and pdf_processing_available()
+    status = Lesson.PDF_PENDING if process else Lesson.PDF_NONE
+    Lesson.objects.filter(id=instance.id).update(pdf_status=status, pdf_page_count=None, pdf_preview_count=0)
+    instance.pdf_status, instance.pdf_page_count, instance.pdf_preview_count = status, None, 0
+
+    # The old PDF's results are deleted along with it (see courses/storage.py)
+    if process:
+        run_in_background(process_lesson_pdf, instance.id, pdf_name)
+
+
+@receiver(post_delete, sender=Lesson)
+def remove_video_streams(sender, instance, **kwargs):
+    lesson_id = instance.id
+    transaction.on_commit(lambda: remove_lesson_streams(lesson_id))
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_save, sender=Lesson)
+@receiver(post_save, sender=Category)
+def update_search_index(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_object(instance)
+
+
+@receiver(post_delete, sender=Course)
+@receiver(post_delete, sender=Lesson)
+@receiver(post_delete, sender=Category)
+def remove_from_search_index(sender, instance, **kwargs):
+    remove_object(instance)
+
+
+# The Course counter kept in step with each nested model
+COURSE_COUNTERS = {
+    Lesson: 'lesson_count',
+    CourseEnrollment: 'enrollment_count',
+}
+
+
+def counter_change(field_name, delta):
+    """An F() update of a course counter that never goes below zero."""
+    # A counter that has drifted is put right by `manage.py reconcile_course_counters`
+    return {field_name: Greatest(F(field_name) + delta, 0)}
+
+
+@receiver(post_save, sender=Lesson)
+@receiver(post_delete, sender=Lesson)
+@receiver(post_save, sender=CourseEnrollment)
+@receiver(post_delete, sender=CourseEnrollment)
+def bump_course_version(sender, instance, signal, raw=False, created=False, **kwargs):
+    """Lessons and enrollments are part of the course representation, and counted on it."""
+    if raw:
+        return
+    field_name = COURSE_COUNTERS[sender]
+    changes = {}
+    if created:
+        changes = counter_change(field_name, 1)
+    elif signal is post_delete:
+        changes = counter_change(field_name, -1)
+    elif sender is Lesson and lesson_moved(instance):
+        # The lesson left its old course, which loses it from its count and payload
+        Course.objects.filter(id=instance._saved_course_id).bump_version(**counter_change(field_name, -1))
+        invalidate_course_payload(instance._saved_course_id)
+        changes = counter_change(field_name, 1)
+    if sender is Lesson and signal is post_save:
+        instance._saved_course_id = instance.course_id
+    Course.objects.filter(id=instance.course_id).bump_version(**changes)
+
+
+def lesson_moved(lesson):
+    if 'course_id' not in lesson.__dict__:
+        return False  # Deferred, so this save cannot have changed it
+    return lesson._saved_course_id is not None and lesson._saved_course_id != lesson.course_id
+
+
+@receiver(post_save, sender=CourseEnrollmentRequest)
+@receiver(post_delete, sender=CourseEnrollmentRequest)
+def count_pending_requests(sender, instance, signal, raw=False, **kwargs):
+    if raw or 'status' not in instance.__dict__:
+        return  # Deferred, so this save cannot have changed it
+    was_pending = instance._saved_status == 'pending'
+    is_pending = signal is post_save and instance.status == 'pending'
+    instance._saved_status = instance.status if signal is post_save else None
+    if is_pending != was_pending:
+        Course.objects.filter(id=instance.course_id).bump_version(
+            **counter_change('pending_request_count', 1 if is_pending else -1)
+        )
+        invalidate_course_payload(instance.course_id)
+
+
+@receiver(post_save, sender=Category)
+@receiver(pre_delete, sender=Category)
+def bump_category_course_versions(sender, instance, raw=False, **kwargs):
+    """Courses show their category's name."""
+    if not raw:
+        Course.objects.filter(category=instance).bump_version()
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def invalidate_course_cache(sender, instance, **kwargs):
+    invalidate_course_payload(instance.id)
+
+
+@receiver(post_save, sender=Lesson)
+@receiver(post_delete, sender=Lesson)
+def invalidate_lesson_course_cache(sender, instance, **kwargs):
+    invalidate_course_payload(instance.course_id)
+
+
+@receiver(post_save, sender=CourseEnrollment)
+@receiver(post_delete, sender=CourseEnrollment)
+def invalidate_enrollment_course_cache(sender, instance, created=False, signal=None, **kwargs):
+    # Only the enrollment count is shared; is_enrolled is merged in per request
+    if created or signal is post_delete:
+        invalidate_course_payload(instance.course_id)
+
+
+@receiver(post_save, sender=Category)
+@receiver(pre_delete, sender=Category)
+def invalidate_category_course_cache(sender, instance, **kwargs):
+    invalidate_course_payload(*Course.objects.filter(category=instance).values_list('id', flat=True))
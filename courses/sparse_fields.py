@@ -0,0 +1,73 @@
+from rest_framework import permissions
+from rest_framework.serializers import ListSerializer
+
+FIELDS_QUERY_PARAM = 'fields'
+EXPAND_QUERY_PARAM = 'expand'
+
+
+def parse_field_list(value):
+    """Turn 'a,b, c' into {'a', 'b', 'c'}; None or '' means 'not given'."""
+    if not value:
+        return None
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+def sparse_fields(request):
+    """
+    Read ?fields= and ?expand= from a read request.
+
+    Writes always get the full representation back, so the fieldset is only
+    honoured for safe methods.
+    """
+    if request is None or request.method not in permissions.SAFE_METHODS:
+        return {'fields': None, 'expand': set()}
+    return {
+        'fields': parse_field_list(request.query_params.get(FIELDS_QUERY_PARAM)),
+        'expand': parse_field_list(request.query_params.get(EXPAND_QUERY_PARAM)) or set(),
+    }
+
+
+def is_field_requested(request, name, expandable=False):
+    """Whether a view needs to load the data behind `name` for this request."""
+    requested = sparse_fields(request)
+    if expandable and name not in requested['expand']:
+        return False
+    return requested['fields'] is None or name in requested['fields'] or name in requested['expand']
+
+
+class SparseFieldsMixin:
+    """
+    Serializer mixin that trims its fields to the `fields` / `expand` sets in
+    the serializer context.
+
+    Fields listed in `Meta.expandable_fields` are only included when expanded.
+    Only the top-level serializer is trimmed; nested serializers keep their shape.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        parent = self.parent
+        if isinstance(parent, ListSerializer):
+            parent = parent.parent
+        if parent is not None:
+            return fields
+
+        requested = self.context.get('fields')
+        expand = self.context.get('expand') or set()
+        for name in getattr(self.Meta, 'expandable_fields', ()):
+            if name not in expand:
+                fields.pop(name, None)
+        if requested is not None:
+            for name in list(fields):
+                if name not in requested and name not in expand:
+                    fields.pop(name)
+        return fields
+
+
+class SparseFieldsContextMixin:
+    """Viewset mixin that passes ?fields= / ?expand= on to the serializer context."""
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context.update(sparse_fields(self.request))
+        return context
@@ -0,0 +1,266 @@
+"""
+Content-addressed storage for uploaded lesson files and profile images.
+
+Each upload is hashed (SHA-256) while it is written to disk and kept under
+`<prefix>/<ab>/<cd>/<digest>/<original file name>`, so the last part of a
+name is still the uploaded file name. Uploading bytes that are already
+stored returns the existing name instead of writing them again. Files
+derived from a blob are kept next to it, in `<name>.derived/`.
+
+Blobs are reference-counted across every file field that uses this storage:
+when a row is deleted or points at another file, the blob it used is deleted
+once no field of any row refers to it any more. Saving a file claims its blob
+until the row referring to it is committed, so a blob that a concurrent,
+uncommitted upload has just been deduplicated onto is not deleted under it.
+"""
+import fcntl
+import hashlib
+import os
+import posixpath
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+
+from django.apps import apps
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage, storages
+from django.db import transaction
+from django.db.models import FileField
+from django.db.models.fields.files import FieldFile
+from django.db.models.signals import post_delete, post_init, post_save
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+# Claims left by transactions that rolled back stop protecting a blob after this long (seconds)
+CLAIM_TIMEOUT = 60 * 60
+
+
+def get_upload_storage():
+    """The storage of uploaded files (STORAGES['uploads']), as a callable for the model fields."""
+    return storages['uploads']
+
+
+def get_lesson_file_storage():
+    """The storage of lesson videos and PDFs (STORAGES['lesson_files']), only served through signed URLs."""
+    return storages['lesson_files']
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def __init__(self, prefix='blobs', **kwargs):
+        super().__init__(**kwargs)
+        self.prefix = prefix
+
+    def blob_dir(self, digest):
+        return posixpath.join(self.prefix, digest[:2], digest[2:4], digest)
+
+    def is_blob(self, name):
+        return bool(name) and name.startswith(self.prefix + '/')
+
+    def get_available_name(self, name, max_length=None):
+        """Just the file name, shortened so the full blob name fits `max_length`; the directory comes from the content."""
+        filename = posixpath.basename(name)
+        if max_length is not None:
+            room = max_length - len(self.blob_dir('0' * 64)) - 1
+            if len(filename) > room:
+                stem, extension = os.path.splitext(filename)
+                filename = stem[:max(1, room - len(extension))] + extension
+        return filename
+
+    def _save(self, name, content):
+        staging_dir = self.path(posixpath.join(self.prefix, 'tmp'))
+        os.makedirs(staging_dir, exist_ok=True)
+        digest = hashlib.sha256()
+        if hasattr(content, 'temporary_file_path'):
+            # Already complete on disk: hash it, then move it rather than copy it
+            source, staged = content.temporary_file_path(), None
+            with open(source, 'rb') as file:
+                while block := file.read(HASH_BLOCK_SIZE):
+                    digest.update(block)
+        else:
+            descriptor, staged = tempfile.mkstemp(dir=staging_dir)
+            with os.fdopen(descriptor, 'wb') as file:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    file.write(chunk)
+            source = staged
+
+        try:
+            directory = self.blob_dir(digest.hexdigest())
+            # Locked against release_blob(), so an existing blob cannot be deleted before it is claimed
+            with self.lock():
+                blob_name = self.stored_name(directory)
+                if blob_name is None:
+                    os.makedirs(self.path(directory), exist_ok=True)
+                    blob_name = posixpath.join(directory, name)
+                    file_move_safe(source, self.path(blob_name), allow_overwrite=True)
+                    staged = None
+                    if self.file_permissions_mode is not None:
+                        os.chmod(self.path(blob_name), self.file_permissions_mode)
+                self.claim(blob_name)
+            return blob_name
+        finally:
+            if staged is not None:
+                os.remove(staged)
+
+    @contextmanager
+    def lock(self):
+        """Exclusive lock, across processes, over saving and deleting blobs."""
+        os.makedirs(self.path(self.prefix), exist_ok=True)
+        with open(self.path(posixpath.join(self.prefix, '.lock')), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def claims_dir(self, name):
+        return f'{name}.claims'
+
+    def claim(self, name):
+        """Record that a row is about to refer to the blob; undone by `unclaim()` once it is committed."""
+        directory = self.path(self.claims_dir(name))
+        os.makedirs(directory, exist_ok=True)
+        os.close(tempfile.mkstemp(dir=directory)[0])
+
+    def unclaim(self, name):
+        with self.lock():
+            try:
+                claims = sorted(os.scandir(self.path(self.claims_dir(name))), key=lambda entry: entry.name)
+            except FileNotFoundError:
+                return
+            if claims:
+                os.remove(claims[0].path)
+
+    def is_claimed(self, name):
+        try:
+            claims = list(os.scandir(self.path(self.claims_dir(name))))
+        except FileNotFoundError:
+            return False
+        oldest_live = time.time() - CLAIM_TIMEOUT
+        return any(entry.stat().st_mtime > oldest_live for entry in claims)
+
+    def derived_dir(self, name):
+        """Directory for files computed from a stored file (PDF previews, extracted text), deleted with it."""
+        return f'{name}.derived'
+
+    def stored_name(self, directory):
+        """Name of the blob already stored in `directory`, if any."""
+        try:
+            _, files = self.listdir(directory)
+        except FileNotFoundError:
+            return None
+        return posixpath.join(directory, sorted(files)[0]) if files else None
+
+    def delete(self, name):
+        shutil.rmtree(self.path(self.derived_dir(name)), ignore_errors=True)
+        shutil.rmtree(self.path(self.claims_dir(name)), ignore_errors=True)
+        super().delete(name)
+        # Prune the digest and shard directories left empty
+        directory = posixpath.dirname(name)
+        while self.is_blob(directory):
+            try:
+                os.rmdir(self.path(directory))
+            except OSError:
+                break
+            directory = posixpath.dirname(directory)
+
+
+class UploadNameFieldFile(FieldFile):
+    def save(self, name, content, save=True):
+        name_field = self.instance._meta.get_field(self.field.name_field)
+        setattr(self.instance, name_field.attname, posixpath.basename(name)[:name_field.max_length])
+        super().save(name, content, save)
+
+
+class UploadNameFileField(FileField):
+    """
+    A file field that also keeps the name each file was uploaded with in
+    `name_field`: a deduplicated upload is stored under the name of whoever
+    uploaded the same bytes first. `name_field` must be declared after this
+    field, so it is saved along with it.
+    """
+    attr_class = UploadNameFieldFile
+
+    def __init__(self, *args, name_field, **kwargs):
+        self.name_field = name_field
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        kwargs['name_field'] = self.name_field
+        return name, path, args, kwargs
+
+    def pre_save(self, model_instance, add):
+        file = super().pre_save(model_instance, add)
+        if not file:
+            setattr(model_instance, self.name_field, '')
+        return file
+
+
+@lru_cache(maxsize=None)
+def blob_fields():
+    """{model: [fields]} for every file field stored in a ContentAddressedStorage."""
+    fields = {}
+    for model in apps.get_models():
+        for field in model._meta.concrete_fields:
+            if isinstance(field, FileField) and isinstance(field.storage, ContentAddressedStorage):
+                fields.setdefault(model, []).append(field)
+    return fields
+
+
+def count_references(name):
+    return sum(
+        model._base_manager.filter(**{field.name: name}).count()
+        for model, fields in blob_fields().items() for field in fields
+    )
+
+
+def release_blob(storage, name):
+    """Delete a blob nothing refers to any more. Files saved before this storage was used are left alone."""
+    if not storage.is_blob(name):
+        return
+    with storage.lock():
+        # Checked under the lock: a save may have just deduplicated onto this blob
+        if count_references(name) == 0 and not storage.is_claimed(name):
+            storage.delete(name)
+
+
+def release_after_commit(storage, name):
+    transaction.on_commit(lambda: release_blob(storage, name))
+
+
+def remember_blob_names(sender, instance, **kwargs):
+    # Names as loaded from the database; new, unsaved files are still File objects
+    instance._blob_names = {
+        field.attname: instance.__dict__[field.attname]
+        for field in blob_fields()[sender] if isinstance(instance.__dict__.get(field.attname), str)
+    }
+
+
+def release_replaced_blobs(sender, instance, raw=False, **kwargs):
+    for field in blob_fields()[sender]:
+        if field.attname not in instance.__dict__:
+            continue  # Deferred, so this save cannot have changed it
+        name = getattr(instance, field.attname).name or ''
+        previous = instance._blob_names.get(field.attname)
+        if previous and previous != name:
+            release_after_commit(field.storage, previous)
+        if name and name != previous and field.storage.is_blob(name):
+            # The row now refers to the blob its file was saved to
+            transaction.on_commit(lambda storage=field.storage, name=name: storage.unclaim(name))
+        instance._blob_names[field.attname] = name
+
+
+def release_deleted_blobs(sender, instance, **kwargs):
+    for field in blob_fields()[sender]:
+        value = instance.__dict__.get(field.attname)
+        name = getattr(value, 'name', value) or instance._blob_names.get(field.attname)
+        if name:
+            release_after_commit(field.storage, name)
+
+
+def track_blob_references():
+    """Connect the reference-counting signals of every model with a blob field; called once from AppConfig.ready()."""
+    for model in blob_fields():
+        post_init.connect(remember_blob_names, sender=model)
+        post_save.connect(release_replaced_blobs, sender=model)
+        post_delete.connect(release_deleted_blobs, sender=model)
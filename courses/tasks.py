@@ -0,0 +1,46 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """The process-wide worker pool, created on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.BACKGROUND_TASKS['WORKERS'],
+                thread_name_prefix='course-tasks',
+            )
+    return _executor
+
+
+def _run_task(func, args, kwargs):
+    try:
+        func(*args, **kwargs)
+    except Exception:
+        logger.exception("Background task %s failed", func.__name__)
+    finally:
+        # Worker threads open their own connections; don't leak them between tasks
+        connections.close_all()
+
+
+def run_in_background(func, *args, **kwargs):
+    """
+    Run `func(*args, **kwargs)` in the local worker pool once the current
+    transaction commits, so the task never sees uncommitted rows.
+
+    With BACKGROUND_TASKS['EAGER'] the task runs inline instead (tests, debugging).
+    """
+    if settings.BACKGROUND_TASKS['EAGER']:
+        transaction.on_commit(lambda: func(*args, **kwargs))
+    else:
+        transaction.on_commit(lambda: get_executor().submit(_run_task, func, args, kwargs))
@@ -1,3 +1,670 @@
-from django.test import TestCase
+import base64
+import csv
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient, APITestCase
+
+from auth_app.models import Profile
+from .benchmark import compare_results, isolated_settings, percentile, route_names, run_benchmark, scenarios, seed_dataset
+from .models import Category, Course, CourseEnrollment, CourseEnrollmentRequest, Lesson, LessonUpload
+from .ordering import ORDER_GAP
+
+
+def payload(response):
+    """The decoded JSON body of a response, streamed or not."""
+    if response.streaming:
+        return json.loads(b''.join(response.streaming_content))
+    return response.json()
+
+
+def make_user(username, role=None, **extra):
+    user = User.objects.create_user(username, password='password', **extra)
+    if role is not None:
+        Profile.objects.create(user=user, role=role)
+    return user
+
+
+class CourseAPITestCase(APITestCase):
+    """Two instructors, two students and an admin, with three lessons in each course."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor = make_user('instructor', 'instructor')
+        cls.other_instructor = make_user('other_instructor', 'instructor')
+        cls.student = make_user('student', 'student')
+        cls.outsider = make_user('outsider', 'student')
+        cls.admin = make_user('admin', 'admin', is_staff=True, is_superuser=True)
+        cls.category = Category.objects.create(name='Programming')
+        cls.course = cls.make_course('Python basics')
+        cls.other_course = cls.make_course('Django basics')
+        CourseEnrollment.objects.create(student=cls.student, course=cls.course)
+
+    @classmethod
+    def make_course(cls, title, lessons=3):
+        course = Course.objects.create(
+            title=title, description=f'About {title}', instructor=cls.instructor, category=cls.category,
+        )
+        for number in range(1, lessons + 1):
+            Lesson.objects.create(
+                course=course, title=f'{title} {number}', description='Lesson text', order=number * ORDER_GAP,
+            )
+        return course
+
+    def setUp(self):
+        cache.clear()
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def lesson_ids(self, course):
+        return list(course.lessons.order_by('order', 'id').values_list('id', flat=True))
+
+    def counters(self, course):
+        course = Course.objects.get(id=course.id)
+        return course.lesson_count, course.enrollment_count, course.pending_request_count
+
+
+class MediaTestMixin:
+    """Store uploaded files in a temporary MEDIA_ROOT and run background tasks inline."""
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media_settings = override_settings(
+            MEDIA_ROOT=media_root,
+            BACKGROUND_TASKS={**settings.BACKGROUND_TASKS, 'EAGER': True},
+            VIDEO_TRANSCODING={**settings.VIDEO_TRANSCODING, 'BACKEND': 'courses.transcoding.StubTranscoder'},
+            PDF_PROCESSING={**settings.PDF_PROCESSING, 'BACKEND': 'courses.pdf.StubPdfBackend'},
+            LESSON_UPLOADS={
+                **settings.LESSON_UPLOADS, 'TEMP_DIR': os.path.join(media_root, 'uploads'), 'MAX_CHUNK_SIZE': 1000,
+            },
+        )
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+
+class PaginationTests(CourseAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for number in range(10):
+            cls.make_course(f'Course {number}', lessons=0)
+
+    def test_cursor_pages_cover_every_course_once(self):
+        client = self.client_for(self.student)
+        url, seen = '/api/courses/?page_size=4', []
+        while url:
+            response = client.get(url)
+            self.assertEqual(response.status_code, 200)
+            body = response.json()
+            self.assertLessEqual(len(body['results']), 4)
+            seen.extend(course['id'] for course in body['results'])
+            url = body['next']
+        expected = list(Course.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_page_size_is_capped(self):
+        response = self.client_for(self.student).get('/api/courses/?page_size=100000')
+        self.assertEqual(len(response.json()['results']), Course.objects.count())
+
+    def test_invalid_cursor(self):
+        response = self.client_for(self.student).get('/api/courses/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+
+    def test_cursor_with_wrong_types(self):
+        client = self.client_for(self.student)
+        for position in (['abc', 1], [{}, 1], ['2024-01-01T00:00:00+00:00', 'abc'], [None, 1], [[], []]):
+            token = base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+            response = client.get('/api/courses/', {'cursor': token})
+            self.assertEqual(response.status_code, 404, position)
+
+    def test_paginate_false_returns_a_bare_list(self):
+        response = self.client_for(self.student).get('/api/courses/?paginate=false')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(payload(response)), Course.objects.count())
+
+    def test_paginate_false_on_function_views(self):
+        CourseEnrollment.objects.create(student=self.outsider, course=self.course)
+        response = self.client_for(self.instructor).get(f'/api/course-enrollments/{self.course.id}/?paginate=false')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(payload(response)), 2)
+
+
+class SparseFieldsTests(CourseAPITestCase):
+    def test_fields_limit_the_list(self):
+        response = self.client_for(self.student).get('/api/courses/?fields=id,title')
+        for course in response.json()['results']:
+            self.assertEqual(set(course), {'id', 'title'})
+
+    def test_lessons_are_only_listed_when_expanded(self):
+        client = self.client_for(self.student)
+        course = client.get('/api/courses/').json()['results'][0]
+        self.assertNotIn('lessons', course)
+        course = client.get('/api/courses/?expand=lessons').json()['results'][0]
+        self.assertEqual(len(course['lessons']), 3)
+
+    def test_fields_on_async_detail(self):
+        response = self.client_for(self.student).get(f'/api/courses/{self.course.id}/?fields=id,title')
+        self.assertEqual(response.json(), {'id': self.course.id, 'title': self.course.title})
+
+
+class LessonMediaTests(MediaTestMixin, CourseAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.lesson = self.course.lessons.first()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lesson.pdf_file.save('notes.pdf', ContentFile(b'%PDF' + b'x' * 5000))
+
+    def pdf_url(self, user):
+        return self.client_for(user).get(f'/api/lessons/{self.lesson.id}/').json()['pdf_stream_url']
+
+    def test_signed_url_serves_the_file(self):
+        response = self.client.get(self.pdf_url(self.student))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content)[:4], b'%PDF')
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_outsiders_get_no_urls(self):
+        body = self.client_for(self.outsider).get(f'/api/lessons/{self.lesson.id}/').json()
+        self.assertIsNone(body['pdf_stream_url'])
+        self.assertIsNone(body['pdf_file'])
+        self.assertEqual(body['pdf_file_name'], 'notes.pdf')
+
+    def test_instructor_and_admin_get_urls(self):
+        self.assertIsNotNone(self.pdf_url(self.instructor))
+        self.assertIsNotNone(self.pdf_url(self.admin))
+
+    def test_unsigned_tampered_and_expired_urls_are_refused(self):
+        url = self.pdf_url(self.student)
+        self.assertEqual(self.client.get(url.split('?')[0]).status_code, 403)
+        self.assertEqual(self.client.get(url.replace('signature=', 'signature=0')).status_code, 403)
+        self.assertEqual(self.client.get(url.replace('/pdf/', '/video/')).status_code, 403)
+        later = time.time() + settings.MEDIA_SIGNING['TTL'].total_seconds() * 3
+        with mock.patch('courses.media.time.time', return_value=later):
+            self.assertEqual(self.client.get(url).status_code, 403)
+
+    def test_range_requests(self):
+        url = self.pdf_url(self.student)
+        response = self.client.get(url, HTTP_RANGE='bytes=0-3')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 0-3/5004')
+        self.assertEqual(b''.join(response.streaming_content), b'%PDF')
+
+        response = self.client.get(url, HTTP_RANGE='bytes=10000-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */5004')
+
+    def test_file_not_modified(self):
+        url = self.pdf_url(self.student)
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_hls_playlists_are_signed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client_for(self.instructor).patch(
+                f'/api/lessons/{self.lesson.id}/',
+                {'video_file': ContentFile(b'\0' * 1000, name='lecture.mp4')}, format='multipart',
+            )
+        self.assertEqual(response.status_code, 200, response.content)
+        url = self.client_for(self.student).get(f'/api/lessons/{self.lesson.id}/').json()['video_manifest_url']
+        self.assertIn('signature=', url)
+        self.assertEqual(self.client.get(url.split('?')[0]).status_code, 403)
+
+        master = self.client.get(url)
+        self.assertEqual(master.status_code, 200)
+        rendition = [line for line in master.content.decode().splitlines() if line and not line.startswith('#')][0]
+        self.assertIn('signature=', rendition)
+        playlist = self.client.get(rendition).content.decode()
+        segment = [line for line in playlist.splitlines() if line and not line.startswith('#')][0]
+        response = self.client.get(segment)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(b''.join(response.streaming_content)), 1000)
+
+        body = self.client_for(self.outsider).get(f'/api/lessons/{self.lesson.id}/').json()
+        self.assertIsNone(body['video_manifest_url'])
+
+    @override_settings(VIDEO_TRANSCODING={
+        **settings.VIDEO_TRANSCODING, 'BACKEND': 'courses.transcoding.FFmpegTranscoder',
+        'OPTIONS': {'ffmpeg': 'missing-ffmpeg-binary'},
+    })
+    def test_videos_stay_untranscoded_without_ffmpeg(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lesson.video_file.save('lecture.mp4', ContentFile(b'\0' * 1000))
+        self.lesson.refresh_from_db()
+        self.assertEqual(self.lesson.video_status, Lesson.VIDEO_NONE)
+        body = self.client_for(self.student).get(f'/api/lessons/{self.lesson.id}/').json()
+        self.assertIsNone(body['video_manifest_url'])
+        self.assertEqual(self.client.get(body['video_stream_url']).status_code, 200)
+
+    def test_lessons_keep_their_own_file_names(self):
+        other = self.course.lessons.exclude(id=self.lesson.id).first()
+        with self.captureOnCommitCallbacks(execute=True):
+            other.pdf_file.save('slides.pdf', ContentFile(b'%PDF' + b'x' * 5000))
+        self.lesson.refresh_from_db()
+        self.assertEqual(other.pdf_file.name, self.lesson.pdf_file.name)
+        client = self.client_for(self.student)
+        self.assertEqual(client.get(f'/api/lessons/{self.lesson.id}/').json()['pdf_file_name'], 'notes.pdf')
+        self.assertEqual(client.get(f'/api/lessons/{other.id}/').json()['pdf_file_name'], 'slides.pdf')
+
+    @override_settings(PDF_PROCESSING={**settings.PDF_PROCESSING, 'BACKEND': 'courses.pdf.PdfiumBackend'})
+    def test_pdfs_stay_unprocessed_without_a_backend(self):
+        with mock.patch('courses.pdf.PdfiumBackend.available', False):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.lesson.pdf_file.save('other.pdf', ContentFile(b'%PDF' + b'y' * 100))
+            self.lesson.refresh_from_db()
+            self.assertEqual(self.lesson.pdf_status, Lesson.PDF_NONE)
+            body = self.client_for(self.student).get(f'/api/lessons/{self.lesson.id}/').json()
+            self.assertEqual(self.client.get(body['pdf_text_url']).status_code, 404)
+
+
+class ChunkedUploadTests(MediaTestMixin, CourseAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.instructor)
+        self.data = os.urandom(2500)
+        response = self.client.post('/api/uploads/', {'filename': 'lecture.mp4', 'size': len(self.data)}, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.url = f'/api/uploads/{response.json()["id"]}/'
+
+    def send(self, start, end, offset=None):
+        return self.client.patch(
+            self.url, self.data[start:end], content_type='application/offset+octet-stream',
+            HTTP_UPLOAD_OFFSET=str(start if offset is None else offset),
+        )
+
+    def test_upload_and_finalize(self):
+        for start in range(0, len(self.data), 1000):
+            response = self.send(start, start + 1000)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Upload-Offset'], str(min(start + 1000, len(self.data))))
+        self.assertEqual(self.client.head(self.url)['Upload-Offset'], str(len(self.data)))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                self.url + 'finalize/', {'course': self.course.id, 'title': 'Lecture', 'description': 'Text'}, format='json',
+            )
+        self.assertEqual(response.status_code, 201, response.content)
+        lesson = Lesson.objects.get(id=response.json()['id'])
+        with lesson.video_file.open('rb') as file:
+            self.assertEqual(file.read(), self.data)
+        self.assertEqual(lesson.video_file_name, 'lecture.mp4')
+        self.assertFalse(LessonUpload.objects.exists())
+
+    def test_offset_mismatch(self):
+        self.send(0, 1000)
+        response = self.send(1000, 2000, offset=0)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Upload-Offset'], '1000')
+
+    def test_oversized_and_overflowing_chunks(self):
+        self.assertEqual(self.send(0, 1500).status_code, 413)
+        self.send(0, 1000)
+        self.send(1000, 2000)
+        self.data += b'extra'
+        self.assertEqual(self.send(2000, 2505).status_code, 400)
+
+    def test_finalize_before_complete(self):
+        self.send(0, 1000)
+        response = self.client.post(
+            self.url + 'finalize/', {'course': self.course.id, 'title': 'Lecture', 'description': 'Text'}, format='json',
+        )
+        self.assertEqual(response.status_code, 409)
+
+    def test_expired_session_is_gone(self):
+        self.send(0, 1000)
+        LessonUpload.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.send(1000, 2000).status_code, 410)
+        self.assertFalse(LessonUpload.objects.exists())
+        self.assertEqual(self.client.head(self.url).status_code, 404)
+
+    def test_sessions_are_private(self):
+        self.assertEqual(self.client_for(self.other_instructor).head(self.url).status_code, 404)
+        response = self.client_for(self.student).post('/api/uploads/', {'filename': 'a.mp4', 'size': 10}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+
+class SearchTests(CourseAPITestCase):
+    def setUp(self):
+        super().setUp()
+        lesson = self.course.lessons.first()
+        lesson.description = 'Loops <script>alert(1)</script> and zebrafish & friends'
+        with self.captureOnCommitCallbacks(execute=True):
+            lesson.save()
+        self.lesson = lesson
+
+    def search(self, query, **params):
+        return self.client_for(self.student).get('/api/search/', {'q': query, **params})
+
+    def test_snippets_are_escaped(self):
+        response = self.search('zebrafish')
+        self.assertEqual(response.status_code, 200)
+        hit = response.json()['results'][0]
+        self.assertEqual((hit['type'], hit['id']), ('lesson', self.lesson.id))
+        self.assertIn('<mark>zebrafish</mark>', hit['snippet'])
+        self.assertIn('&lt;script&gt;', hit['snippet'])
+        self.assertNotIn('<script>', hit['snippet'])
+
+    def test_query_syntax_is_escaped(self):
+        for query in ('"zebra', 'zebra AND', 'NEAR(zebra', 'title:zebra', '*', 'zebra) OR (loops'):
+            response = self.search(query)
+            self.assertEqual(response.status_code, 200, query)
+
+    def test_last_term_matches_as_a_prefix(self):
+        results = self.search('zebra', type='lesson').json()['results']
+        self.assertEqual([hit['id'] for hit in results], [self.lesson.id])
+
+    def test_pdf_text_only_matches_for_users_with_access(self):
+        with mock.patch('courses.search.lesson_pdf_text', return_value='Chloroplasts of zebrafish, zebrafish and more zebrafish'):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.lesson.save()
+
+        def hits(user, query):
+            return self.client_for(user).get('/api/search/', {'q': query}).json()['results']
+
+        for user in (self.student, self.instructor, self.admin):
+            self.assertEqual([hit['id'] for hit in hits(user, 'chloroplasts')], [self.lesson.id], user.username)
+        for user in (self.outsider, self.other_instructor):
+            self.assertEqual(hits(user, 'chloroplasts'), [], user.username)
+            # Found by its description, without the PDF text in the snippet
+            [hit] = hits(user, 'zebrafish')
+            self.assertNotIn('chloroplasts', hit['snippet'].lower())
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.search('').status_code, 400)
+        self.assertEqual(self.search('zebra', type='video').status_code, 400)
+        self.assertEqual(self.search('zebra', limit='many').status_code, 400)
+
+
+class ConditionalRequestTests(CourseAPITestCase):
+    def test_course_detail_not_modified_until_a_lesson_changes(self):
+        client = self.client_for(self.student)
+        url = f'/api/courses/{self.course.id}/'
+        etag = client.get(url)['ETag']
+        self.assertEqual(client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        lesson = self.course.lessons.first()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client_for(self.instructor).patch(f'/api/lessons/{lesson.id}/', {'title': 'Renamed'}, format='json')
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Renamed', [item['title'] for item in response.json()['lessons']])
+
+    def test_lesson_detail_not_modified(self):
+        client = self.client_for(self.student)
+        url = f'/api/lessons/{self.course.lessons.first().id}/'
+        etag = client.get(url)['ETag']
+        self.assertEqual(client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+
+class BulkEnrollmentRequestTests(CourseAPITestCase):
+    url = '/api/bulk-process-enrollment-requests/'
+
+    def setUp(self):
+        super().setUp()
+        self.requests = [
+            CourseEnrollmentRequest.objects.create(student=make_user(f'applicant{number}', 'student'), course=self.course)
+            for number in range(3)
+        ]
+
+    def test_approve_moves_requests_into_enrollments(self):
+        ids = [request.id for request in self.requests[:2]]
+        response = self.client_for(self.instructor).post(self.url, {'action': 'approve', 'ids': ids}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['processed'], 2)
+        self.assertEqual(self.counters(self.course), (3, 3, 1))
+        self.assertEqual(Course.objects.reconcile_counters(), [])
+
+    def test_reject_a_whole_course(self):
+        response = self.client_for(self.instructor).post(
+            self.url, {'action': 'reject', 'course': self.course.id}, format='json',
+        )
+        self.assertEqual(response.json()['processed'], 3)
+        self.assertEqual(self.counters(self.course), (3, 1, 0))
+
+    def test_foreign_and_processed_requests_are_reported(self):
+        self.requests[0].status = 'rejected'
+        self.requests[0].save()
+        ids = [request.id for request in self.requests] + [0]
+        response = self.client_for(self.other_instructor).post(self.url, {'action': 'approve', 'ids': ids}, format='json')
+        self.assertEqual(response.json()['processed'], 0)
+        self.assertEqual(self.counters(self.course), (3, 1, 2))
+
+    def test_invalid_input(self):
+        client = self.client_for(self.instructor)
+        self.assertEqual(client.post(self.url, {'action': 'archive', 'ids': []}, format='json').status_code, 400)
+        self.assertEqual(client.post(self.url, {'action': 'approve', 'ids': 'all'}, format='json').status_code, 400)
+        response = self.client_for(self.student).post(self.url, {'action': 'approve', 'course': self.course.id}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+
+class LessonOrderTests(CourseAPITestCase):
+    def test_reorder(self):
+        ids = self.lesson_ids(self.course)[::-1]
+        response = self.client_for(self.instructor).post(
+            f'/api/courses/{self.course.id}/lessons/reorder/', {'lessons': ids}, format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['id'] for item in response.json()['lessons']], ids)
+        self.assertEqual(self.lesson_ids(self.course), ids)
+
+    def test_reorder_needs_every_lesson_once(self):
+        client = self.client_for(self.instructor)
+        url = f'/api/courses/{self.course.id}/lessons/reorder/'
+        ids = self.lesson_ids(self.course)
+        self.assertEqual(client.post(url, {'lessons': ids[:2]}, format='json').status_code, 400)
+        self.assertEqual(client.post(url, {'lessons': ids + ids[:1]}, format='json').status_code, 400)
+        self.assertEqual(self.client_for(self.student).post(url, {'lessons': ids}, format='json').status_code, 403)
+
+    def create_lesson(self, **data):
+        return self.client_for(self.instructor).post(
+            '/api/lessons/', {'title': 'New', 'description': 'Text', 'course': self.course.id, **data}, format='multipart',
+        )
+
+    def test_insert_after(self):
+        first, second, third = self.lesson_ids(self.course)
+        response = self.create_lesson(insert_after=first)
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(self.lesson_ids(self.course), [first, response.json()['id'], second, third])
+
+        response = self.create_lesson(insert_after=0)
+        self.assertEqual(self.lesson_ids(self.course)[0], response.json()['id'])
+
+        response = self.create_lesson()
+        self.assertEqual(self.lesson_ids(self.course)[-1], response.json()['id'])
+
+    def test_insert_after_validation(self):
+        self.assertEqual(self.create_lesson(insert_after=0, order=5).status_code, 400)
+        self.assertEqual(self.create_lesson(insert_after=self.other_course.lessons.first().id).status_code, 400)
+
+
+class CounterTests(CourseAPITestCase):
+    def test_lesson_create_and_delete(self):
+        client = self.client_for(self.instructor)
+        response = client.post(
+            '/api/lessons/', {'title': 'New', 'description': 'Text', 'course': self.course.id}, format='multipart',
+        )
+        self.assertEqual(self.counters(self.course)[0], 4)
+        client.delete(f'/api/lessons/{response.json()["id"]}/')
+        self.assertEqual(self.counters(self.course)[0], 3)
+
+    def test_enrollment_lifecycle(self):
+        client = self.client_for(self.outsider)
+        client.post(f'/api/request-enrollment/{self.course.id}/')
+        self.assertEqual(self.counters(self.course), (3, 1, 1))
+        request = CourseEnrollmentRequest.objects.get(student=self.outsider)
+        self.client_for(self.instructor).post(f'/api/approve-enrollment/{request.id}/')
+        self.assertEqual(self.counters(self.course), (3, 2, 0))
+        client.delete(f'/api/withdraw-course/{self.course.id}/')
+        self.assertEqual(self.counters(self.course), (3, 1, 0))
+
+    def test_stale_course_save_keeps_counters(self):
+        stale = Course.objects.get(id=self.course.id)
+        CourseEnrollment.objects.create(student=self.outsider, course=self.course)
+        stale.title = 'Renamed'
+        stale.save()
+        self.assertEqual(self.counters(self.course), (3, 2, 0))
+
+    def test_moving_a_lesson_moves_its_count(self):
+        client = self.client_for(self.student)
+        etag = client.get(f'/api/courses/{self.course.id}/')['ETag']
+        lesson = self.course.lessons.first()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client_for(self.instructor).patch(
+                f'/api/lessons/{lesson.id}/', {'course': self.other_course.id}, format='json',
+            )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(self.counters(self.course)[0], 2)
+        self.assertEqual(self.counters(self.other_course)[0], 4)
+
+        response = client.get(f'/api/courses/{self.course.id}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(lesson.id, [item['id'] for item in response.json()['lessons']])
+        other = self.client_for(self.instructor).get(f'/api/courses/{self.other_course.id}/').json()
+        self.assertIn(lesson.id, [item['id'] for item in other['lessons']])
+        self.assertEqual(Course.objects.reconcile_counters(), [])
+
+
+class BenchmarkTests(APITestCase):
+    """A tiny seeded dataset, so every scenario of `benchmark_api` runs once per test run."""
+
+    @classmethod
+    def setUpClass(cls):
+        media_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        isolation = isolated_settings(media_root)
+        isolation.enable()
+        cls.addClassCleanup(isolation.disable)
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.data = seed_dataset(60, batch_size=100, log=lambda message: None)
+
+    def test_the_dataset_is_seeded(self):
+        self.assertGreaterEqual(User.objects.count(), 60)
+        self.assertTrue(Course.objects.exists())
+        self.assertEqual(Course.objects.reconcile_counters(), [])
+        # Processed by the stub backend when the seeding transaction commits
+        self.assertEqual(Lesson.objects.get(id=self.data.pdf_lesson.id).pdf_status, Lesson.PDF_READY)
+
+    def test_every_route_has_a_scenario(self):
+        self.assertEqual(route_names() - {scenario.route for scenario in scenarios()}, set())
+
+    def test_scenarios_succeed(self):
+        for name, result in run_benchmark(self.data, scenarios(), iterations=1, warmup=0):
+            with self.subTest(name):
+                self.assertTrue(all(status < 400 for status in result['status']), result['status'])
+                self.assertGreater(result['queries'] + result['bytes'], 0)
+
+    def test_compare_results(self):
+        baseline = {'courses.list': {'status': [200], 'p95_ms': 10.0, 'queries': 3}}
+        same = {'courses.list': {'status': [200], 'p95_ms': 11.0, 'queries': 3}}
+        self.assertEqual(compare_results(same, baseline, 0.25, 0, 2.0), [])
+        worse = {'courses.list': {'status': [500], 'p95_ms': 30.0, 'queries': 5}}
+        self.assertEqual(len(compare_results(worse, baseline, 0.25, 0, 2.0)), 3)
+        self.assertEqual(compare_results({}, baseline, 0.25, 0, 2.0), [])
+
+    def test_percentile(self):
+        self.assertEqual(percentile([5, 1, 3, 2, 4], 50), 3)
+        self.assertEqual(percentile([5, 1, 3, 2, 4], 95), 5)
+        self.assertEqual(percentile([7], 95), 7)
+
+
+class AsyncViewPermissionTests(CourseAPITestCase):
+    def test_unauthenticated(self):
+        lesson = self.course.lessons.first()
+        for url in (f'/api/courses/{self.course.id}/', f'/api/lessons/{lesson.id}/', '/api/user-courses/',
+                    f'/api/check-enrollment/{self.course.id}/'):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 401, url)
+
+    def log_in(self, username):
+        response = self.client.post('/auth/login/', {'username': username, 'password': 'password'}, format='json')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {response.json()["access"]}')
+
+    def test_user_without_profile(self):
+        make_user('no_profile')
+        self.log_in('no_profile')
+        response = self.client.get('/api/user-courses/')
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.json(), {'detail': 'User profile not found.'})
+        self.assertEqual(self.client.get(f'/api/courses/{self.course.id}/').status_code, 200)
+
+    def test_invalid_token(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer not-a-token')
+        self.assertEqual(self.client.get('/api/user-courses/').status_code, 401)
+
+    def test_bearer_token(self):
+        self.log_in('student')
+        response = self.client.get('/api/user-courses/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([course['id'] for course in response.json()], [self.course.id])
+
+    def test_only_get_and_head(self):
+        self.assertEqual(self.client_for(self.student).post('/api/user-courses/').status_code, 405)
+
+    def test_check_enrollment(self):
+        url = f'/api/check-enrollment/{self.course.id}/'
+        self.assertEqual(self.client_for(self.student).get(url).json(), {'is_enrolled': True})
+        self.assertEqual(self.client_for(self.outsider).get(url).json(), {'is_enrolled': False})
+        self.assertEqual(self.client_for(self.instructor).get(url).status_code, 403)
+        self.assertEqual(self.client_for(self.student).get('/api/check-enrollment/0/').status_code, 404)
+
+    def test_missing_objects(self):
+        client = self.client_for(self.student)
+        self.assertEqual(client.get('/api/courses/0/').status_code, 404)
+        self.assertEqual(client.get('/api/lessons/0/').status_code, 404)
+
+    def test_writes_go_to_the_viewsets(self):
+        url = f'/api/courses/{self.course.id}/'
+        self.assertEqual(self.client_for(self.other_instructor).patch(url, {'title': 'x'}, format='json').status_code, 403)
+        response = self.client_for(self.instructor).patch(url, {'title': 'Python'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['enrollment_count'], 1)
+
+
+@override_settings(SQL_INSTRUMENTATION={**settings.SQL_INSTRUMENTATION, 'ENABLED': True, 'SAMPLE_RATE': 1.0})
+class SQLInstrumentationTests(CourseAPITestCase):
+    def setUp(self):
+        super().setUp()
+        response = self.client.post('/auth/login/', {'username': 'student', 'password': 'password'}, format='json')
+        self.token = response.json()['access']
+
+    def assertRecorded(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="[1-9]\d* queries", app;dur=')
+
+    def test_sync_view(self):
+        self.assertRecorded(self.client_for(self.student).get('/api/courses/'))
+
+    async def test_async_view(self):
+        response = await self.async_client.get('/api/user-courses/', headers={'Authorization': f'Bearer {self.token}'})
+        self.assertRecorded(response)
+
+
+class ExportTests(CourseAPITestCase):
+    def test_csv_formulas_are_neutralized(self):
+        message = '=HYPERLINK("http://example.com","Click")'
+        CourseEnrollmentRequest.objects.create(student=self.outsider, course=self.course, message=message)
+        response = self.client_for(self.instructor).get('/api/exports/requests.csv')
+        self.assertEqual(response.status_code, 200)
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual([row['message'] for row in rows], ["'" + message])
+        self.assertEqual(rows[0]['student_username'], 'outsider')
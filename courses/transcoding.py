@@ -0,0 +1,223 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import subprocess
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .cache import invalidate_course_payload
+from .models import Course, Lesson
+from .storage import get_lesson_file_storage
+
+logger = logging.getLogger(__name__)
+
+MASTER_PLAYLIST = 'master.m3u8'
+RENDITION_PLAYLIST = 'index.m3u8'
+
+
+class TranscodingError(Exception):
+    pass
+
+
+class BaseTranscoder:
+    """
+    Turns one source video into HLS renditions under `output_dir`.
+
+    `transcode()` returns the renditions it produced as dicts with `name`,
+    `height`, `bandwidth` and `playlist` (relative to `output_dir`).
+    """
+
+    def __init__(self, renditions, segment_seconds):
+        self.renditions = renditions
+        self.segment_seconds = segment_seconds
+
+    @classmethod
+    def available(cls, **options):
+        """Whether the tools this backend needs are installed; takes the backend's OPTIONS."""
+        return True
+
+    def transcode(self, source_path, output_dir):
+        raise NotImplementedError
+
+    def rendition_info(self, rendition):
+        return {
+            'name': rendition['name'],
+            'height': rendition['height'],
+            'bandwidth': (rendition['video_bitrate'] + rendition['audio_bitrate']) * 1000,
+            'playlist': f'{rendition["name"]}/{RENDITION_PLAYLIST}',
+        }
+
+    def write_master_playlist(self, output_dir, renditions):
+        lines = ['#EXTM3U', '#EXT-X-VERSION:3']
+        for rendition in renditions:
+            lines.append(f'#EXT-X-STREAM-INF:BANDWIDTH={rendition["bandwidth"]},NAME="{rendition["name"]}"')
+            lines.append(rendition['playlist'])
+        with open(os.path.join(output_dir, MASTER_PLAYLIST), 'w') as playlist:
+            playlist.write('\n'.join(lines) + '\n')
+
+
+class FFmpegTranscoder(BaseTranscoder):
+    """Transcode with a local ffmpeg binary, skipping renditions taller than the source."""
+
+    def __init__(self, renditions, segment_seconds, ffmpeg='ffmpeg', ffprobe='ffprobe'):
+        super().__init__(renditions, segment_seconds)
+        self.ffmpeg = ffmpeg
+        self.ffprobe = ffprobe
+
+    @classmethod
+    def available(cls, ffmpeg='ffmpeg', ffprobe='ffprobe'):
+        # ffprobe is optional: without it every rendition is produced
+        return shutil.which(ffmpeg) is not None
+
+    def source_height(self, source_path):
+        try:
+            output = subprocess.run(
+                [self.ffprobe, '-v', 'error', '-select_streams', 'v:0',
+                 '-show_entries', 'stream=height', '-of', 'json', source_path],
+                capture_output=True, check=True, text=True,
+            ).stdout
+            return int(json.loads(output)['streams'][0]['height'])
+        except (OSError, subprocess.CalledProcessError, KeyError, IndexError, ValueError):
+            return None
+
+    def transcode(self, source_path, output_dir):
+        height = self.source_height(source_path)
+        renditions = [r for r in self.renditions if height is None or r['height'] <= height]
+        # Always produce at least the smallest rendition, even for tiny sources
+        renditions = renditions or self.renditions[:1]
+
+        produced = []
+        for rendition in renditions:
+            rendition_dir = os.path.join(output_dir, rendition['name'])
+            os.makedirs(rendition_dir, exist_ok=True)
+            command = [
+                self.ffmpeg, '-y', '-loglevel', 'error', '-i', source_path,
+                '-vf', f'scale=-2:{rendition["height"]}',
+                '-c:v', 'libx264', '-preset', 'veryfast', '-profile:v', 'main',
+                '-b:v', f'{rendition["video_bitrate"]}k',
+                '-maxrate', f'{rendition["video_bitrate"] * 107 // 100}k',
+                '-bufsize', f'{rendition["video_bitrate"] * 3 // 2}k',
+                '-c:a', 'aac', '-b:a', f'{rendition["audio_bitrate"]}k', '-ac', '2',
+                '-hls_time', str(self.segment_seconds), '-hls_playlist_type', 'vod',
+                '-hls_segment_filename', os.path.join(rendition_dir, 'segment_%05d.ts'),
+                os.path.join(rendition_dir, RENDITION_PLAYLIST),
+            ]
+            try:
+                subprocess.run(command, capture_output=True, check=True, text=True)
+            except OSError as exc:
+                raise TranscodingError(f"Could not run ffmpeg: {exc}")
+            except subprocess.CalledProcessError as exc:
+                raise TranscodingError(exc.stderr.strip() or f"ffmpeg exited with {exc.returncode}")
+            produced.append(self.rendition_info(rendition))
+
+        self.write_master_playlist(output_dir, produced)
+        return produced
+
+
+class StubTranscoder(BaseTranscoder):
+    """
+    Writes the HLS layout without transcoding: every rendition is a single
+    segment holding the original file. For local runs without ffmpeg.
+    """
+
+    def transcode(self, source_path, output_dir):
+        produced = []
+        for rendition in self.renditions:
+            rendition_dir = os.path.join(output_dir, rendition['name'])
+            os.makedirs(rendition_dir, exist_ok=True)
+            segment_name = 'segment_00000' + os.path.splitext(source_path)[1]
+            shutil.copyfile(source_path, os.path.join(rendition_dir, segment_name))
+            with open(os.path.join(rendition_dir, RENDITION_PLAYLIST), 'w') as playlist:
+                playlist.write('\n'.join([
+                    '#EXTM3U', '#EXT-X-VERSION:3', '#EXT-X-PLAYLIST-TYPE:VOD',
+                    f'#EXT-X-TARGETDURATION:{self.segment_seconds}',
+                    f'#EXTINF:{self.segment_seconds}.0,', segment_name, '#EXT-X-ENDLIST',
+                ]) + '\n')
+            produced.append(self.rendition_info(rendition))
+
+        self.write_master_playlist(output_dir, produced)
+        return produced
+
+
+def get_transcoder():
+    config = settings.VIDEO_TRANSCODING
+    transcoder_class = import_string(config['BACKEND'])
+    return transcoder_class(config['RENDITIONS'], config['SEGMENT_SECONDS'], **config.get('OPTIONS', {}))
+
+
+def transcoding_available():
+    """False when the configured backend's tools are missing, e.g. no ffmpeg; videos are then left untranscoded."""
+    config = settings.VIDEO_TRANSCODING
+    return import_string(config['BACKEND']).available(**config.get('OPTIONS', {}))
+
+
+def lesson_stream_dir(lesson_id):
+    """
+    Directory holding every HLS output of a lesson, under the private prefix of
+    the lesson file storage: streams are only served through signed URLs too.
+    """
+    return os.path.join(get_lesson_file_storage().prefix, settings.VIDEO_TRANSCODING['OUTPUT_DIR'], str(lesson_id))
+
+
+def remove_lesson_streams(lesson_id, keep=None):
+    """Delete a lesson's HLS outputs, except the `keep` sub-directory."""
+    storage = get_lesson_file_storage()
+    # Outputs written before streams were private sit directly under MEDIA_ROOT
+    legacy_root = storage.path(os.path.join(settings.VIDEO_TRANSCODING['OUTPUT_DIR'], str(lesson_id)))
+    shutil.rmtree(legacy_root, ignore_errors=True)
+
+    root = storage.path(lesson_stream_dir(lesson_id))
+    if not os.path.isdir(root):
+        return
+    for entry in os.listdir(root):
+        if entry != keep:
+            shutil.rmtree(os.path.join(root, entry), ignore_errors=True)
+
+
+def transcode_lesson_video(lesson_id, source_name):
+    """
+    Background task: transcode a lesson's current video into HLS renditions.
+
+    Results are only recorded if the lesson still points at `source_name`, so a
+    re-upload during transcoding simply wins.
+    """
+    lesson = Lesson.objects.filter(id=lesson_id).first()
+    if lesson is None or lesson.video_file.name != source_name:
+        return
+    current = Lesson.objects.filter(id=lesson_id, video_file=source_name)
+    course = Course.objects.filter(id=lesson.course_id)
+    current.update(video_status=Lesson.VIDEO_PROCESSING)
+    course.bump_version()
+    invalidate_course_payload(lesson.course_id)
+
+    # One directory per source file, so a stream already being played is not rewritten in place
+    version = hashlib.sha1(source_name.encode()).hexdigest()[:12]
+    output_name = os.path.join(lesson_stream_dir(lesson_id), version)
+    output_dir = get_lesson_file_storage().path(output_name)
+    os.makedirs(output_dir, exist_ok=True)
+
+    try:
+        renditions = get_transcoder().transcode(lesson.video_file.path, output_dir)
+    except Exception as exc:
+        logger.warning("Transcoding lesson %s failed: %s", lesson_id, exc)
+        shutil.rmtree(output_dir, ignore_errors=True)
+        current.update(video_status=Lesson.VIDEO_FAILED)
+        course.bump_version()
+        invalidate_course_payload(lesson.course_id)
+        return
+
+    updated = current.update(
+        video_status=Lesson.VIDEO_READY,
+        video_manifest=os.path.join(output_name, MASTER_PLAYLIST),
+        video_renditions=renditions,
+    )
+    if updated:
+        course.bump_version()
+        invalidate_course_payload(lesson.course_id)
+        remove_lesson_streams(lesson_id, keep=version)
+    else:
+        # The video was replaced while we were working
+        shutil.rmtree(output_dir, ignore_errors=True)
@@ -0,0 +1,174 @@
+import fcntl
+import os
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from .context import serializer_context
+from .models import Lesson, LessonUpload
+from .permissions import ProfileExistsPermission
+from .serializers import LessonSerializer, LessonUploadSerializer
+
+# Chunk bodies are copied to disk in blocks of this size, so memory use stays flat
+COPY_BLOCK_SIZE = 64 * 1024
+
+
+class AssembledUpload(File):
+    """
+    A finished upload that storage backends can move into place instead of
+    copying (FileSystemStorage checks for `temporary_file_path`).
+    """
+
+    def __init__(self, path, name):
+        super().__init__(open(path, 'rb'), name=name)
+        self.path = path
+
+    def temporary_file_path(self):
+        return self.path
+
+
+def upload_response(upload, status_code=status.HTTP_200_OK):
+    response = Response(LessonUploadSerializer(upload).data, status=status_code)
+    response['Upload-Offset'] = upload.offset
+    response['Upload-Length'] = upload.size
+    return response
+
+
+def get_active_upload(request, upload_id):
+    """Fetch the caller's upload session; expired sessions are removed and reported as gone."""
+    upload = get_object_or_404(LessonUpload, id=upload_id, owner=request.user)
+    if upload.is_expired:
+        upload.delete()
+        return None
+    return upload
+
+
+def expired_response():
+    return Response({"error": "This upload session has expired."}, status=status.HTTP_410_GONE)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, ProfileExistsPermission])
+def create_upload(request):
+    """Start a resumable upload by announcing the file name and total size."""
+    if request.user.profile.role not in ["instructor", "admin"]:
+        return Response({"error": "Only instructors and admins can upload lesson videos."}, status=403)
+
+    serializer = LessonUploadSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    upload = serializer.save(owner=request.user, expires_at=timezone.now() + settings.LESSON_UPLOADS['EXPIRY'])
+
+    os.makedirs(os.path.dirname(upload.temp_path), exist_ok=True)
+    open(upload.temp_path, 'wb').close()
+    return upload_response(upload, status.HTTP_201_CREATED)
+
+
+@api_view(['GET', 'HEAD', 'PATCH', 'DELETE'])
+@permission_classes([IsAuthenticated])
+def upload_detail(request, upload_id):
+    """
+    GET/HEAD report the current offset, PATCH appends a chunk at `Upload-Offset`,
+    DELETE abandons the upload.
+    """
+    upload = get_active_upload(request, upload_id)
+    if upload is None:
+        return expired_response()
+
+    if request.method == 'DELETE':
+        upload.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    if request.method == 'PATCH':
+        return append_chunk(request, upload)
+
+    return upload_response(upload)
+
+
+def append_chunk(request, upload):
+    try:
+        offset = int(request.headers['Upload-Offset'])
+        length = int(request.headers['Content-Length'])
+    except (KeyError, ValueError):
+        return Response({"error": "Upload-Offset and Content-Length headers are required."}, status=400)
+
+    if length > settings.LESSON_UPLOADS['MAX_CHUNK_SIZE']:
+        return Response({"error": "Chunk is too large."}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+    if offset + length > upload.size:
+        return Response({"error": "Chunk goes past the announced upload size."}, status=400)
+
+    with open(upload.temp_path, 'ab') as partial:
+        # One chunk at a time per upload: a concurrent request for the same
+        # session waits here, then finds the file longer than its offset
+        fcntl.flock(partial, fcntl.LOCK_EX)
+        partial.seek(0, os.SEEK_END)
+        # Only the current end of the file is a valid place to continue from
+        if partial.tell() != offset:
+            response = Response(
+                {"error": "Upload-Offset does not match the received size.", "offset": partial.tell()},
+                status=status.HTTP_409_CONFLICT,
+            )
+            response['Upload-Offset'] = partial.tell()
+            return response
+
+        stream = request.stream
+        remaining = length
+        while remaining > 0 and stream is not None:
+            block = stream.read(min(COPY_BLOCK_SIZE, remaining))
+            if not block:
+                break
+            partial.write(block)
+            remaining -= len(block)
+
+    return upload_response(upload)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, ProfileExistsPermission])
+def finalize_upload(request, upload_id):
+    """
+    Attach a fully received upload to a lesson: either an existing one (`lesson`)
+    or a new one created from the remaining lesson fields.
+    """
+    upload = get_active_upload(request, upload_id)
+    if upload is None:
+        return expired_response()
+    if not upload.is_complete:
+        return Response(
+            {"error": "The upload is not complete yet.", "offset": upload.offset, "size": upload.size},
+            status=status.HTTP_409_CONFLICT,
+        )
+
+    user = request.user
+    lesson_id = request.data.get('lesson')
+    if lesson_id:
+        lesson = get_object_or_404(Lesson.objects.select_related('course'), id=lesson_id)
+        course = lesson.course
+        serializer = None
+    else:
+        serializer = LessonSerializer(data=request.data, context=serializer_context(request))
+        serializer.is_valid(raise_exception=True)
+        course = serializer.validated_data['course']
+
+    if user.profile.role != "admin" and course.instructor_id != user.id:
+        return Response({"error": "You are not the instructor of this course."}, status=403)
+
+    assembled = AssembledUpload(upload.temp_path, upload.filename)
+    try:
+        with transaction.atomic():
+            if serializer is not None:
+                lesson = serializer.save(video_file=assembled)
+            else:
+                lesson.video_file.save(upload.filename, assembled)
+            upload.delete()
+    finally:
+        assembled.close()
+
+    response_status = status.HTTP_201_CREATED if serializer is not None else status.HTTP_200_OK
+    return Response(LessonSerializer(lesson, context=serializer_context(request)).data, status=response_status)
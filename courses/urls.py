@@ -5,17 +5,36 @@ from .views import (
     user_courses, enroll_course, check_enrollment, withdraw_course,
     reject_enrollment, list_enrollment_requests, approve_enrollment,
     request_enrollment, student_enrollment_requests, check_enrollment_request, withdraw_enrollment_request,
-    course_enrollments
+    course_enrollments, search_catalog, bulk_process_enrollment_requests,
+    course_retrieve, lesson_retrieve, dashboard, export_data,
 )
+from .async_api import delegating_view
+from .media import lesson_media, lesson_pdf_pages, lesson_pdf_preview, lesson_video_stream
+from .uploads import create_upload, upload_detail, finalize_upload
 
 router = DefaultRouter()
 router.register(r'courses', CourseViewSet)
 router.register(r'lessons', LessonViewSet)
 router.register(r'categories', CategoryViewSet)
 
+# Detail routes whose reads are served by async views, ahead of the router's own
+detail_methods = {'put': 'update', 'patch': 'partial_update', 'delete': 'destroy'}
+
 urlpatterns = [
+    path('courses/<int:pk>/', delegating_view(course_retrieve, CourseViewSet.as_view(detail_methods)), name='course-detail'),
+    path('lessons/<int:pk>/', delegating_view(lesson_retrieve, LessonViewSet.as_view(detail_methods)), name='lesson-detail'),
     path('', include(router.urls)),
+    path('lessons/<int:lesson_id>/media/<str:kind>/', lesson_media, name='lesson-media'),
+    path('lessons/<int:lesson_id>/media/video/stream/<path:path>', lesson_video_stream, name='lesson-video-stream'),
+    path('lessons/<int:lesson_id>/media/pdf/pages/', lesson_pdf_pages, name='lesson-pdf-pages'),
+    path('lessons/<int:lesson_id>/media/pdf/pages/<int:page>/preview/', lesson_pdf_preview, name='lesson-pdf-preview'),
+    path('uploads/', create_upload, name='create-upload'),
+    path('uploads/<uuid:upload_id>/', upload_detail, name='upload-detail'),
+    path('uploads/<uuid:upload_id>/finalize/', finalize_upload, name='finalize-upload'),
+    path('dashboard/', dashboard, name='dashboard'),
     path('user-courses/', user_courses, name='user-courses'),
+    path('search/', search_catalog, name='search'),
+    path('exports/<str:filename>', export_data, name='export'),
     path('enroll-course/<int:course_id>/', enroll_course, name='enroll-course'),
     path('check-enrollment/<int:course_id>/', check_enrollment, name='check-enrollment'),
     path('withdraw-course/<int:course_id>/', withdraw_course, name='withdraw-course'),
@@ -24,6 +43,7 @@ urlpatterns = [
     path('request-enrollment/<int:course_id>/', request_enrollment, name='request-enrollment'),
     path('approve-enrollment/<int:request_id>/', approve_enrollment, name='approve-enrollment'),
     path('reject-enrollment/<int:request_id>/', reject_enrollment, name='reject-enrollment'),
+    path('bulk-process-enrollment-requests/', bulk_process_enrollment_requests, name='bulk-process-enrollment-requests'),
     path('list-enrollment-requests/', list_enrollment_requests, name='list-enrollment-requests'),
     path('student-enrollment-requests/', student_enrollment_requests, name='student-enrollment-requests'),
     path('check-enrollment-request/<int:course_id>/', check_enrollment_request, name='check-enrollment-request'),  # Add the new endpoint
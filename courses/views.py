@@ -1,46 +1,83 @@
+from datetime import timedelta
+
 from rest_framework import viewsets, permissions
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
-from .models import Course, Lesson, Category, CourseEnrollment
+from django.db import transaction
+from django.db.models import F
+from .models import Course, Lesson, Category, CourseEnrollment, related_count
 from auth_app.models import Profile
-from .serializers import CourseSerializer, LessonSerializer, CategorySerializer, CourseEnrollmentSerializer
+from auth_app.serializers import UserSerializer
+from .serializers import CourseSerializer, CourseListSerializer, LessonSerializer, CategorySerializer, CourseEnrollmentSerializer
 from .permissions import IsInstructorOrReadOnly, ProfileExistsPermission, IsInstructorOrAdminForLesson
-
-@api_view(['GET'])
-@permission_classes([IsAuthenticated, ProfileExistsPermission])
-def user_courses(request):
+from .context import EnrolledCoursesContextMixin, MediaAccess, amay_access_media, serializer_context
+from .pagination import KeysetPagination, paginated_response
+from .sparse_fields import SparseFieldsContextMixin, is_field_requested, parse_field_list, sparse_fields
+from .search import KINDS, search as search_index
+from .conditional import ConditionalGetMixin, add_validators, aggregate_stamp, stamp_validators
+from .cache import (
+    aget_payload_version, invalidate_course_payload, payload_key, personalize_payload, shared_payload,
+)
+from .async_api import async_api_view, json_response, not_found
+from django.conf import settings
+from django.core.cache import cache
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from .ordering import apply_lesson_order
+from .db import retry_on_lock
+from .exports import EXPORTS, FORMATS as EXPORT_FORMATS, export_chunks
+
+def course_list_queryset(request, queryset):
+    """Load what `CourseListSerializer` needs: the related names, plus lessons only when expanded."""
+    queryset = queryset.select_related('instructor', 'category')
+    if is_field_requested(request, 'lessons', expandable=True):
+        queryset = queryset.prefetch_related('lessons')
+    return queryset
+
+
+@async_api_view(permission_classes=[ProfileExistsPermission])
+async def user_courses(request):
     user = request.user
     profile = user.profile
     if profile.role == "instructor":
-        courses = Course.objects.filter(instructor=user)
+        courses = [course async for course in course_list_queryset(request, Course.objects.filter(instructor=user))]
+        enrolled = {
+            course_id async for course_id in
+            CourseEnrollment.objects.filter(student=user).values_list('course_id', flat=True)
+        }
     else:
-        enrollments = CourseEnrollment.objects.filter(student=user).select_related('course')
-        courses = [enrollment.course for enrollment in enrollments]
-    serializer = CourseSerializer(courses, many=True, context={'request': request})
-    return Response(serializer.data)
-
-
-@api_view(['GET'])
-@permission_classes([IsAuthenticated, ProfileExistsPermission])
-def check_enrollment(request, course_id):
+        courses = [
+            course async for course in
+            course_list_queryset(request, Course.objects.filter(enrolled_students__student=user))
+        ]
+        # Every course listed here is one the student is enrolled in
+        enrolled = {course.id for course in courses}
+    # The user teaches or attends every listed course, so all their lesson media may be signed
+    context = serializer_context(request, enrolled_courses=enrolled, media_access={course.id for course in courses})
+    serializer = CourseListSerializer(courses, many=True, context=context)
+    return json_response(serializer.data)
+
+
+@async_api_view(permission_classes=[ProfileExistsPermission])
+async def check_enrollment(request, course_id):
     user = request.user
     profile = user.profile
     if profile.role == "instructor":
-        return Response({"error": "Instructors cannot enroll in courses."}, status=403)
+        return json_response({"error": "Instructors cannot enroll in courses."}, status=403)
 
-    try:
-        course = Course.objects.get(id=course_id)
-    except Course.DoesNotExist:
-        return Response({"error": "Course not found."}, status=404)
+    if not await Course.objects.filter(id=course_id).aexists():
+        return json_response({"error": "Course not found."}, status=404)
 
     # Check if the user is enrolled
-    is_enrolled = CourseEnrollment.objects.filter(student=user, course=course).exists()
-    return Response({"is_enrolled": is_enrolled}, status=200)
+    is_enrolled = await CourseEnrollment.objects.filter(student=user, course_id=course_id).aexists()
+    return json_response({"is_enrolled": is_enrolled}, status=200)
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated, ProfileExistsPermission])
+@retry_on_lock
 def enroll_course(request, course_id):
     user = request.user
     profile = user.profile
@@ -75,15 +112,44 @@ def withdraw_course(request, course_id):
     
     
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = KeysetPagination
+    pagination_ordering = ('name', 'id')
+
+    def get_list_stamp(self):
+        return aggregate_stamp(Category.objects.all(), 'updated_at')
 
-class CourseViewSet(viewsets.ModelViewSet):
-    queryset = Course.objects.prefetch_related("lessons").all()
+    def get_object_stamp(self):
+        updated_at = Category.objects.filter(pk=self.kwargs['pk']).values_list('updated_at', flat=True).first()
+        return (('category', self.kwargs['pk'], updated_at), updated_at) if updated_at else None
+
+class CourseViewSet(ConditionalGetMixin, SparseFieldsContextMixin, EnrolledCoursesContextMixin, viewsets.ModelViewSet):
+    queryset = Course.objects.all()
     serializer_class = CourseSerializer
     permission_classes = [permissions.IsAuthenticated, IsInstructorOrReadOnly]
+    pagination_class = KeysetPagination
+    pagination_ordering = ('-created_at', '-id')
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return CourseListSerializer
+        return CourseSerializer
+
+    # Reads of single courses are served by the async `course_retrieve`
+    def get_list_stamp(self):
+        return aggregate_stamp(Course.objects.all(), 'updated_at')
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            return course_list_queryset(self.request, queryset)
+        queryset = queryset.select_related('instructor', 'category')
+        if is_field_requested(self.request, 'lessons'):
+            queryset = queryset.prefetch_related('lessons')
+        return queryset
 
     def perform_create(self, serializer):
         category_id = self.request.data.get('category')
@@ -95,10 +161,97 @@ class CourseViewSet(viewsets.ModelViewSet):
         category = Category.objects.get(id=category_id) if category_id else serializer.instance.category
         serializer.save(category=category)
 
-class LessonViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['get'])
+    def popular(self, request):
+        """Courses with the most enrolled students first, read straight off the popularity index."""
+        ordering = ('-enrollment_count', '-id')
+        queryset = course_list_queryset(request, Course.objects.order_by(*ordering))
+        return paginated_response(request, queryset, CourseListSerializer, ordering, self.get_serializer_context())
+
+    @action(detail=True, methods=['post'], url_path='lessons/reorder')
+    def reorder_lessons(self, request, pk=None):
+        """Apply a complete new lesson order, given as the list of every lesson ID of the course."""
+        course = self.get_object()
+        lesson_ids = request.data.get('lessons')
+        if not isinstance(lesson_ids, list):
+            return Response({"error": "lessons must be a list of lesson IDs."}, status=400)
+        try:
+            lesson_ids = [int(lesson_id) for lesson_id in lesson_ids]
+        except (TypeError, ValueError):
+            return Response({"error": "lessons must be a list of lesson IDs."}, status=400)
+
+        with transaction.atomic():
+            current_ids = set(Lesson.objects.select_for_update().filter(course=course).values_list('id', flat=True))
+            if len(lesson_ids) != len(current_ids) or set(lesson_ids) != current_ids:
+                return Response({"error": "lessons must list every lesson of the course exactly once."}, status=400)
+            lessons = apply_lesson_order(course.id, lesson_ids)
+        return Response({"lessons": [{"id": lesson.id, "order": lesson.order} for lesson in lessons]}, status=200)
+
+class LessonViewSet(ConditionalGetMixin, SparseFieldsContextMixin, EnrolledCoursesContextMixin, viewsets.ModelViewSet):
     queryset = Lesson.objects.all()
     serializer_class = LessonSerializer
     permission_classes = [permissions.IsAuthenticated, IsInstructorOrAdminForLesson]
+    pagination_class = KeysetPagination
+    pagination_ordering = ('id',)
+
+    # Every lesson change bumps its course's version and updated_at
+    # (reads of single lessons are served by the async `lesson_retrieve`)
+    def get_list_stamp(self):
+        return aggregate_stamp(Lesson.objects.all(), 'course__updated_at')
+
+
+# Async reads of single courses and lessons; the viewsets above still handle
+# the other methods of the same URLs (see courses/urls.py)
+
+@async_api_view()
+async def course_retrieve(request, pk):
+    """Course detail, served from the shared payload cache with the per-user fields merged in."""
+    stamp = await Course.objects.filter(pk=pk).values_list('updated_at', 'version').afirst()
+    if stamp is None:
+        return not_found(Course)
+    updated_at, version = stamp
+    etag, last_modified = stamp_validators(request, (('course', pk, updated_at, version), updated_at))
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        key = payload_key(request, pk, await aget_payload_version(pk))
+        payload = await cache.aget(key)
+        if payload is None:
+            course = await (
+                Course.objects.select_related('instructor', 'category').prefetch_related('lessons').filter(pk=pk).afirst()
+            )
+            if course is None:
+                return not_found(Course)
+            payload = shared_payload(CourseSerializer, course, serializer_context(request))
+            await cache.aset(key, payload, settings.COURSE_PAYLOAD_CACHE_TIMEOUT)
+
+        is_enrolled = await CourseEnrollment.objects.filter(student=request.user, course_id=pk).aexists()
+        media_allowed = is_enrolled or await amay_access_media(request.user, pk)
+        requested = sparse_fields(request)
+        response = json_response(
+            personalize_payload(payload, is_enrolled, media_allowed, requested['fields'], requested['expand'])
+        )
+    return add_validators(response, etag, last_modified)
+
+
+@async_api_view()
+async def lesson_retrieve(request, pk):
+    """Lesson detail, with an ETag that changes with its course's version."""
+    stamp = await Lesson.objects.filter(pk=pk).values_list('course__updated_at', 'course__version').afirst()
+    if stamp is None:
+        return not_found(Lesson)
+    updated_at, version = stamp
+    etag, last_modified = stamp_validators(request, (('lesson', pk, updated_at, version), updated_at))
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        lesson = await Lesson.objects.filter(pk=pk).afirst()
+        if lesson is None:
+            return not_found(Lesson)
+        media_access = {lesson.course_id} if await amay_access_media(request.user, lesson.course_id) else set()
+        context = serializer_context(request, media_access=media_access)
+        response = json_response(LessonSerializer(lesson, context=context).data)
+    return add_validators(response, etag, last_modified)
     
     
     # Enrolment
@@ -108,10 +261,11 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 from .models import CourseEnrollmentRequest
-from .serializers import CourseEnrollmentRequestSerializer
+from .serializers import CourseEnrollmentRequestSerializer, CourseEnrollmentRequestListSerializer
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated, ProfileExistsPermission])
+@retry_on_lock
 def request_enrollment(request, course_id):
     user = request.user
     profile = user.profile
@@ -149,6 +303,7 @@ def request_enrollment(request, course_id):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated, ProfileExistsPermission])
+@retry_on_lock
 def approve_enrollment(request, request_id):
     user = request.user
     try:
@@ -197,9 +352,119 @@ def reject_enrollment(request, request_id):
         return Response({"message": "Enrollment request rejected successfully."}, status=200)
     except CourseEnrollmentRequest.DoesNotExist:
         return Response({"error": "Enrollment request not found."}, status=404)
+
+
+BULK_ENROLLMENT_LIMIT = 1000
+BULK_ENROLLMENT_ACTIONS = {'approve': 'approved', 'reject': 'rejected'}
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, ProfileExistsPermission])
+def bulk_process_enrollment_requests(request):
+    """
+    Approve or reject many enrollment requests at once.
+
+    Body: {"action": "approve" | "reject", "ids": [...]} or, instead of ids,
+    {"course": <id>} for every pending request of that course. Reports the
+    outcome of each request.
+    """
+    user = request.user
+    profile = user.profile
+    if profile.role not in ["instructor", "admin"]:
+        return Response({"error": "Only instructors and admins can process enrollment requests."}, status=403)
+
+    new_status = BULK_ENROLLMENT_ACTIONS.get(request.data.get('action'))
+    if new_status is None:
+        return Response({"error": "action must be 'approve' or 'reject'."}, status=400)
+
+    ids = request.data.get('ids')
+    course_id = request.data.get('course')
+    if ids is not None:
+        if not isinstance(ids, list):
+            return Response({"error": "ids must be a list."}, status=400)
+        try:
+            ids = list(dict.fromkeys(int(request_id) for request_id in ids))
+        except (TypeError, ValueError):
+            return Response({"error": "ids must be a list of numbers."}, status=400)
+        if len(ids) > BULK_ENROLLMENT_LIMIT:
+            return Response({"error": f"At most {BULK_ENROLLMENT_LIMIT} requests can be processed at once."}, status=400)
+        enrollment_requests = CourseEnrollmentRequest.objects.filter(id__in=ids)
+    elif course_id is not None:
+        try:
+            course_id = int(course_id)
+        except (TypeError, ValueError):
+            return Response({"error": "course must be a number."}, status=400)
+        enrollment_requests = CourseEnrollmentRequest.objects.filter(course_id=course_id, status='pending')[:BULK_ENROLLMENT_LIMIT]
+    else:
+        return Response({"error": "Either ids or course is required."}, status=400)
+
+    # One query loads the requests together with what the authorization check needs
+    enrollment_requests = list(
+        enrollment_requests.only('id', 'status', 'student_id', 'course_id').annotate(instructor_id=F('course__instructor_id'))
+    )
+    found = {enrollment_request.id: enrollment_request for enrollment_request in enrollment_requests}
+    if ids is None:
+        ids = list(found)
+
+    results = []
+    to_update = []
+    for request_id in ids:
+        enrollment_request = found.get(request_id)
+        if enrollment_request is None:
+            results.append({"id": request_id, "error": "Enrollment request not found."})
+        elif profile.role != "admin" and enrollment_request.instructor_id != user.id:
+            results.append({"id": request_id, "error": "You are not authorized to process this request."})
+        elif enrollment_request.status != 'pending':
+            results.append({"id": request_id, "error": "This request has already been processed."})
+        else:
+            enrollment_request.status = new_status
+            to_update.append(enrollment_request)
+            results.append({"id": request_id, "status": new_status})
+
+    with transaction.atomic():
+        CourseEnrollmentRequest.objects.bulk_update(to_update, ['status'])
+        if new_status == 'approved':
+            CourseEnrollment.objects.bulk_create(
+                [CourseEnrollment(student_id=r.student_id, course_id=r.course_id) for r in to_update],
+                ignore_conflicts=True,
+            )
+        # Bulk writes skip the model signals that normally keep the course counters
+        # and version up to date; ignore_conflicts hides how many rows were added, so recount
+        changed_courses = Course.objects.filter(id__in={r.course_id for r in to_update}).reconcile_counters()
+    invalidate_course_payload(*changed_courses)
+
+    return Response({"processed": len(to_update), "results": results}, status=200)
     
     
 
+def enrollment_requests_response(request, enrollment_requests, ordering):
+    """
+    List enrollment requests with each course referenced by ID and side-loaded
+    once in a `courses` map, in a fixed number of queries however long the
+    page is. `?expand=course` nests the full course in every request instead.
+    """
+    context = serializer_context(request)
+    if 'course' in context['expand']:
+        enrollment_requests = enrollment_requests.select_related(
+            'course__instructor', 'course__category', 'student'
+        ).prefetch_related('course__lessons')
+        return paginated_response(request, enrollment_requests, CourseEnrollmentRequestSerializer, ordering, context)
+
+    enrollment_requests = enrollment_requests.select_related('student')
+    paginator = KeysetPagination(ordering=ordering)
+    page = paginator.paginate_queryset(enrollment_requests, request)
+    rows = page if page is not None else list(enrollment_requests.order_by(*ordering))
+    data = CourseEnrollmentRequestListSerializer(rows, many=True, context=context).data
+
+    courses = course_list_queryset(request, Course.objects.filter(id__in={row.course_id for row in rows}))
+    # The side-loaded courses keep their full listing shape whatever ?fields= says
+    course_context = serializer_context(request, fields=None, expand=set())
+    course_data = CourseListSerializer(courses, many=True, context=course_context).data
+
+    response = paginator.get_paginated_response(data) if page is not None else Response({'results': data})
+    response.data['courses'] = {course['id']: course for course in course_data}
+    return response
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated, ProfileExistsPermission])
 def list_enrollment_requests(request):
@@ -210,12 +475,12 @@ def list_enrollment_requests(request):
 
     # Get all pending enrollment requests
     if profile.role == "instructor":
-        enrollment_requests = CourseEnrollmentRequest.objects.filter(course__instructor=user, status='pending').select_related('course', 'student')
+        enrollment_requests = CourseEnrollmentRequest.objects.filter(course__instructor=user, status='pending')
     else:  # Admin can view all pending requests
-        enrollment_requests = CourseEnrollmentRequest.objects.filter(status='pending').select_related('course', 'student')
+        enrollment_requests = CourseEnrollmentRequest.objects.filter(status='pending')
 
-    serializer = CourseEnrollmentRequestSerializer(enrollment_requests, many=True)
-    return Response(serializer.data)
+    # Oldest first, so the approval queue is worked in the order requests arrived
+    return enrollment_requests_response(request, enrollment_requests, ordering=('requested_at', 'id'))
     
     
 @api_view(['GET'])
@@ -227,38 +492,35 @@ def student_enrollment_requests(request):
         return Response({"error": "Only students can view their enrollment requests."}, status=403)
 
     # Fetch enrollment requests made by the student
-    enrollment_requests = CourseEnrollmentRequest.objects.filter(student=user).select_related('course', 'student')
-    serializer = CourseEnrollmentRequestSerializer(enrollment_requests, many=True)
-    return Response(serializer.data)
+    enrollment_requests = CourseEnrollmentRequest.objects.filter(student=user)
+    return enrollment_requests_response(request, enrollment_requests, ordering=('-requested_at', '-id'))
 
     
 
-@api_view(['GET'])
-@permission_classes([IsAuthenticated, ProfileExistsPermission])
-def check_enrollment_request(request, course_id):
+@async_api_view(permission_classes=[ProfileExistsPermission])
+async def check_enrollment_request(request, course_id):
     user = request.user
     profile = user.profile
     if profile.role == "instructor":
-        return Response({"error": "Instructors cannot check enrollment requests."}, status=403)
+        return json_response({"error": "Instructors cannot check enrollment requests."}, status=403)
 
-    try:
-        course = Course.objects.get(id=course_id)
-    except Course.DoesNotExist:
-        return Response({"error": "Course not found."}, status=404)
+    if not await Course.objects.filter(id=course_id).aexists():
+        return json_response({"error": "Course not found."}, status=404)
 
     # Check if the user has an enrollment request for this course
     if profile.role == "student":
-        enrollment_request = CourseEnrollmentRequest.objects.filter(student=user, course=course).first()
+        enrollment_requests = CourseEnrollmentRequest.objects.filter(student=user, course_id=course_id)
     else:  # Admin can check requests for any student
         student_id = request.query_params.get('student_id')
         if not student_id:
-            return Response({"error": "Student ID is required for admin requests."}, status=400)
-        enrollment_request = CourseEnrollmentRequest.objects.filter(student_id=student_id, course=course).first()
+            return json_response({"error": "Student ID is required for admin requests."}, status=400)
+        enrollment_requests = CourseEnrollmentRequest.objects.filter(student_id=student_id, course_id=course_id)
 
-    if enrollment_request:
-        return Response({"status": enrollment_request.status}, status=200)
+    request_status = await enrollment_requests.values_list('status', flat=True).afirst()
+    if request_status:
+        return json_response({"status": request_status}, status=200)
     else:
-        return Response({"status": "no_request"}, status=200)
+        return json_response({"status": "no_request"}, status=200)
     
     
     
@@ -302,8 +564,151 @@ def course_enrollments(request, course_id):
         return Response({"error": "You are not the instructor of this course."}, status=403)
 
     enrollments = CourseEnrollment.objects.filter(course=course).select_related('student__profile')
-    serializer = CourseEnrollmentSerializer(enrollments, many=True)
-    return Response(serializer.data)
+    return paginated_response(
+        request, enrollments, CourseEnrollmentSerializer,
+        ordering=('enrolled_at', 'id'), context=serializer_context(request),
+    )
+    
     
     
-    
\ No newline at end of file
+
+# Enrollments at most this old count as recent in the instructor dashboard stats
+RECENT_ENROLLMENTS_DAYS = 30
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, ProfileExistsPermission])
+def dashboard(request):
+    """
+    Everything the dashboard shows after login, in one response: the profile,
+    the user's courses, their enrollment requests (the approval queue for
+    instructors and admins) and, for instructors, per-course enrollment stats.
+    A fixed handful of queries whatever the number of courses or requests;
+    requests reference their course by ID, side-loaded in `request_courses`.
+    """
+    user = request.user
+    role = user.profile.role
+    # Courses and requests keep their full listing shape whatever ?fields= says
+    context = serializer_context(request, fields=None, expand=set())
+
+    if role == "instructor":
+        since = timezone.now() - timedelta(days=RECENT_ENROLLMENTS_DAYS)
+        courses = list(
+            course_list_queryset(request, Course.objects.filter(instructor=user)).annotate(
+                recent_enrollments=related_count(CourseEnrollment, enrolled_at__gte=since),
+                approved_requests=related_count(CourseEnrollmentRequest, status='approved'),
+                rejected_requests=related_count(CourseEnrollmentRequest, status='rejected'),
+            ).order_by('-created_at', '-id')
+        )
+        enrollment_requests = CourseEnrollmentRequest.objects.filter(
+            course__instructor=user, status='pending',
+        ).order_by('requested_at', 'id')
+    elif role == "student":
+        courses = list(
+            course_list_queryset(request, Course.objects.filter(enrolled_students__student=user))
+            .order_by('-enrolled_students__enrolled_at', '-id')
+        )
+        context['enrolled_courses'].prime(course.id for course in courses)
+        enrollment_requests = CourseEnrollmentRequest.objects.filter(student=user).order_by('-requested_at', '-id')
+    else:  # Admins work the site-wide approval queue
+        courses = []
+        enrollment_requests = CourseEnrollmentRequest.objects.filter(status='pending').order_by('requested_at', 'id')
+
+    enrollment_requests = list(enrollment_requests.select_related('student'))
+    course_data = CourseListSerializer(courses, many=True, context=context).data
+    courses_by_id = {course['id']: course for course in course_data}
+    missing = {row.course_id for row in enrollment_requests} - courses_by_id.keys()
+    if missing:
+        other_courses = course_list_queryset(request, Course.objects.filter(id__in=missing))
+        courses_by_id.update(
+            (course['id'], course)
+            for course in CourseListSerializer(other_courses, many=True, context=context).data
+        )
+
+    data = {
+        "profile": UserSerializer(user).data,
+        "courses": course_data,
+        "enrollment_requests": CourseEnrollmentRequestListSerializer(enrollment_requests, many=True, context=context).data,
+        "request_courses": {row.course_id: courses_by_id[row.course_id] for row in enrollment_requests},
+        "counts": {
+            "courses": len(courses),
+            "pending_requests": sum(row.status == 'pending' for row in enrollment_requests),
+        },
+    }
+    if role == "instructor":
+        data["enrollment_stats"] = [
+            {
+                "course": course.id,
+                "title": course.title,
+                "enrollments": course.enrollment_count,
+                "recent_enrollments": course.recent_enrollments,
+                "pending_requests": course.pending_request_count,
+                "approved_requests": course.approved_requests,
+                "rejected_requests": course.rejected_requests,
+            }
+            for course in courses
+        ]
+        data["counts"]["students"] = sum(course.enrollment_count for course in courses)
+    return Response(data)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, ProfileExistsPermission])
+def export_data(request, filename):
+    """
+    Download enrollments, enrollment requests or users as `<kind>.csv` or
+    `<kind>.jsonl`, gzip-compressed when the name ends in `.gz`. Instructors
+    export the enrollments and requests of their own courses, admins everything.
+    `?course=<id>` limits enrollments and requests to one course.
+    """
+    kind, _, file_format = filename.removesuffix('.gz').partition('.')
+    if kind not in EXPORTS or file_format not in EXPORT_FORMATS:
+        return Response({"error": "Unknown export."}, status=404)
+
+    role = request.user.profile.role
+    if role not in ["instructor", "admin"] or (kind == 'users' and role != "admin"):
+        return Response({"error": "You are not allowed to export this data."}, status=403)
+
+    export = EXPORTS[kind]
+    course_id = request.query_params.get('course')
+    if course_id is not None and (export.course_lookup is None or not course_id.isdigit()):
+        return Response({"error": "course must be a course ID, and only applies to enrollments and requests."}, status=400)
+    queryset = export.queryset(
+        instructor=request.user if role == "instructor" else None,
+        course_id=int(course_id) if course_id is not None else None,
+    )
+
+    compress = filename.endswith('.gz')
+    response = StreamingHttpResponse(
+        export_chunks(export, queryset, file_format, compress=compress),
+        content_type='application/gzip' if compress else EXPORT_FORMATS[file_format],
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def search_catalog(request):
+    """
+    Full-text search over course, lesson and category titles and descriptions,
+    and the PDFs of lessons the user may see.
+    """
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return Response({"error": "The q parameter is required."}, status=400)
+
+    kinds = parse_field_list(request.query_params.get('type'))
+    if kinds and not kinds <= set(KINDS):
+        return Response({"error": f"type must be one of: {', '.join(KINDS)}."}, status=400)
+
+    try:
+        limit = int(request.query_params.get('limit', 20))
+    except ValueError:
+        return Response({"error": "limit must be a number."}, status=400)
+
+    results = search_index(
+        query, kinds=sorted(kinds) if kinds else None, limit=max(1, limit),
+        pdf_course_ids=MediaAccess.for_request(request).course_ids(),
+    )
+    return Response({"query": query, "results": results})
@@ -2,6 +2,8 @@ import axios from 'axios';
 
 const api = axios.create({
   baseURL: 'http://127.0.0.1:8000',
+  // The UI still expects bare lists from the list endpoints
+  params: { paginate: 'false' },
 });
 
 export default api;
\ No newline at end of file
@@ -1,5 +1,5 @@
 import { useState, useEffect } from "react";
-import axios from "axios";
+import api from "../../api";
 import { useNavigate } from "react-router-dom";
 import { toast } from "react-toastify";
 import "react-toastify/dist/ReactToastify.css";
@@ -17,7 +17,7 @@ const CreateCourse = () => {
     const fetchCategories = async () => {
       try {
         const token = localStorage.getItem("access_token");
-        const response = await axios.get("http://127.0.0.1:8000/api/categories/", {
+        const response = await api.get("/api/categories/", {
           headers: {
             Authorization: `Bearer ${token}`,
           },
@@ -43,8 +43,8 @@ const CreateCourse = () => {
 
     try {
       const token = localStorage.getItem("access_token");
-      const response = await axios.post(
-        "http://127.0.0.1:8000/api/courses/",
+      const response = await api.post(
+        "/api/courses/",
         { title, description, category: parseInt(category) }, // Ensure category is sent as an ID (number)
         {
           headers: {
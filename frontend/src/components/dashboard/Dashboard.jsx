@@ -5,10 +5,16 @@ import StudentDashboard from "./StudentDashboard";
 import AdminDashboard from "./AdminDashboard";
 import { ToastContainer, toast } from "react-toastify";
 import "react-toastify/dist/ReactToastify.css";
-import useUserData from "./useUserData"; // Import custom hook
+
+// The dashboard endpoint references each request's course by ID and sends the
+// courses once in `request_courses`; the cards expect the course nested
+const withCourses = (requests, courses) =>
+  requests.map((request) => ({ ...request, course: courses[request.course] }));
 
 const Dashboard = () => {
-  const { userData, loading, error } = useUserData();
+  const [userData, setUserData] = useState({});
+  const [loading, setLoading] = useState(true);
+  const [error, setError] = useState(null);
   const [courses, setCourses] = useState([]);
   const [allCourses, setAllCourses] = useState([]);
   const [enrollmentRequests, setEnrollmentRequests] = useState([]);
@@ -16,77 +22,60 @@ const Dashboard = () => {
   const [allUsers, setAllUsers] = useState([]);
 
   useEffect(() => {
-    if (userData.profile?.role) {
-      fetchRoleSpecificData(userData.profile.role);
+    const loadDashboard = async () => {
+      try {
+        const role = await fetchDashboard();
+        if (role === "admin") {
+          fetchAdminData();
+        }
+      } catch {
+        setError("Error fetching user data. Please log in again.");
+      } finally {
+        setLoading(false);
+      }
+    };
+
+    loadDashboard();
+  }, []);
+
+  // Profile, courses and enrollment requests in one round trip; returns the role
+  const fetchDashboard = async () => {
+    const token = localStorage.getItem("access_token");
+    const response = await api.get("/api/dashboard/", {
+      headers: {
+        Authorization: `Bearer ${token}`,
+      },
+    });
+    const { profile, courses, enrollment_requests, request_courses } = response.data;
+    const requests = withCourses(enrollment_requests, request_courses);
+    setUserData(profile);
+    setCourses(courses);
+    if (profile.profile?.role === "student") {
+      setStudentRequests(requests);
+    } else {
+      setEnrollmentRequests(requests);
     }
-  }, [userData.profile?.role]);
+    return profile.profile?.role;
+  };
 
-  const fetchRoleSpecificData = async (role) => {
+  // Admins also manage every user and course
+  const fetchAdminData = async () => {
     try {
       const token = localStorage.getItem("access_token");
-      if (role === "instructor") {
-        const [coursesResponse, requestsResponse] = await Promise.all([
-          api.get("/api/user-courses/", {
-            headers: {
-              Authorization: `Bearer ${token}`,
-            },
-          }),
-          api.get("/api/list-enrollment-requests/", {
-            headers: {
-              Authorization: `Bearer ${token}`,
-            },
-          }),
-        ]);
-        setCourses(coursesResponse.data);
-        setEnrollmentRequests(requestsResponse.data);
-      } else if (role === "student") {
-        const [enrollmentsResponse, requestsResponse] = await Promise.all([
-          api.get("/api/user-courses/", {
-            headers: {
-              Authorization: `Bearer ${token}`,
-            },
-          }),
-          api.get("/api/student-enrollment-requests/", {
-            headers: {
-              Authorization: `Bearer ${token}`,
-            },
-          }),
-        ]);
-        setCourses(enrollmentsResponse.data);
-        setStudentRequests(requestsResponse.data);
-        if (enrollmentsResponse.data.length === 0) {
-          const allCoursesResponse = await api.get("/api/courses/", {
-            headers: {
-              Authorization: `Bearer ${token}`,
-            },
-          });
-          setAllCourses(allCoursesResponse.data);
-        }
-      } else if (role === "admin") {
-        const [usersResponse, coursesResponse, requestsResponse] = await Promise.all([
-          api.get("/auth/admin/users/", {
-            headers: {
-              Authorization: `Bearer ${token}`,
-            },
-          }),
-          api.get("/api/courses/", {
-            headers: {
-              Authorization: `Bearer ${token}`,
-            },
-          }),
-          api.get("/api/list-enrollment-requests/", {
-            headers: {
-              Authorization: `Bearer ${token}`,
-            },
-          }),
-        ]);
-        setAllUsers(usersResponse.data);
-        setAllCourses(coursesResponse.data);
-        setEnrollmentRequests(requestsResponse.data);
-  
-        // Debug: Log the fetched enrollment requests
-        console.log("Admin Enrollment Requests:", requestsResponse.data);
-      }
+      const [usersResponse, coursesResponse] = await Promise.all([
+        api.get("/auth/admin/users/", {
+          headers: {
+            Authorization: `Bearer ${token}`,
+          },
+        }),
+        api.get("/api/courses/", {
+          headers: {
+            Authorization: `Bearer ${token}`,
+          },
+        }),
+      ]);
+      setAllUsers(usersResponse.data);
+      setAllCourses(coursesResponse.data);
     } catch (error) {
       toast.error("Error fetching data. Please try again.");
       console.error("Error fetching data:", error);
@@ -106,12 +95,7 @@ const Dashboard = () => {
         }
       );
       toast.success("Enrollment request approved successfully.");
-      const response = await api.get("/api/list-enrollment-requests/", {
-        headers: {
-          Authorization: `Bearer ${token}`,
-        },
-      });
-      setEnrollmentRequests(response.data);
+      await fetchDashboard();
     } catch (error) {
       toast.error("Error approving enrollment request. Please try again.");
       console.error("Error approving request:", error);
@@ -131,12 +115,7 @@ const Dashboard = () => {
         }
       );
       toast.success("Enrollment request rejected successfully.");
-      const response = await api.get("/api/list-enrollment-requests/", {
-        headers: {
-          Authorization: `Bearer ${token}`,
-        },
-      });
-      setEnrollmentRequests(response.data);
+      await fetchDashboard();
     } catch (error) {
       toast.error("Error rejecting enrollment request. Please try again.");
       console.error("Error rejecting request:", error);
@@ -173,12 +152,7 @@ const Dashboard = () => {
         },
       });
       toast.success("Enrollment request withdrawn successfully.");
-      const response = await api.get("/api/student-enrollment-requests/", {
-        headers: {
-          Authorization: `Bearer ${token}`,
-        },
-      });
-      setStudentRequests(response.data);
+      await fetchDashboard();
     } catch (error) {
       toast.error("Error withdrawing enrollment request. Please try again.");
       console.error("Error withdrawing request:", error);
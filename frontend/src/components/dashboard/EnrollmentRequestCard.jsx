@@ -1,10 +1,6 @@
-import useUserData from "./useUserData"; // Import custom hook
 import PropTypes from "prop-types";
 
 const EnrollmentRequestCard = ({ request, onApprove, onReject, onWithdraw }) => {
-  const { userData } = useUserData();
-  const role = userData.profile?.role;
-
   return (
     <li className="border p-4 rounded-md shadow-sm hover:shadow-md transition-shadow duration-300">
       <h3 className="font-semibold">{request.course.title}</h3>
@@ -12,11 +8,11 @@ const EnrollmentRequestCard = ({ request, onApprove, onReject, onWithdraw }) =>
       <p><strong>Status:</strong> <span className={`${request.status === "pending" ? "text-yellow-600" : request.status === "approved" ? "text-green-600" : "text-red-600"}`}>{request.status}</span></p>
       <p><strong>Message:</strong> {request.message || "No message provided."}</p>
 
-      {/* Actions based on role */}
+      {/* Actions based on the handlers given */}
       {request.status === "pending" && (
         <div className="mt-2">
           {/* Approve and Reject buttons for Instructor and Admin */}
-          {(role === "instructor" || role === "admin") && (
+          {onApprove && onReject && (
             <>
               <button
                 onClick={() => onApprove(request.id)}
@@ -34,7 +30,7 @@ const EnrollmentRequestCard = ({ request, onApprove, onReject, onWithdraw }) =>
           )}
 
           {/* Withdraw button for Student */}
-          {role === "student" && (
+          {onWithdraw && (
             <button
               onClick={() => onWithdraw(request.id)}
               className="bg-red-500 text-white px-4 py-2 rounded-md hover:bg-red-600"
@@ -1,32 +0,0 @@
-import { useEffect, useState } from "react";
-import api from "../../api";
-
-const useUserData = () => {
-  const [userData, setUserData] = useState({});
-  const [loading, setLoading] = useState(true);
-  const [error, setError] = useState(null);
-
-  useEffect(() => {
-    const fetchUserData = async () => {
-      try {
-        const token = localStorage.getItem("access_token");
-        const response = await api.get("/auth/profile/", {
-          headers: {
-            Authorization: `Bearer ${token}`,
-          },
-        });
-        setUserData(response.data);
-      } catch {
-        setError("Error fetching user data. Please log in again.");
-      } finally {
-        setLoading(false);
-      }
-    };
-
-    fetchUserData();
-  }, []);
-
-  return { userData, loading, error };
-};
-
-export default useUserData;
\ No newline at end of file